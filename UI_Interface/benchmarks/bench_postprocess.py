@@ -0,0 +1,149 @@
+"""
+File Name       : bench_postprocess.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Micro-benchmark for the YOLO postprocess step.
+Compares the old per-row Python loop with the vectorized decode_predictions()
+on synthetic model outputs (640 model -> 8400 candidate rows) and checks that
+both paths return identical results.
+
+Usage (from UI_Interface/):
+    python -m benchmarks.bench_postprocess
+    python -m benchmarks.bench_postprocess --rows 8400 --classes 2 --repeat 50
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.app.vision.yolo_runtime import decode_predictions
+
+
+# eski dongu - VisionService.postprocess (referans)
+def legacy_vision_postprocess(preds, orig_hw, imgsz, conf_thres):
+    orig_h, orig_w = orig_hw
+    boxes, scores, class_ids = [], [], []
+    for p in preds:
+        cx, cy, w, h = p[:4]
+        class_scores = p[4:]
+        cls = int(np.argmax(class_scores))
+        conf = float(class_scores[cls])
+        if conf < conf_thres:
+            continue
+        x1 = int((cx - w / 2) * orig_w / imgsz)
+        y1 = int((cy - h / 2) * orig_h / imgsz)
+        x2 = int((cx + w / 2) * orig_w / imgsz)
+        y2 = int((cy + h / 2) * orig_h / imgsz)
+        boxes.append([x1, y1, x2, y2])
+        scores.append(conf)
+        class_ids.append(cls)
+    return boxes, scores, class_ids
+
+
+# eski dongu - YoloRuntime.postprocess (referans)
+def legacy_runtime_postprocess(preds, orig_hw, imgsz, conf_thres):
+    h, w = orig_hw
+    dets = []
+    for pred in preds:
+        obj_conf = float(pred[4])
+        class_scores = pred[5:]
+        cls_id = int(np.argmax(class_scores))
+        score = obj_conf * float(class_scores[cls_id])
+        if score < conf_thres:
+            continue
+        cx, cy, bw, bh = pred[:4]
+        x1 = max(0, min(w - 1, int((cx - bw / 2) * w / imgsz)))
+        y1 = max(0, min(h - 1, int((cy - bh / 2) * h / imgsz)))
+        x2 = max(0, min(w - 1, int((cx + bw / 2) * w / imgsz)))
+        y2 = max(0, min(h - 1, int((cy + bh / 2) * h / imgsz)))
+        dets.append(([x1, y1, x2, y2], float(score), cls_id))
+    dets.sort(key=lambda d: d[1], reverse=True)
+    return dets
+
+
+def vectorized_runtime_postprocess(preds, orig_hw, imgsz, conf_thres):
+    boxes, scores, class_ids = decode_predictions(
+        preds, orig_hw, imgsz, conf_thres, has_objectness=True, clamp=True
+    )
+    order = np.argsort(-scores, kind="stable")
+    return list(zip(boxes[order].tolist(), scores[order].tolist(), class_ids[order].tolist()))
+
+
+def vectorized_vision_postprocess(preds, orig_hw, imgsz, conf_thres):
+    boxes, scores, class_ids = decode_predictions(preds, orig_hw, imgsz, conf_thres)
+    return boxes.tolist(), scores.tolist(), class_ids.tolist()
+
+
+def make_preds(rows: int, classes: int, imgsz: int, objectness: bool, hit_ratio: float, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    xywh = np.empty((rows, 4), dtype=np.float32)
+    xywh[:, 0:2] = rng.uniform(0, imgsz, size=(rows, 2))
+    xywh[:, 2:4] = rng.uniform(4, 80, size=(rows, 2))
+
+    # cogu satir dusuk skorlu, hit_ratio kadari esigin ustunde (gercek cikisa benzer)
+    cls = rng.uniform(0.0, 0.3, size=(rows, classes)).astype(np.float32)
+    hits = rng.random(rows) < hit_ratio
+    cls[hits, rng.integers(0, classes, size=int(hits.sum()))] = rng.uniform(0.6, 1.0, size=int(hits.sum()))
+
+    if objectness:
+        obj = np.where(hits, rng.uniform(0.8, 1.0, rows), rng.uniform(0.0, 0.3, rows)).astype(np.float32)
+        return np.concatenate([xywh, obj[:, None], cls], axis=1)
+    return np.concatenate([xywh, cls], axis=1)
+
+
+def _time(fn, repeat: int, *args) -> float:
+    fn(*args)  # isinma
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="YOLO postprocess loop vs vectorized benchmark")
+    ap.add_argument("--rows", type=int, default=8400)
+    ap.add_argument("--classes", type=int, default=2)
+    ap.add_argument("--imgsz", type=int, default=640)
+    ap.add_argument("--conf", type=float, default=0.7)
+    ap.add_argument("--hit-ratio", type=float, default=0.01)
+    ap.add_argument("--repeat", type=int, default=30)
+    args = ap.parse_args()
+
+    orig_hw = (720, 1280)
+
+    cases = [
+        (
+            "VisionService (v8, no obj)",
+            make_preds(args.rows, args.classes, args.imgsz, False, args.hit_ratio),
+            legacy_vision_postprocess,
+            vectorized_vision_postprocess,
+        ),
+        (
+            "YoloRuntime  (v5, obj*cls)",
+            make_preds(args.rows, args.classes, args.imgsz, True, args.hit_ratio),
+            legacy_runtime_postprocess,
+            vectorized_runtime_postprocess,
+        ),
+    ]
+
+    print(f"rows={args.rows} classes={args.classes} conf={args.conf} repeat={args.repeat}")
+    for name, preds, legacy, fast in cases:
+        a = legacy(preds, orig_hw, args.imgsz, args.conf)
+        b = fast(preds, orig_hw, args.imgsz, args.conf)
+        same = a == b
+
+        t_loop = _time(legacy, args.repeat, preds, orig_hw, args.imgsz, args.conf)
+        t_vec = _time(fast, args.repeat, preds, orig_hw, args.imgsz, args.conf)
+        print(
+            f"{name}: loop {t_loop:8.3f} ms | vectorized {t_vec:7.3f} ms | "
+            f"speedup x{t_loop / max(t_vec, 1e-9):6.1f} | identical={same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+File Name       : bench_status_json.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Micro-benchmark for the /api/status payload.
+Compares the default FastAPI path (jsonable_encoder + JSONResponse) with
+FastJSONResponse (orjson if installed, compact stdlib json otherwise) on a
+realistic state snapshot with N log lines, and reports bytes on the wire for
+identity / gzip / brotli (if installed) and for an idle ?since= delta.
+
+Usage (from UI_Interface/):
+    python -m benchmarks.bench_status_json
+    python -m benchmarks.bench_status_json --logs 300 --repeat 2000
+"""
+
+import argparse
+import gzip
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.app.core.compression import brotli
+from src.app.core.responses import JSON_BACKEND, FastJSONResponse
+from src.app.core.state import SYSTEM_STATE
+
+
+def make_status(logs: int) -> dict:
+    # gercekci log satirlari (runner + komut loglari)
+    lines = []
+    for i in range(logs):
+        comp = ("R1", "R2", "D1", "D2")[i % 4]
+        lines.append(f"[2026-10-17 12:{i // 60 % 60:02d}:{i % 60:02d}] STEP {i % 50 + 1}/50: {comp} pick/place step done")
+
+    SYSTEM_STATE.update("robot", status="running", current_task="STEP 12/50: R2 move to feeder", x=120, y=45, z=5)
+    SYSTEM_STATE.update("grbl", state="Run", mpos={"x": 120.0, "y": 45.0, "z": 5.0}, feed=1500.0,
+                        planner_free=12, rx_free=96, last_updated="2026-10-17T12:00:00")
+    version, snapshot = SYSTEM_STATE.versioned_snapshot()
+    return {**snapshot, "version": version, "logs": lines, "log_seq": logs}
+
+
+def default_render(body: dict) -> bytes:
+    # FastAPI: response_model yok -> jsonable_encoder, sonra JSONResponse
+    return JSONResponse(jsonable_encoder(body)).body
+
+
+def fast_render(body: dict) -> bytes:
+    return FastJSONResponse(body).body
+
+
+def _time(fn, repeat: int, *args) -> float:
+    fn(*args)  # isinma
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="/api/status JSON encoding + compression benchmark")
+    ap.add_argument("--logs", type=int, default=300, help="log lines in the payload")
+    ap.add_argument("--repeat", type=int, default=1000)
+    ap.add_argument("--gzip-level", type=int, default=6)
+    ap.add_argument("--brotli-quality", type=int, default=4)
+    args = ap.parse_args()
+
+    body = make_status(args.logs)
+    a = default_render(body)
+    b = fast_render(body)
+    same = json.loads(a) == json.loads(b)
+
+    t_default = _time(default_render, args.repeat, body)
+    t_fast = _time(fast_render, args.repeat, body)
+
+    print(f"logs={args.logs} repeat={args.repeat} backend={JSON_BACKEND} identical={same}")
+    print(f"encode  default {t_default:9.1f} us | fast {t_fast:9.1f} us | speedup x{t_default / max(t_fast, 1e-9):5.1f}")
+
+    rows = [("identity", len(a), len(b), 0.0)]
+    t_gz = _time(gzip.compress, args.repeat // 10 or 1, b, args.gzip_level)
+    rows.append((f"gzip-{args.gzip_level}", len(gzip.compress(a, args.gzip_level)),
+                 len(gzip.compress(b, args.gzip_level)), t_gz))
+    if brotli is not None:
+        t_br = _time(lambda data: brotli.compress(data, quality=args.brotli_quality), args.repeat // 10 or 1, b)
+        rows.append((f"br-{args.brotli_quality}", len(brotli.compress(a, quality=args.brotli_quality)),
+                     len(brotli.compress(b, quality=args.brotli_quality)), t_br))
+    else:
+        print("brotli  not installed (pip install brotli)")
+
+    for name, size_default, size_fast, t in rows:
+        extra = f" | compress {t:8.1f} us" if t else ""
+        print(f"{name:<9} default {size_default:7d} B | fast {size_fast:7d} B{extra}")
+
+    # bosta polling: ?since=<version> ve If-None-Match
+    version, changed = SYSTEM_STATE.changed_since(body["version"])
+    idle = fast_render({"version": version, "changed": changed, "logs_append": [], "log_seq": args.logs})
+    print(f"idle    ?since= delta {len(idle)} B | If-None-Match -> 304 with empty body")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+File Name       : compression.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+HTTP response compression (PNP_HTTP_COMPRESSION):
+    auto : Brotli if the `brotli` package is installed and the client accepts
+           "br", otherwise GZip
+    gzip : GZip only
+    none : no compression
+Only responses of at least PNP_HTTP_COMPRESS_MIN bytes are compressed.
+Streams (SSE, MJPEG) and already-compressed media are never touched.
+Brotli is applied to complete (non-streaming) responses only.
+"""
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES, GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# mjpeg akisi (multipart) zaten jpeg; sikistirma sadece cpu harcar ve akisi tamponlar
+EXCLUDED_CONTENT_TYPES = DEFAULT_EXCLUDED_CONTENT_TYPES + ("multipart/x-mixed-replace",)
+
+
+def _excluded(content_type: str) -> bool:
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    for pattern in EXCLUDED_CONTENT_TYPES:
+        if pattern.endswith("/*"):
+            if content_type.startswith(pattern[:-1]):
+                return True
+        elif content_type == pattern:
+            return True
+    return False
+
+
+class _BrotliResponder:
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.quality = quality
+        self._start: Message | None = None
+        self._passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._send = send
+        await self.app(scope, receive, self._on_send)
+
+    async def _on_send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self._start = message
+            self._passthrough = (
+                "content-encoding" in headers or _excluded(headers.get("content-type", ""))
+            )
+            return
+
+        if message["type"] != "http.response.body" or self._start is None:
+            await self._send(message)
+            return
+
+        start, self._start = self._start, None
+        body = message.get("body", b"")
+
+        # akis (more_body) ya da kucuk cevap: oldugu gibi
+        if self._passthrough or message.get("more_body", False) or len(body) < self.minimum_size:
+            self._passthrough = True
+            await self._send(start)
+            await self._send(message)
+            return
+
+        compressed = brotli.compress(body, quality=self.quality)
+        headers = MutableHeaders(raw=start["headers"])
+        headers["Content-Encoding"] = "br"
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        await self._send(start)
+        await self._send({"type": "http.response.body", "body": compressed})
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        mode: str = "auto",
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.mode = mode
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.gzip = GZipMiddleware(
+            app,
+            minimum_size=minimum_size,
+            compresslevel=gzip_level,
+            exclude_content_types=EXCLUDED_CONTENT_TYPES,
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.mode == "none":
+            await self.app(scope, receive, send)
+            return
+
+        if self.mode == "auto" and brotli is not None:
+            accept = Headers(scope=scope).get("accept-encoding", "")
+            if "br" in [a.split(";", 1)[0].strip() for a in accept.split(",")]:
+                await _BrotliResponder(self.app, self.minimum_size, self.brotli_quality)(scope, receive, send)
+                return
+
+        await self.gzip(scope, receive, send)
+
+
+def compression_backend(mode: str) -> str:
+    if mode == "none":
+        return "none"
+    if mode == "auto" and brotli is not None:
+        return "br+gzip"
+    return "gzip"
@@ -3,7 +3,7 @@ File Name       : config.py
 Author          : Eda
 Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
 Created Date    : 2026-02-01
-Last Modified   : 2026-02-25
+Last Modified   : 2026-10-17
 
 Application configuration values.
 These settings are used across the backend services.
@@ -21,6 +21,10 @@ API_KEY: str = os.environ.get("PNP_API_KEY", "dev-key-change-me")
 # camera
 CAMERA_DEVICE_INDEX: int = int(os.environ.get("PNP_CAMERA_INDEX", "0"))
 
+# arka plan frame yakalama (opt-in): tek thread kamerayi okur, istekler son frame'i alir
+CAMERA_THREADED: bool = os.environ.get("PNP_CAMERA_THREADED", "false").lower() == "true"
+CAMERA_MAX_FPS: float = float(os.environ.get("PNP_CAMERA_MAX_FPS", "0"))  # 0 => kamera hizinda
+
 
 # demo mode (set DEMO_MODE=false for real hardware)
 DEMO_MODE: bool = os.environ.get("DEMO_MODE", "true").lower() == "true"
@@ -31,4 +35,61 @@ TESTSTATION_PORT: str = os.environ.get("PNP_TESTSTATION_PORT", "/dev/ttyUSB0")
 
 # baudrates sonra bak!!
 ROBOT_BAUDRATE: int = int(os.environ.get("PNP_ROBOT_BAUD", "115200"))
-TESTSTATION_BAUDRATE: int = int(os.environ.get("PNP_TESTSTATION_BAUD", "115200"))
\ No newline at end of file
+TESTSTATION_BAUDRATE: int = int(os.environ.get("PNP_TESTSTATION_BAUD", "115200"))
+
+# grbl karakter sayma streaming (false => her satir icin ok bekle)
+GRBL_STREAMING: bool = os.environ.get("PNP_GRBL_STREAMING", "true").lower() == "true"
+
+# vision/olcum oncesi hareketin bitmesini bekleme: "status" (Idle + bos planner) veya "dwell" (G4 P0)
+MOTION_WAIT: str = os.environ.get("PNP_MOTION_WAIT", "status").strip().lower()
+MOTION_TIMEOUT_S: float = float(os.environ.get("PNP_MOTION_TIMEOUT_S", "30"))
+
+# gcode runner pipeline: vision/olcum isleri havuzda, gantry bir sonraki harekete gecer
+RUNNER_PIPELINED: bool = os.environ.get("PNP_RUNNER_PIPELINE", "false").lower() == "true"
+RUNNER_WORKERS: int = int(os.environ.get("PNP_RUNNER_WORKERS", "2"))
+
+# komponent sirasini XY yolunu kisaltacak sekilde sec (feeder -> test -> pad)
+OPTIMIZE_ORDER: bool = os.environ.get("PNP_OPTIMIZE_ORDER", "false").lower() == "true"
+
+# demo: G-code satirlarini hareket simulasyonu ile zamanla (sabit 50ms yerine)
+DEMO_MOTION_SIM: bool = os.environ.get("PNP_DEMO_MOTION_SIM", "false").lower() == "true"
+DEMO_TIME_SCALE: float = float(os.environ.get("PNP_DEMO_TIME_SCALE", "1.0"))  # 0 => beklemeden
+
+# test istasyonu olcum gecmisi (ring buffer) ve Cpk toleransi
+TEST_HISTORY_SIZE: int = int(os.environ.get("PNP_TEST_HISTORY", "1024"))
+TEST_NOMINAL_OHM: float = float(os.environ.get("PNP_TEST_NOMINAL_OHM", "0"))  # 0 => Cpk hesaplanmaz
+# komponent basina nominal, ornek "R1=4700,R2=10000" (listede olmayan => TEST_NOMINAL_OHM)
+TEST_NOMINALS: dict[str, float] = {
+    k.strip().upper(): float(v)
+    for k, v in (item.split("=", 1) for item in os.environ.get("PNP_TEST_NOMINALS", "").split(",") if "=" in item)
+}
+TEST_TOL_PCT: float = float(os.environ.get("PNP_TEST_TOL_PCT", "5"))
+
+# log deposu: bellekte tutulan kayit sayisi, istege bagli donen dosya (bos => yok)
+LOG_MAX: int = int(os.environ.get("PNP_LOG_MAX", "300"))
+LOG_FILE: str = os.environ.get("PNP_LOG_FILE", "")
+LOG_FILE_MAX_BYTES: int = int(os.environ.get("PNP_LOG_FILE_MAX_KB", "1024")) * 1024
+LOG_FILE_BACKUPS: int = int(os.environ.get("PNP_LOG_FILE_BACKUPS", "3"))
+
+# api cevaplari: orjson (kuruluysa) ve sikistirma (auto: brotli varsa br, yoksa gzip | gzip | none)
+FAST_JSON: bool = os.environ.get("PNP_FAST_JSON", "true").lower() == "true"
+HTTP_COMPRESSION: str = os.environ.get("PNP_HTTP_COMPRESSION", "auto").lower()
+HTTP_COMPRESS_MIN_BYTES: int = int(os.environ.get("PNP_HTTP_COMPRESS_MIN", "1024"))
+
+# cihaz basina executor (async router'lar): worker sayisi ve kuyruk siniri (dolunca 503)
+CAMERA_WORKERS: int = int(os.environ.get("PNP_CAMERA_WORKERS", "2"))
+VISION_WORKERS: int = int(os.environ.get("PNP_VISION_WORKERS", "1"))
+SERIAL_WORKERS: int = int(os.environ.get("PNP_SERIAL_WORKERS", "1"))
+EXECUTOR_MAX_PENDING: int = int(os.environ.get("PNP_EXECUTOR_MAX_PENDING", "8"))
+
+# vision worker sureci (opt-in): model ayri surecte, frame'ler shared memory ile
+VISION_WORKER: bool = os.environ.get("PNP_VISION_WORKER", "false").lower() == "true"
+VISION_WORKER_SLOTS: int = int(os.environ.get("PNP_VISION_WORKER_SLOTS", "2"))
+VISION_SHM_BYTES: int = int(float(os.environ.get("PNP_VISION_SHM_MB", "8")) * 1024 * 1024)  # slot basina
+VISION_WORKER_MAX_OVERLAY: int = int(os.environ.get("PNP_VISION_WORKER_MAX_OVERLAY", "2"))  # bitmemis overlay istegi
+VISION_WORKER_TIMEOUT_S: float = float(os.environ.get("PNP_VISION_WORKER_TIMEOUT_S", "5"))
+# ornek "2,3" - worker'i bu cekirdeklere sabitle (bos => hepsi)
+VISION_WORKER_CPUS: list[int] = [int(c) for c in os.environ.get("PNP_VISION_WORKER_CPUS", "").split(",") if c.strip()]
+
+# /api/status/stream: en fazla saniyede kac guncelleme (birlestirilmis)
+STATUS_STREAM_MAX_HZ: float = float(os.environ.get("PNP_STATUS_STREAM_HZ", "5"))
@@ -0,0 +1,131 @@
+"""
+File Name       : executors.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Per-device bounded executors for the async routers.
+Blocking hardware work (camera capture / JPEG encode, ONNX inference,
+serial round trips, runner reset joins) runs here instead of Starlette's
+shared threadpool, so /api/status and static files stay responsive while
+a device is busy.
+
+    camera : capture, JPEG encode, camera open/close
+    vision : detection + overlay drawing
+    serial : runner control (start/stop/reset), serial writes
+
+Each executor has a fixed number of worker threads and a cap on queued +
+running jobs. When the cap is reached, run() raises ExecutorBusy right away
+(routes answer 503) instead of piling up requests behind a slow device.
+
+    await run_on("camera", svc.get_jpeg)
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class ExecutorBusy(RuntimeError):
+    """The device executor already has max_pending jobs."""
+
+
+class DeviceExecutor:
+    def __init__(self, name: str, workers: int = 1, max_pending: int = 8):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.max_pending = max(self.workers, int(max_pending))
+
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"exec-{name}")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, bounded: bool = True, **kwargs: Any) -> Any:
+        """
+        Run fn(*args, **kwargs) on this device's threads and await the result.
+        bounded=False skips the pending cap (cleanup work that must not be dropped).
+        """
+        with self._lock:
+            if bounded and self._pending >= self.max_pending:
+                self._rejected += 1
+                raise ExecutorBusy(f"{self.name} executor busy ({self._pending} pending)")
+            self._pending += 1
+
+        try:
+            fut = self._pool.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(None)
+            raise
+        # sayac is bitince duser; istemci koparsa (await iptal) is threadde surer ve yeri tutar
+        fut.add_done_callback(self._release)
+        return await asyncio.wrap_future(fut)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Fire-and-forget, not counted against the cap (e.g. cleanup in a cancelled generator)."""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def _release(self, _fut) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+executors: Optional[Dict[str, DeviceExecutor]] = None
+
+
+def init_executors(
+    camera_workers: int = 2,
+    vision_workers: int = 1,
+    serial_workers: int = 1,
+    max_pending: int = 8,
+) -> Dict[str, DeviceExecutor]:
+    """Initialize the device executors singleton."""
+    global executors
+    if executors is not None:
+        shutdown_executors()
+
+    executors = {
+        "camera": DeviceExecutor("camera", camera_workers, max_pending),
+        "vision": DeviceExecutor("vision", vision_workers, max_pending),
+        "serial": DeviceExecutor("serial", serial_workers, max_pending),
+    }
+    print(f"[EXECUTORS] camera={camera_workers} vision={vision_workers} serial={serial_workers} max_pending={max_pending}")
+    return executors
+
+
+def get_executor(name: str) -> DeviceExecutor:
+    # init unutulduysa varsayilanlarla olustur (ornegin lifespan'siz testler)
+    if executors is None:
+        init_executors()
+    return executors[name]
+
+
+async def run_on(name: str, fn: Callable[..., Any], *args: Any, bounded: bool = True, **kwargs: Any) -> Any:
+    return await get_executor(name).run(fn, *args, bounded=bounded, **kwargs)
+
+
+def shutdown_executors() -> None:
+    global executors
+    if executors is None:
+        return
+    for ex in executors.values():
+        ex.shutdown(wait=False)
+    executors = None
@@ -0,0 +1,57 @@
+"""
+File Name       : responses.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Fast JSON response class for the hot API routes (status, plan, history).
+Uses orjson when it is installed (and PNP_FAST_JSON is not false), otherwise
+compact stdlib json. Endpoints return FastJSONResponse(...) themselves, so
+FastAPI's jsonable_encoder pass over the nested dict is skipped.
+Handles dict subclasses (state snapshots), tuples, numpy values and datetimes.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from src.app.core.config import FAST_JSON
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    # numpy skaler/dizi, datetime, digerleri str
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    return str(obj)
+
+
+if orjson is not None and FAST_JSON:
+    JSON_BACKEND = "orjson"
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTS)
+else:
+    JSON_BACKEND = "json"
+
+    def dumps(content: Any) -> bytes:
+        return json.dumps(
+            content, ensure_ascii=False, separators=(",", ":"), default=_default
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,277 @@
+"""
+File Name       : state.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Thread-safe, versioned system state (replaces the plain SYSTEM_STATE dict).
+
+Each top-level section (robot, grbl, teststation, ...) is an immutable
+snapshot. Writers never touch a published snapshot: they edit a private copy
+and publish it (copy-on-write). One writer per section at a time
+(per-section lock); readers take no lock and just keep the reference.
+
+    SYSTEM_STATE["robot"]                       -> current snapshot (read-only)
+    SYSTEM_STATE.update("robot", status="idle") -> shallow update of a section
+    with SYSTEM_STATE.edit("connections") as c: -> nested edits, published on exit
+        c["camera"]["status"] = True
+    SYSTEM_STATE.set("plan", [...])             -> replace a section
+
+Every published change bumps a store-wide version (monotonic); the section
+remembers the version of its last change. Publishing an identical value is
+a no-op, so versions only move on real changes.
+    changed_since(v)     -> (version, {section: snapshot}) changed after v
+    subscribe(fn)        -> fn(section, version, snapshot) after each change
+    subscribe(fn, locked=True) -> same, but called inside the store lock, in
+                            version order, before readers can see the version
+                            (must be quick and must not call the store)
+    wait_for_change(v)   -> block until the version passes v
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class FrozenDict(dict):
+    """dict that refuses mutation (json/orjson still see a plain dict)."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("State snapshots are read-only; use SYSTEM_STATE.edit()/update()")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Mutable deep copy of a snapshot."""
+    if isinstance(value, dict):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+class StateStore:
+    def __init__(self, initial: Optional[Dict[str, Any]] = None):
+        self._cond = threading.Condition()
+        self._section_locks: Dict[str, threading.RLock] = {}
+
+        self._sections: Dict[str, Any] = {k: _freeze(v) for k, v in (initial or {}).items()}
+        self._versions: Dict[str, int] = {k: 0 for k in self._sections}
+        self._version = 0
+        self._snapshot: Tuple[int, FrozenDict] | None = None
+        self._subscribers: List[Callable[[str, int, Any], None]] = []
+        self._locked_subscribers: List[Callable[[str, int, Any], None]] = []
+
+    # okuma (kilitsiz)
+    def __getitem__(self, name: str) -> Any:
+        return self._sections[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sections
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self._sections.get(name, default)
+
+    def keys(self):
+        return list(self._sections.keys())
+
+    def items(self):
+        return list(self._sections.items())
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def versions(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self._versions)
+
+    def snapshot(self) -> FrozenDict:
+        """Whole state as one read-only dict (built once per version)."""
+        return self.versioned_snapshot()[1]
+
+    def versioned_snapshot(self) -> Tuple[int, FrozenDict]:
+        """(version, whole state) taken together."""
+        cached = self._snapshot
+        if cached is not None and cached[0] == self._version:
+            return cached
+        with self._cond:
+            if self._snapshot is None or self._snapshot[0] != self._version:
+                self._snapshot = (self._version, FrozenDict(self._sections))
+            return self._snapshot
+
+    def changed_since(self, version: int) -> Tuple[int, Dict[str, Any]]:
+        """(current version, sections changed after `version`)."""
+        with self._cond:
+            changed = {n: self._sections[n] for n, v in self._versions.items() if v > version}
+            return self._version, changed
+
+    def delta_since(self, version: int) -> Tuple[int, Dict[str, Any], Dict[str, Any]]:
+        """changed_since() plus every section at that same version (one lock hold)."""
+        with self._cond:
+            changed = {n: self._sections[n] for n, v in self._versions.items() if v > version}
+            return self._version, changed, self._sections
+
+    def wait_for_change(self, version: int, timeout: Optional[float] = None) -> int:
+        with self._cond:
+            self._cond.wait_for(lambda: self._version > version, timeout)
+            return self._version
+
+    # yazma
+    def _lock_for(self, name: str) -> threading.RLock:
+        with self._cond:
+            lock = self._section_locks.get(name)
+            if lock is None:
+                lock = self._section_locks[name] = threading.RLock()
+            return lock
+
+    @contextmanager
+    def edit(self, name: str) -> Iterator[Any]:
+        """Mutable copy of a section; published when the block exits without error."""
+        with self._lock_for(name):
+            draft = _thaw(self._sections.get(name, {}))
+            yield draft
+            self._publish(name, draft)
+
+    def update(self, name: str, **fields: Any) -> int:
+        with self.edit(name) as section:
+            section.update(fields)
+        return self._versions.get(name, 0)
+
+    def set(self, name: str, value: Any) -> int:
+        with self._lock_for(name):
+            return self._publish(name, value)
+
+    def _publish(self, name: str, value: Any) -> int:
+        frozen = _freeze(value)
+        with self._cond:
+            if name in self._sections and self._sections[name] == frozen:
+                return self._versions[name]
+
+            self._version += 1
+            version = self._version
+            # ust seviye de copy-on-write: okuyan thread'in iterasyonu bozulmaz
+            sections = dict(self._sections)
+            sections[name] = frozen
+            self._sections = sections
+            self._versions[name] = version
+            for fn in self._locked_subscribers:
+                try:
+                    fn(name, version, frozen)
+                except Exception as e:
+                    print(f"[STATE] Subscriber error: {e}")
+            subscribers = list(self._subscribers)
+            self._cond.notify_all()
+
+        for fn in subscribers:
+            try:
+                fn(name, version, frozen)
+            except Exception as e:
+                print(f"[STATE] Subscriber error: {e}")
+        return version
+
+    # abonelik
+    def subscribe(self, fn: Callable[[str, int, Any], None], locked: bool = False) -> None:
+        with self._cond:
+            (self._locked_subscribers if locked else self._subscribers).append(fn)
+
+    def unsubscribe(self, fn: Callable[[str, int, Any], None]) -> None:
+        with self._cond:
+            for subs in (self._subscribers, self._locked_subscribers):
+                if fn in subs:
+                    subs.remove(fn)
+
+
+# sistem durumu - baslangic degerleri
+SYSTEM_STATE = StateStore({
+    "robot": {
+        "status": "idle",
+        "current_task": "-",
+        "x": 0,
+        "y": 0,
+        "z": 0
+    },
+
+    "program": {
+        "running": False,
+        "paused": False,
+        "current_step": 0,
+        "total_steps": 0,
+        "current_label": "-",
+        "vacuum_on": False,
+        "pcb_done": {
+            "R1": False,
+            "R2": False,
+            "D1": False,
+            "D2": False,
+        },
+    },
+
+    "grbl": {
+        "state": "unknown",                 # Idle/Run/Hold/Alarm
+        "mpos": {"x": 0.0, "y": 0.0, "z": 0.0},
+        "last_ok": None,                 # True/False/None
+        "last_line": None,               # son gcode satırı - demo
+        "last_updated": None             # ISO string
+    },
+
+    "teststation": {
+        "mode": "none",
+        "last_adc": None,
+        "last_voltage_v": None,
+        "last_result": None,
+        "last_updated": None
+    },
+
+    # log deposunun son sira numarasi (satirlar: services/log_store.py)
+    "log": {
+        "last_seq": 0
+    },
+
+    "image_processing": {
+        "last_detection": {
+            "component": None,      # R1, R2, D1, D2
+            "type": None,           # R, D
+            "confidence": None       # 0 - 1
+        },
+        "last_placement": {         # yerlestirme dogrulaması
+            "pad": None,            # a, b, c, d
+            "accuracy": None,        # dogruluk 0 -100
+            "status": "unknown"
+        },
+        "last_updated": None
+    },
+
+    "connections": {
+        "arduino_motors": {
+           "status": False,
+            "port": None
+        },
+        "arduino_teststation": {
+            "status": False,
+            "port": None
+        },
+        "camera": {
+        "status": False,
+        "port": None
+        }
+    },
+})
@@ -0,0 +1,436 @@
+"""
+File Name       : grbl_emulator.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+GRBL 1.1 emulator on a pseudo-terminal for hardware-free REAL-mode testing.
+RobotService.connect() opens the pty like the Arduino/GRBL USB port.
+
+Modelled:
+    - 128-byte serial RX buffer (bytes beyond it are dropped, like the real ISR)
+    - 15-block planner queue: a motion line is acked once planned; when the
+      planner is full the protocol stops reading the RX buffer
+    - real-time bytes ? (status) ! (feed hold) ~ (cycle start) 0x18 (soft reset)
+    - status reports <State|MPos|Bf|FS> (+WCO every 10th report)
+    - G4 / M7-M9 buffer sync, $$ / $x=val / $X / $H / $I
+    - alarms: soft limits ($20=1, $130-$132) -> ALARM:2,
+      reset during motion -> ALARM:3, inject_alarm() for hard limits etc.
+    - motion durations from motion_sim (trapezoids from $110-$112 / $120-$122)
+
+Usage (from UI_Interface/):
+    python -m src.app.emulators.grbl_emulator --link /tmp/ttyGRBL
+    DEMO_MODE=false PNP_ROBOT_PORT=/tmp/ttyGRBL uvicorn src.app.main:app
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.app.emulators.pty_port import PtyPort
+from src.app.services.motion_sim import DEFAULT_SETTINGS, MachineProfile, MotionSimulator
+
+
+RX_BUFFER_SIZE = 128
+PLANNER_BLOCKS = 15
+BANNER = "Grbl 1.1h ['$' for help]"
+
+_WORD_RE = re.compile(r"([A-Z])([-+]?(?:\d+\.?\d*|\.\d+))")
+_SUPPORTED_G = {0, 1, 4, 17, 20, 21, 54, 90, 91, 94}
+_SUPPORTED_M = {0, 2, 3, 4, 5, 7, 8, 9, 30}
+_SYNC_M = {7, 8, 9}
+
+# $$ ciktisi icin varsayilanlar (hareket ayarlari motion_sim ile ortak)
+EMULATOR_SETTINGS: Dict[int, float] = {
+    0: 10, 1: 25, 10: 1, 11: 0.010, 12: 0.002, 13: 0,
+    20: 0, 21: 0, 22: 0, 23: 0, 24: 25.0, 25: 500.0,
+    100: 250.0, 101: 250.0, 102: 250.0,
+    **DEFAULT_SETTINGS,
+    130: 200.0, 131: 200.0, 132: 200.0,
+}
+
+
+@dataclass
+class _Block:
+    start: List[float]
+    target: List[float]
+    duration_s: float
+    feed_mm_min: float
+
+
+class GrblEmulator:
+    def __init__(
+        self,
+        link: str | None = None,
+        settings: Optional[Dict[int, float]] = None,
+        time_scale: float = 1.0,
+        baudrate: int = 0,
+    ):
+        self.port = PtyPort(link=link, baudrate=baudrate)
+        self.settings: Dict[int, float] = {**EMULATOR_SETTINGS, **(settings or {})}
+        self.time_scale = time_scale
+
+        self._cond = threading.Condition()
+        self._rx = bytearray()                  # seri RX buffer (real-time byte'lar haric)
+        self.rx_overflows = 0
+        self._planner: deque = deque()          # _Block
+        self._sim = MotionSimulator(MachineProfile.from_settings(self.settings))
+
+        self.mpos = [0.0, 0.0, 0.0]
+        self.wco = [0.0, 0.0, 0.0]
+        self.state = "Idle"                     # Idle | Run | Hold:0 | Alarm | Home
+        self.hold = False
+        self.feed_now = 0.0
+        self.coolant = False
+        self._reports = 0
+        self._reset_gen = 0                     # her soft reset'te artar
+
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def path(self) -> str:
+        return self.port.path
+
+    # yasam dongusu
+    def start(self) -> "GrblEmulator":
+        for target in (self._serial_loop, self._protocol_loop, self._motion_loop):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+        self._emit("")
+        self._emit(BANNER)
+        print(f"[GRBL_EMU] Listening on {self.path}")
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=1)
+        self.port.close()
+
+    def _emit(self, text: str) -> None:
+        self.port.write_line(text)
+
+    # seri giris (ISR): real-time byte'lar buffer'a girmez
+    def _serial_loop(self) -> None:
+        while not self._stop.is_set():
+            data = self.port.read(timeout=0.05)
+            if not data:
+                continue
+            for b in data:
+                if b == 0x3F:            # '?'
+                    self._emit(self._status_report())
+                elif b == 0x21:          # '!'
+                    with self._cond:
+                        if self.state in ("Run", "Idle") and self._planner:
+                            self.hold = True
+                            self.state = "Hold:0"
+                        self._cond.notify_all()
+                elif b == 0x7E:          # '~'
+                    with self._cond:
+                        if self.hold:
+                            self.hold = False
+                            self.state = "Run" if self._planner else "Idle"
+                        self._cond.notify_all()
+                elif b == 0x18:          # ctrl-x
+                    self._soft_reset()
+                else:
+                    with self._cond:
+                        if len(self._rx) >= RX_BUFFER_SIZE:
+                            self.rx_overflows += 1   # gercek grbl de byte'i kaybeder
+                            continue
+                        self._rx.append(b)
+                        self._cond.notify_all()
+
+    def _soft_reset(self) -> None:
+        with self._cond:
+            moving = bool(self._planner) and self.state in ("Run", "Hold:0", "Home")
+            self._planner.clear()
+            self._rx.clear()
+            self._reset_gen += 1
+            self.hold = False
+            self.feed_now = 0.0
+            self.coolant = False
+            self._sim.pos = list(self.mpos)
+            self._sim.absolute = True
+            if moving:
+                self.state = "Alarm"
+            elif self.state != "Alarm":
+                self.state = "Idle"
+            self._cond.notify_all()
+
+        if moving:
+            self._emit("ALARM:3")
+        self._emit("")
+        self._emit(BANNER)
+        if self.state == "Alarm":
+            self._emit("[MSG:'$H'|'$X' to unlock]")
+
+    def inject_alarm(self, code: int = 1) -> None:
+        """Raise an alarm as if a limit switch triggered (stops motion, needs reset/$X)."""
+        with self._cond:
+            self._planner.clear()
+            self.state = "Alarm"
+            self.hold = False
+            self.feed_now = 0.0
+            self._cond.notify_all()
+        self._emit(f"ALARM:{code}")
+
+    # status
+    def _status_report(self) -> str:
+        with self._cond:
+            free_blocks = PLANNER_BLOCKS - len(self._planner)
+            free_rx = RX_BUFFER_SIZE - len(self._rx)
+            pos = ",".join(f"{v:.3f}" for v in self.mpos)
+            parts = [self.state, f"MPos:{pos}", f"Bf:{free_blocks},{free_rx}", f"FS:{self.feed_now:.0f},0"]
+            if self._reports % 10 == 0:
+                parts.append("WCO:" + ",".join(f"{v:.3f}" for v in self.wco))
+            self._reports += 1
+        return "<" + "|".join(parts) + ">"
+
+    # protokol: satir satir
+    def _next_line(self) -> Optional[tuple]:
+        with self._cond:
+            while not self._stop.is_set():
+                idx = self._rx.find(b"\n")
+                if idx >= 0:
+                    raw = bytes(self._rx[:idx])
+                    del self._rx[:idx + 1]
+                    return self._reset_gen, raw.decode("ascii", errors="ignore").strip().upper()
+                self._cond.wait(0.1)
+        return None
+
+    def _protocol_loop(self) -> None:
+        while not self._stop.is_set():
+            item = self._next_line()
+            if item is None:
+                return
+            gen, line = item
+            if not line:
+                continue
+            response = self._execute_line(line, gen)
+            # soft reset sirasinda kesilen satira yanit yok
+            if response is not None and gen == self._reset_gen:
+                self._emit(response)
+
+    def _wait_sync(self, gen: int) -> bool:
+        """Wait until the planner is empty (buffer sync). False if reset/alarm."""
+        with self._cond:
+            while self._planner or self.hold:
+                if self._stop.is_set() or gen != self._reset_gen or self.state == "Alarm":
+                    return False
+                self._cond.wait(0.05)
+            return gen == self._reset_gen and self.state != "Alarm"
+
+    def _execute_line(self, line: str, gen: int) -> Optional[str]:
+        if line.startswith("$"):
+            return self._system_command(line, gen)
+
+        if self.state == "Alarm":
+            return "error:9"
+
+        line = line.split(";", 1)[0].split("(", 1)[0].replace(" ", "")
+        if not line:
+            return "ok"
+        words = _WORD_RE.findall(line)
+        if "".join(k + v for k, v in words) != line:
+            return "error:1"
+
+        g_codes = [float(v) for k, v in words if k == "G"]
+        m_codes = [int(float(v)) for k, v in words if k == "M"]
+        if any(g not in _SUPPORTED_G for g in g_codes) or any(m not in _SUPPORTED_M for m in m_codes):
+            return "error:20"
+
+        has_axes = any(k in ("X", "Y", "Z") for k, _ in words)
+
+        # G4 ve coolant: planner bosalinca calisir
+        if 4 in g_codes or any(m in _SYNC_M for m in m_codes):
+            if not self._wait_sync(gen):
+                return None
+            duration = self._sim.execute(line)
+            if 4 in g_codes and duration > 0:
+                if self._stop.wait(duration * self.time_scale):
+                    return None
+            self.coolant = self._sim.coolant
+            return "ok"
+
+        start = list(self._sim.pos)
+        duration = self._sim.execute(line)
+        if not has_axes or self._sim.pos == start:
+            return "ok"
+
+        target = list(self._sim.pos)
+        if self.settings.get(20, 0) and not self._within_limits(target):
+            self._sim.pos = start
+            self.inject_alarm(2)
+            self._emit("[MSG:Reset to continue]")
+            return None
+
+        feed = 0.0
+        if duration > 0:
+            dist = sum((t - s) ** 2 for t, s in zip(target, start)) ** 0.5
+            feed = dist / duration * 60.0
+
+        # planner dolu: protokol bekler, sonraki satirlar RX buffer'da kalir
+        with self._cond:
+            while len(self._planner) >= PLANNER_BLOCKS:
+                if self._stop.is_set() or gen != self._reset_gen or self.state == "Alarm":
+                    return None
+                self._cond.wait(0.05)
+            if gen != self._reset_gen:
+                return None
+            self._planner.append(_Block(start, target, duration, feed))
+            if not self.hold:
+                self.state = "Run"
+            self._cond.notify_all()
+        return "ok"
+
+    def _within_limits(self, target: List[float]) -> bool:
+        # grbl: makine koordinatlari 0 ile -max_travel arasinda
+        for axis, value in enumerate(target):
+            travel = self.settings.get(130 + axis, 0.0)
+            if value > 0.0 or value < -travel:
+                return False
+        return True
+
+    def _system_command(self, line: str, gen: int) -> Optional[str]:
+        if line == "$$":
+            for key in sorted(self.settings):
+                value = self.settings[key]
+                txt = f"{value:.3f}" if isinstance(value, float) else str(value)
+                self._emit(f"${key}={txt}")
+            return "ok"
+
+        if line == "$I":
+            self._emit("[VER:1.1h.20190825:]")
+            self._emit(f"[OPT:V,{PLANNER_BLOCKS},{RX_BUFFER_SIZE}]")
+            return "ok"
+
+        if line == "$X":
+            with self._cond:
+                if self.state == "Alarm":
+                    self.state = "Idle"
+            self._emit("[MSG:Caution: Unlocked]")
+            return "ok"
+
+        if line == "$H":
+            if not self.settings.get(22, 0):
+                return "error:5"
+            return self._home(gen)
+
+        if line == "$G":
+            self._emit(f"[GC:G{self._sim.motion_mode} G54 G17 G21 {'G90' if self._sim.absolute else 'G91'} G94 M5 "
+                       f"{'M8' if self.coolant else 'M9'} T0 F{self._sim.feed_mm_min:.0f} S0]")
+            return "ok"
+
+        m = re.match(r"^\$(\d+)=([-+]?\d*\.?\d+)$", line)
+        if m:
+            if self.state not in ("Idle", "Alarm"):
+                return "error:8"
+            key, value = int(m.group(1)), float(m.group(2))
+            self.settings[key] = value
+            self._sim.profile = MachineProfile.from_settings(self.settings)
+            return "ok"
+
+        return "error:3"
+
+    def _home(self, gen: int) -> Optional[str]:
+        if self.state != "Alarm" and not self._wait_sync(gen):
+            return None
+        with self._cond:
+            self.state = "Home"
+            start = list(self.mpos)
+        sim = MotionSimulator(self._sim.profile)
+        sim.pos = start
+        secs = sim.execute("G0 X0 Y0 Z0")
+        if self._stop.wait(secs * self.time_scale):
+            return None
+        with self._cond:
+            if gen != self._reset_gen:
+                return None
+            self.mpos = [0.0, 0.0, 0.0]
+            self._sim.pos = [0.0, 0.0, 0.0]
+            self.state = "Idle"
+        return "ok"
+
+    # hareket: planner'daki bloklari sureleriyle calistir
+    def _motion_loop(self) -> None:
+        tick = 0.005
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._planner and not self._stop.is_set():
+                    self._cond.wait(0.1)
+                if self._stop.is_set():
+                    return
+                block = self._planner[0]
+                gen = self._reset_gen
+
+            total = max(block.duration_s * self.time_scale, 0.0)
+            elapsed = 0.0
+            while elapsed < total:
+                if self._stop.wait(tick):
+                    return
+                with self._cond:
+                    if gen != self._reset_gen or self.state == "Alarm":
+                        break
+                    if self.hold:
+                        self.feed_now = 0.0
+                        continue
+                    elapsed = min(total, elapsed + tick)
+                    frac = elapsed / total if total > 0 else 1.0
+                    self.mpos = [s + (t - s) * frac for s, t in zip(block.start, block.target)]
+                    self.feed_now = block.feed_mm_min
+
+            with self._cond:
+                if gen != self._reset_gen or self.state == "Alarm":
+                    continue
+                self.mpos = list(block.target)
+                if self._planner and self._planner[0] is block:
+                    self._planner.popleft()
+                if not self._planner:
+                    self.feed_now = 0.0
+                    if self.state == "Run":
+                        self.state = "Idle"
+                self._cond.notify_all()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="GRBL 1.1 emulator on a pseudo-terminal")
+    ap.add_argument("--link", default="/tmp/ttyGRBL", help="symlink to the pty slave ('' = none)")
+    ap.add_argument("--settings", help="file with GRBL `$$` output")
+    ap.add_argument("--time-scale", type=float, default=1.0, help="motion time multiplier (0 = instant)")
+    ap.add_argument("--baud", type=int, default=115200, help="emulated line rate (0 = unlimited)")
+    args = ap.parse_args()
+
+    settings: Dict[int, float] = {}
+    if args.settings:
+        with open(args.settings, "r", encoding="utf-8") as f:
+            for line in f:
+                m = re.match(r"^\s*\$(\d+)\s*=\s*([-+]?\d*\.?\d+)", line)
+                if m:
+                    settings[int(m.group(1))] = float(m.group(2))
+
+    emu = GrblEmulator(link=args.link or None, settings=settings, time_scale=args.time_scale, baudrate=args.baud)
+    emu.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emu.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+File Name       : pty_port.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Pseudo-terminal pair used by the hardware emulators (Linux / macOS only).
+The emulator owns the master side; the slave path is opened by the backend
+services with pyserial exactly like a USB serial port
+(e.g. PNP_ROBOT_PORT=/tmp/ttyGRBL).
+"""
+
+from __future__ import annotations
+
+import os
+import pty
+import select
+import threading
+import time
+import tty
+
+
+class PtyPort:
+    def __init__(self, link: str | None = None, baudrate: int = 0):
+        self.master_fd, self._slave_fd = pty.openpty()
+        # raw: echo yok, \n -> \r\n cevirisi yok (gercek usb-serial gibi)
+        tty.setraw(self._slave_fd)
+        self.slave_path = os.ttyname(self._slave_fd)
+
+        # 0 => hiz siniri yok; >0 => 8N1, byte basina 10 bit gecikme
+        self.byte_time_s = 10.0 / baudrate if baudrate > 0 else 0.0
+        self._write_lock = threading.Lock()
+
+        self.link = link
+        if link:
+            try:
+                if os.path.islink(link):
+                    os.unlink(link)
+                os.symlink(self.slave_path, link)
+            except OSError as e:
+                print(f"[PTY] Could not create link {link}: {e}")
+                self.link = None
+
+    @property
+    def path(self) -> str:
+        return self.link or self.slave_path
+
+    def read(self, timeout: float = 0.1) -> bytes:
+        """Bytes written by the backend (empty on timeout)."""
+        ready, _, _ = select.select([self.master_fd], [], [], timeout)
+        if not ready:
+            return b""
+        try:
+            data = os.read(self.master_fd, 1024)
+        except OSError:
+            return b""
+        if data and self.byte_time_s:
+            time.sleep(len(data) * self.byte_time_s)
+        return data
+
+    def write(self, data: bytes) -> None:
+        with self._write_lock:
+            if self.byte_time_s:
+                time.sleep(len(data) * self.byte_time_s)
+            try:
+                os.write(self.master_fd, data)
+            except OSError:
+                pass
+
+    def write_line(self, text: str) -> None:
+        self.write((text + "\r\n").encode("ascii", errors="replace"))
+
+    def close(self) -> None:
+        if self.link:
+            try:
+                os.unlink(self.link)
+            except OSError:
+                pass
+        for fd in (self.master_fd, self._slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
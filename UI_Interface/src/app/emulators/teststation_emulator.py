@@ -0,0 +1,255 @@
+"""
+File Name       : teststation_emulator.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Test station Arduino emulator on a pseudo-terminal.
+Speaks the text protocol ArduinoService.measure() parses:
+
+    'b' -> measurement
+    resistor      : ADC=...  Vout=... V  R2=... Ohm|kOhm      + "Olcum bitti"
+    forward diode : ADC=...  Vout=... V  R2=... Ohm   Diyot yonu DUZ  + "Olcum bitti"
+    reversed diode: (servo delay) "Diyot yonu TERS"  (firmware returns, no "Olcum bitti")
+    no part       : "Gecerli olcum alinamadi" + "Olcum bitti"
+
+Readings come from a voltage divider (R1 fixed, DUT as R2, 10-bit ADC) with
+gaussian ADC noise. Latency, servo delay, noise and faults are configurable:
+    timeout  : no answer at all
+    invalid  : "Gecerli olcum alinamadi"
+    garbage  : line noise before the answer
+    partial  : reading without "Olcum bitti" (parser runs into its deadline)
+
+Usage (from UI_Interface/):
+    python -m src.app.emulators.teststation_emulator --link /tmp/ttyTEST --parts resistor:4700,diode,diode_rev
+    DEMO_MODE=false PNP_TESTSTATION_PORT=/tmp/ttyTEST uvicorn src.app.main:app
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from src.app.emulators.pty_port import PtyPort
+
+
+PART_KINDS = ("resistor", "diode", "diode_rev", "none")
+FAULT_KINDS = ("timeout", "invalid", "garbage", "partial")
+
+VCC = 5.0
+ADC_MAX = 1023.0
+DIODE_VF = 0.65
+
+
+def parse_parts(spec: str) -> List[Tuple[str, float]]:
+    """'resistor:4700,diode,diode_rev' -> [("resistor", 4700.0), ("diode", 0.0), ...]"""
+    parts: List[Tuple[str, float]] = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        kind, _, value = item.partition(":")
+        if kind not in PART_KINDS:
+            raise ValueError(f"Unknown part kind: {kind} (use {', '.join(PART_KINDS)})")
+        parts.append((kind, float(value) if value else 4700.0))
+    return parts or [("resistor", 4700.0)]
+
+
+class TestStationEmulator:
+    def __init__(
+        self,
+        link: str | None = None,
+        parts: Optional[List[Tuple[str, float]]] = None,
+        r1_ohm: float = 10000.0,
+        latency_s: float = 0.3,
+        reverse_delay_s: float = 5.0,
+        noise_adc: float = 1.0,
+        fault_rate: float = 0.0,
+        faults: Tuple[str, ...] = FAULT_KINDS,
+        seed: Optional[int] = None,
+        time_scale: float = 1.0,
+        baudrate: int = 0,
+    ):
+        self.port = PtyPort(link=link, baudrate=baudrate)
+        self.parts = list(parts or [("resistor", 4700.0)])
+        self.r1_ohm = r1_ohm
+        self.latency_s = latency_s
+        self.reverse_delay_s = reverse_delay_s
+        self.noise_adc = noise_adc
+        self.fault_rate = fault_rate
+        self.faults = tuple(f for f in faults if f in FAULT_KINDS) or FAULT_KINDS
+        self.time_scale = time_scale
+        self._rng = random.Random(seed)
+
+        self._lock = threading.Lock()
+        self._requests = 0              # seri buffer'da bekleyen 'b' sayisi
+        self._wake = threading.Event()
+        self._next_fault: Optional[str] = None
+        self._part_idx = 0
+        self.measurements = 0
+
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def path(self) -> str:
+        return self.port.path
+
+    def start(self) -> "TestStationEmulator":
+        for target in (self._serial_loop, self._firmware_loop):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+        print(f"[TEST_EMU] Listening on {self.path}")
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout=1)
+        self.port.close()
+
+    def set_part(self, kind: str, value_ohm: float = 4700.0) -> None:
+        """Put a single part on the probes (replaces the part cycle)."""
+        if kind not in PART_KINDS:
+            raise ValueError(f"Unknown part kind: {kind}")
+        with self._lock:
+            self.parts = [(kind, value_ohm)]
+            self._part_idx = 0
+
+    def inject_fault(self, kind: str) -> None:
+        """Force a fault on the next measurement."""
+        if kind not in FAULT_KINDS:
+            raise ValueError(f"Unknown fault: {kind}")
+        with self._lock:
+            self._next_fault = kind
+
+    # seri: arduino loop() 'b' karakterini okuyor, digerleri yok sayiliyor
+    def _serial_loop(self) -> None:
+        while not self._stop.is_set():
+            data = self.port.read(timeout=0.05)
+            if not data:
+                continue
+            count = data.count(b"b")
+            if count:
+                with self._lock:
+                    self._requests += count
+                self._wake.set()
+
+    def _firmware_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(0.1)
+            with self._lock:
+                if self._requests == 0:
+                    self._wake.clear()
+                    continue
+                self._requests -= 1
+                part = self.parts[self._part_idx % len(self.parts)]
+                self._part_idx += 1
+                fault = self._next_fault
+                self._next_fault = None
+
+            if fault is None and self.fault_rate > 0 and self._rng.random() < self.fault_rate:
+                fault = self._rng.choice(self.faults)
+
+            self._measure(part, fault)
+            self.measurements += 1
+
+    def _sleep(self, seconds: float) -> bool:
+        """False if the emulator is stopping."""
+        return not self._stop.wait(max(0.0, seconds) * self.time_scale)
+
+    def _reading(self, vout: float) -> Tuple[float, float, float]:
+        """Noisy ADC reading -> (adc, vout, r2) like the firmware computes it."""
+        adc = vout / VCC * ADC_MAX + self._rng.gauss(0.0, self.noise_adc)
+        adc = min(ADC_MAX, max(0.0, adc))
+        vout = adc * VCC / ADC_MAX
+        r2 = self.r1_ohm * vout / (VCC - vout) if vout < VCC else float("inf")
+        return adc, vout, r2
+
+    def _reading_line(self, adc: float, vout: float, r2: float) -> str:
+        r_txt = f"R2={r2 / 1000.0:.3f} kOhm" if r2 >= 1000.0 else f"R2={r2:.1f} Ohm"
+        return f"ADC={adc:.1f}  Vout={vout:.4f} V  {r_txt}"
+
+    def _measure(self, part: Tuple[str, float], fault: Optional[str]) -> None:
+        kind, value = part
+        # olcum suresi (+ kucuk titresim)
+        if not self._sleep(self.latency_s * self._rng.uniform(0.9, 1.1)):
+            return
+
+        if fault == "timeout":
+            return
+        if fault == "garbage":
+            noise = bytes(self._rng.randrange(32, 127) for _ in range(self._rng.randint(3, 20)))
+            self.port.write(b"\xff" + noise + b"\r\n")
+        if fault == "invalid" or kind == "none":
+            self.port.write_line("Gecerli olcum alinamadi")
+            self.port.write_line("Olcum bitti")
+            return
+
+        if kind == "diode_rev":
+            # acik devre: servo diyotu ceviriyor, firmware sonucu yazip donuyor
+            if not self._sleep(self.reverse_delay_s):
+                return
+            self.port.write_line("Diyot yonu TERS")
+            return
+
+        if kind == "diode":
+            line = self._reading_line(*self._reading(DIODE_VF)) + "   Diyot yonu DUZ"
+        else:
+            vout = VCC * value / (self.r1_ohm + value)
+            line = self._reading_line(*self._reading(vout))
+
+        self.port.write_line(line)
+        if fault == "partial":
+            return
+        self.port.write_line("Olcum bitti")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Test station Arduino emulator on a pseudo-terminal")
+    ap.add_argument("--link", default="/tmp/ttyTEST", help="symlink to the pty slave ('' = none)")
+    ap.add_argument("--parts", default="resistor:4700",
+                    help="part cycle, e.g. resistor:4700,diode,diode_rev,none")
+    ap.add_argument("--r1", type=float, default=10000.0, help="divider reference resistor (Ohm)")
+    ap.add_argument("--latency", type=float, default=0.3, help="measurement time (s)")
+    ap.add_argument("--reverse-delay", type=float, default=5.0, help="servo delay for reversed diodes (s)")
+    ap.add_argument("--noise", type=float, default=1.0, help="ADC noise sigma (counts)")
+    ap.add_argument("--fault-rate", type=float, default=0.0, help="probability of a fault per measurement")
+    ap.add_argument("--faults", default=",".join(FAULT_KINDS), help="fault kinds to draw from")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--time-scale", type=float, default=1.0, help="delay multiplier (0 = instant)")
+    ap.add_argument("--baud", type=int, default=115200, help="emulated line rate (0 = unlimited)")
+    args = ap.parse_args()
+
+    emu = TestStationEmulator(
+        link=args.link or None,
+        parts=parse_parts(args.parts),
+        r1_ohm=args.r1,
+        latency_s=args.latency,
+        reverse_delay_s=args.reverse_delay,
+        noise_adc=args.noise,
+        fault_rate=args.fault_rate,
+        faults=tuple(f.strip() for f in args.faults.split(",")),
+        seed=args.seed,
+        time_scale=args.time_scale,
+        baudrate=args.baud,
+    )
+    emu.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emu.stop()
+
+
+if __name__ == "__main__":
+    main()
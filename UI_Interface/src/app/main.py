@@ -3,7 +3,7 @@ File Name       : main.py
 Author          : Eda
 Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
 Created Date    : 2026-02-01
-Last Modified   : 2026-03-05
+Last Modified   : 2026-10-17
 
 Description:
 This file is the main entry point of the backend application.
@@ -30,15 +30,51 @@ from fastapi.templating import Jinja2Templates
 from src.app.core.config import (
     DEMO_MODE, 
     CAMERA_DEVICE_INDEX, 
+    CAMERA_THREADED,
+    CAMERA_MAX_FPS,
     ROBOT_PORT, 
+    ROBOT_BAUDRATE,
+    GRBL_STREAMING,
+    MOTION_WAIT,
+    MOTION_TIMEOUT_S,
+    DEMO_MOTION_SIM,
+    DEMO_TIME_SCALE,
+    RUNNER_PIPELINED,
+    RUNNER_WORKERS,
+    OPTIMIZE_ORDER,
     TESTSTATION_PORT, 
     TESTSTATION_BAUDRATE,
+    TEST_HISTORY_SIZE,
+    TEST_NOMINAL_OHM,
+    TEST_NOMINALS,
+    TEST_TOL_PCT,
+    STATUS_STREAM_MAX_HZ,
+    LOG_MAX,
+    LOG_FILE,
+    LOG_FILE_MAX_BYTES,
+    LOG_FILE_BACKUPS,
+    HTTP_COMPRESSION,
+    HTTP_COMPRESS_MIN_BYTES,
+    CAMERA_WORKERS,
+    VISION_WORKERS,
+    SERIAL_WORKERS,
+    EXECUTOR_MAX_PENDING,
+    VISION_WORKER,
+    VISION_WORKER_SLOTS,
+    VISION_SHM_BYTES,
+    VISION_WORKER_TIMEOUT_S,
+    VISION_WORKER_MAX_OVERLAY,
+    VISION_WORKER_CPUS,
 )
+from src.app.core.compression import CompressionMiddleware, compression_backend
+from src.app.core.responses import JSON_BACKEND
+from src.app.core.executors import init_executors, shutdown_executors
 
 # router baglama
 from src.app.routers import status
 from src.app.routers import commands
 from src.app.routers import camera
+from src.app.routers import test_station
 # from src.app.routers import plan
 from src.app.routers import config as config_router
 
@@ -46,10 +82,15 @@ from src.app.routers import config as config_router
 # service baglama - tset amacli
 from src.app.services.robot_service import init_robot_service
 from src.app.services.arduino_service import init_arduino_service
+from src.app.services.measurement_history import init_measurement_history
 # from src.app.services.plan_runner import init_plan_runner
 from src.app.services.camera_service import init_camera_service
 from src.app.services.vision_service import init_vision_service
+from src.app.services.vision_worker import init_vision_worker, stop_vision_worker
 from src.app.services.gcode_runner import init_gcode_runner
+from src.app.services.status_stream import init_status_stream_hub
+from src.app.services.log_store import init_log_store
+from src.app.core.state import SYSTEM_STATE
 
 robot_service = None
 arduino_service = None
@@ -62,6 +103,13 @@ gcode_runner = None
 ###
 
 
+def _publish_log_seq(record: dict) -> None:
+    # dinleyiciler log kilidi disinda calisir: es zamanli append'lerde sira karisabilir,
+    # last_seq sadece ileri gider (edit bolum kilidini tutar)
+    with SYSTEM_STATE.edit("log") as section:
+        section["last_seq"] = max(section.get("last_seq", 0), record["seq"])
+
+
 # service baglama - test amacli
 # lifespan (startup/shutdown)
 @asynccontextmanager
@@ -73,15 +121,66 @@ async def lifespan(app: FastAPI):
     print(f"SMD Pick&Place Machine Backend Starting")
     print(f"{'='*60}")
     print(f"Mode: {'DEMO' if DEMO_MODE else 'REAL'}")
+    print(f"JSON: {JSON_BACKEND} | Compression: {compression_backend(HTTP_COMPRESSION)}")
     print(f"{'='*60}\n")
+
+    log_store = init_log_store(
+        max_entries=LOG_MAX,
+        file_path=LOG_FILE or None,
+        file_max_bytes=LOG_FILE_MAX_BYTES,
+        file_backups=LOG_FILE_BACKUPS,
+    )
+    # her log kaydi "log" bolumunun versiyonunu artirir
+    log_store.add_listener(_publish_log_seq)
     
+    # cihaz executor'lari (async router'lar bloklayan isi buraya atar)
+    init_executors(
+        camera_workers=CAMERA_WORKERS,
+        vision_workers=VISION_WORKERS,
+        serial_workers=SERIAL_WORKERS,
+        max_pending=EXECUTOR_MAX_PENDING,
+    )
+
     # servisleri initialize etme
-    robot_service = init_robot_service(demo_mode=DEMO_MODE, port=ROBOT_PORT)
+    robot_service = init_robot_service(
+        demo_mode=DEMO_MODE,
+        port=ROBOT_PORT,
+        baudrate=ROBOT_BAUDRATE,
+        streaming=GRBL_STREAMING,
+        motion_wait=MOTION_WAIT,
+        motion_timeout_s=MOTION_TIMEOUT_S,
+        demo_motion_sim=DEMO_MOTION_SIM,
+        demo_time_scale=DEMO_TIME_SCALE,
+    )
+    init_measurement_history(
+        capacity=TEST_HISTORY_SIZE,
+        nominal_ohm=TEST_NOMINAL_OHM,
+        tol_pct=TEST_TOL_PCT,
+        nominals=TEST_NOMINALS,
+    )
     arduino_service = init_arduino_service(demo_mode=DEMO_MODE, port=TESTSTATION_PORT, baudrate=TESTSTATION_BAUDRATE)
-    camera_service = init_camera_service(demo_mode=DEMO_MODE, device_index=CAMERA_DEVICE_INDEX)
+    camera_service = init_camera_service(demo_mode=DEMO_MODE, device_index=CAMERA_DEVICE_INDEX, max_fps=CAMERA_MAX_FPS)
     # plan_runner = init_plan_runner()
-    vision_service = init_vision_service()
-    gcode_runner = init_gcode_runner()
+    # worker aciksa model ana surece yuklenmez
+    vision_service = init_vision_service(load_model=not VISION_WORKER)
+    if VISION_WORKER:
+        worker = init_vision_worker(
+            slots=VISION_WORKER_SLOTS,
+            slot_bytes=VISION_SHM_BYTES,
+            cpus=VISION_WORKER_CPUS,
+            max_low_pending=VISION_WORKER_MAX_OVERLAY,
+        )
+        if worker is not None:
+            vision_service.attach_worker(worker, timeout_s=VISION_WORKER_TIMEOUT_S)
+        else:
+            print("[STARTUP] Vision worker failed, using in-process inference")
+            vision_service.ensure_local_model()
+    gcode_runner = init_gcode_runner(
+        pipelined=RUNNER_PIPELINED,
+        workers=RUNNER_WORKERS,
+        optimize_order=OPTIMIZE_ORDER,
+    )
+    init_status_stream_hub(max_rate_hz=STATUS_STREAM_MAX_HZ)
 
     # real:
     if not DEMO_MODE:
@@ -111,6 +210,8 @@ async def lifespan(app: FastAPI):
     print("\n[STARTUP] Starting background services...")
     robot_service.start_polling()
     arduino_service.start_polling()
+    if CAMERA_THREADED:
+        camera_service.start_capture()
     
     print("\n All services started successfully\n")
     
@@ -126,6 +227,12 @@ async def lifespan(app: FastAPI):
 
     if gcode_runner is not None:
         gcode_runner.stop()
+
+    if camera_service is not None:
+        camera_service.stop_capture()
+
+    shutdown_executors()
+    stop_vision_worker()
     
     if not DEMO_MODE:
         if robot_service is not None:
@@ -145,6 +252,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# cevap sikistirma (esik ustu json/html; SSE ve MJPEG haric)
+app.add_middleware(CompressionMiddleware, mode=HTTP_COMPRESSION, minimum_size=HTTP_COMPRESS_MIN_BYTES)
+
 # static dosyalar ui_files/static klasorunden geliyor : ui_files/static == localhost:8000/static/... seklinde tarayicidan erisilecek
 app.mount(
     "/static", 
@@ -177,5 +287,6 @@ def index(request: Request):
 app.include_router(status.router)
 app.include_router(commands.router)
 app.include_router(camera.router)
+app.include_router(test_station.router)
 # app.include_router(plan.router)
 app.include_router(config_router.router)
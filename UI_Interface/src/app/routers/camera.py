@@ -3,22 +3,27 @@ File Name       : camera.py
 Author          : Eda
 Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
 Created Date    : 2026-02-04
-Last Modified   : 2026-02-25
+Last Modified   : 2026-10-17
 
 Description:
 This router provides camera endpoints for the web UI.
-Currently supports a snapshot endpoint returning a JPEG image.
+Supports a snapshot endpoint returning a JPEG image, an overlay endpoint
+and an MJPEG (multipart/x-mixed-replace) stream shared by all viewers.
+Routes are async: capture / encode run on the camera executor and detection
+on the vision executor (src/app/core/executors.py), not in the threadpool.
 """
 
+import asyncio
+import time
+
 from fastapi import APIRouter, Response
+from fastapi.responses import StreamingResponse
 import src.app.services.camera_service as cam_mod
-from src.app.routers.status import SYSTEM_STATE
+from src.app.core.state import SYSTEM_STATE
 
 from fastapi import HTTPException, Query, Header, Depends
 from src.app.core.config import API_KEY, DEMO_MODE
-
-import numpy as np
-import cv2
+from src.app.core.executors import ExecutorBusy, get_executor, run_on
 
 router = APIRouter(
     prefix="/api", 
@@ -35,23 +40,32 @@ def _get_cam():
 
 def _set_camera_conn(status: bool):
     # baglanti: {"status": bool, "port": str|None}
-    cam = SYSTEM_STATE["connections"].get("camera")
-    if not isinstance(cam, dict):
-        SYSTEM_STATE["connections"]["camera"] = {"status": False, "port": None}
+    with SYSTEM_STATE.edit("connections") as conn:
+        cam = conn.get("camera")
+        if not isinstance(cam, dict):
+            cam = conn["camera"] = {"status": False, "port": None}
 
-    SYSTEM_STATE["connections"]["camera"]["status"] = bool(status)
+        cam["status"] = bool(status)
 
-    # port: demo’da index yazalım, real’da da aynı
-    svc = _get_cam()
-    if svc is not None:
-        mode = "DEMO" if getattr(svc, "demo_mode", True) else "REAL"
-        SYSTEM_STATE["connections"]["camera"]["port"] = f"{mode} camera"
-        # SYSTEM_STATE["connections"]["camera"]["port"] = f"index {getattr(svc, 'device_index', 0)}"
-    else:
-        SYSTEM_STATE["connections"]["camera"]["port"] = None
+        # port: demo’da index yazalım, real’da da aynı
+        svc = _get_cam()
+        if svc is not None:
+            mode = "DEMO" if getattr(svc, "demo_mode", True) else "REAL"
+            cam["port"] = f"{mode} camera"
+            # cam["port"] = f"index {getattr(svc, 'device_index', 0)}"
+        else:
+            cam["port"] = None
 
 
-def require_camera_auth(token: str = Query(default=""), x_api_key: str | None = Header(default=None, alias="X-API-Key"),) -> None:
+async def _run(device: str, fn, *args, **kwargs):
+    # executor dolu -> 503, istek kuyrukta birikmesin
+    try:
+        return await run_on(device, fn, *args, **kwargs)
+    except ExecutorBusy:
+        raise HTTPException(status_code=503, detail=f"{device.capitalize()} busy", headers={"Retry-After": "1"})
+
+
+async def require_camera_auth(token: str = Query(default=""), x_api_key: str | None = Header(default=None, alias="X-API-Key"),) -> None:
     """
     DEMO mode:
         Accept either ?token= query parameter OR X-API-Key header.
@@ -72,13 +86,13 @@ def require_camera_auth(token: str = Query(default=""), x_api_key: str | None =
 
 
 @router.get("/camera/snapshot", dependencies=[Depends(require_camera_auth)])
-def snapshot():
+async def snapshot():
     svc = _get_cam()
     if svc is None:
         _set_camera_conn(False)
         raise HTTPException(status_code=503, detail="Camera service not initialized")
 
-    jpg = svc.get_jpeg()
+    jpg = await _run("camera", svc.get_jpeg)
     if jpg is None:
         _set_camera_conn(False)
         return Response(content=b"", status_code=503)
@@ -86,8 +100,87 @@ def snapshot():
     _set_camera_conn(True)
     return Response(content=jpg, media_type="image/jpeg")
 
+async def _mjpeg_frames(svc, fps: float, width: int):
+    """Multipart MJPEG generator: one shared encode per frame, per-client FPS cap."""
+    min_period = 1.0 / fps
+    last_id = 0
+    misses = 0
+
+    # add/remove_viewer grabber thread'i baslatip durdurabilir (join) - executor'da
+    await run_on("camera", svc.add_viewer, bounded=False)
+    try:
+        while True:
+            t0 = time.monotonic()
+            # frame beklemesi async: executor worker'i bekleyerek tutulmaz
+            latest = await svc.wait_for_frame_async(after_id=last_id, timeout=2.0)
+            if latest is None:
+                # kamera cevap vermiyor - bir sure sonra stream'i kapat
+                misses += 1
+                if misses >= 5:
+                    _set_camera_conn(False)
+                    return
+                continue
+
+            frame_id, _, frame = latest
+            # baska izleyici bu frame'i zaten encode ettiyse executor'a gerek yok
+            item = svc.peek_stream_jpeg(frame_id, max_width=width)
+            if item is None:
+                try:
+                    item = await run_on("camera", svc.encode_stream_jpeg, frame_id, frame, max_width=width)
+                except ExecutorBusy:
+                    # backpressure: kamera saglikli, bu frame atlanir (miss sayilmaz)
+                    await asyncio.sleep(min_period)
+                    continue
+                if item is None:
+                    misses += 1
+                    if misses >= 5:
+                        _set_camera_conn(False)
+                        return
+                    continue
+
+            misses = 0
+            last_id, jpg = item
+            yield (
+                b"--frame\r\n"
+                b"Content-Type: image/jpeg\r\n"
+                + f"Content-Length: {len(jpg)}\r\n\r\n".encode("ascii")
+                + jpg
+                + b"\r\n"
+            )
+
+            # istemci basina fps siniri
+            wait = min_period - (time.monotonic() - t0)
+            if wait > 0:
+                await asyncio.sleep(wait)
+    finally:
+        # iptal edilmis generator'da await edilemez: beklemeden gonder
+        get_executor("camera").submit(svc.remove_viewer)
+
+
+@router.get("/camera/stream", dependencies=[Depends(require_camera_auth)])
+async def stream(
+    fps: float = Query(default=10.0, gt=0, le=30),
+    width: int = Query(default=0, ge=0, le=4096),
+):
+    """
+    MJPEG stream (multipart/x-mixed-replace).
+    fps   : max frames per second sent to this client
+    width : downscale to this width (0 = full resolution)
+    """
+    svc = _get_cam()
+    if svc is None:
+        _set_camera_conn(False)
+        raise HTTPException(status_code=503, detail="Camera service not initialized")
+
+    _set_camera_conn(True)
+    return StreamingResponse(
+        _mjpeg_frames(svc, fps, width),
+        media_type="multipart/x-mixed-replace; boundary=frame",
+        headers={"Cache-Control": "no-cache, no-store"},
+    )
+
 @router.post("/camera/restart", dependencies=[Depends(require_camera_auth)])
-def restart_camera():
+async def restart_camera():
     # restart endpoint
     try:
         svc = _get_cam()
@@ -95,8 +188,7 @@ def restart_camera():
             _set_camera_conn(False)
             raise HTTPException(status_code=503, detail="Camera service not initialized")
 
-        svc.close()
-        ok = svc.open()
+        ok = await _run("camera", _reopen, svc)
         _set_camera_conn(ok)
 
         if not ok:
@@ -110,9 +202,26 @@ def restart_camera():
         _set_camera_conn(False)
         raise HTTPException(status_code=500, detail=f"Camera restart error: {e}")
 
+def _reopen(svc) -> bool:
+    svc.close()
+    return svc.open()
+
+
+def _render_overlay(svc, vision_service, frame) -> bytes | None:
+    # detect + draw
+    if vision_service is None or not vision_service.is_ready():
+        # model yoksa raw don - bos kalmamasi icin
+        out = frame
+    else:
+        boxes, scores, class_ids = vision_service.detect(frame)
+        out = vision_service.draw_overlay(frame, boxes, scores, class_ids)
+
+    return svc.encode_jpeg(out)
+
+
 # camera overlay'i icin yeni endpoint
 @router.get("/camera/overlay", dependencies=[Depends(require_camera_auth)])
-def overlay():
+async def overlay():
     from src.app.services.vision_service import vision_service
     
     svc = _get_cam()
@@ -120,31 +229,16 @@ def overlay():
         _set_camera_conn(False)
         raise HTTPException(status_code=503, detail="Camera service not initialized")
 
-    jpg = svc.get_jpeg()
-    if jpg is None:
-        _set_camera_conn(False)
-        return Response(content=b"", status_code=503)
-
-    # jpeg -> frame
-    arr = np.frombuffer(jpg, dtype=np.uint8)
-    frame = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+    # ham frame: detector JPEG bozulmasi gormesin, tek encode yeterli
+    frame = await _run("camera", svc.get_frame)
     if frame is None:
         _set_camera_conn(False)
         return Response(content=b"", status_code=503)
 
-    # detect + draw
-    if vision_service is None or not vision_service.is_ready():
-        # model yoksa raw don - bos kalmamasi icin
-        _set_camera_conn(True)
-        return Response(content=jpg, media_type="image/jpeg")
-
-    dets = vision_service.detect(frame)
-    overlay_img = vision_service.draw_overlay(frame, dets)
-
-    ok, buf = cv2.imencode(".jpg", overlay_img)
-    if not ok:
+    jpg = await _run("vision", _render_overlay, svc, vision_service, frame)
+    if jpg is None:
         _set_camera_conn(True)
-        return Response(content=jpg, media_type="image/jpeg")
+        return Response(content=b"", status_code=503)
 
     _set_camera_conn(True)
-    return Response(content=buf.tobytes(), media_type="image/jpeg")
\ No newline at end of file
+    return Response(content=jpg, media_type="image/jpeg")
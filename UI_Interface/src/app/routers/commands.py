@@ -3,12 +3,14 @@ File Name       : commands.py
 Author          : Eda
 Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
 Created Date    : 2026-02-01
-Last Modified   : 2026-02-04
+Last Modified   : 2026-10-17
 
 Description:
 This module defines the /api/commands endpoint.
 It receives control commands from the web UI (Start, Stop, Reset)
 and updates the system state accordingly.
+Handlers are async; runner control (which can block on thread joins and
+serial writes) runs on the serial executor, one command at a time.
 """
 
 from fastapi import APIRouter
@@ -18,7 +20,7 @@ from datetime import datetime
 
 
 # status router'inin icindeki SYSTEM_STATE'i kullaniyoruz
-#from src.app.routers.status import SYSTEM_STATE
+#from src.app.core.state import SYSTEM_STATE
 
 # artik main'de uretiliyor
 #from src.app.services.plan_runner import plan_runner
@@ -27,6 +29,9 @@ from datetime import datetime
 from fastapi import Depends
 from src.app.security import require_api_key
 
+from src.app.services.log_store import log
+from src.app.core.executors import ExecutorBusy, run_on
+
 # tum endpointler
 router = APIRouter(
     prefix="/api/commands",
@@ -42,20 +47,22 @@ class CommandRequest(BaseModel):
 
 
 # modul ici icin
-def _log(msg: str) -> None:
-    """Append a timestamped message to SYSTEM_STATE logs."""
-    from src.app.routers.status import SYSTEM_STATE
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    SYSTEM_STATE["logs"].append(f"[{ts}] {msg}")
+def _log(msg: str, level: str = "INFO") -> None:
+    """Append a message to the central log store."""
+    log(msg, level=level, source="commands")
+
+async def _serial(fn, *args):
+    # start/stop/reset sirayla: reset'in join'i bitmeden start calismasin
+    try:
+        return await run_on("serial", fn, *args)
+    except ExecutorBusy:
+        raise HTTPException(status_code=503, detail="Serial executor busy", headers={"Retry-After": "1"})
 
-    # log sinirlandirmasi : son 300 satir
-    if len(SYSTEM_STATE["logs"]) > 300:
-        SYSTEM_STATE["logs"] = SYSTEM_STATE["logs"][-300:]
 
 # endpoint : POST
 # CommandRequest gelen veri JSON -> Python Object
 @router.post("/")
-def post_command(cmd: CommandRequest):
+async def post_command(cmd: CommandRequest):
     """
     Receive a command from the UI and update system state.
 
@@ -64,9 +71,9 @@ def post_command(cmd: CommandRequest):
         - stop
         - reset
         - set_test_mode (payload: {"mode": "resistor"|"diode"|"none"})
-        - test_measure
+        - test_measure (returns a job id; result via GET /api/commands/jobs/{job_id})
     """
-    from src.app.routers.status import SYSTEM_STATE
+    from src.app.core.state import SYSTEM_STATE
     from src.app.main import gcode_runner 
 
     name = (cmd.name or "").strip().lower()
@@ -77,26 +84,26 @@ def post_command(cmd: CommandRequest):
 
     # START
     if name == "start":
-        gcode_runner.start()
+        await _serial(gcode_runner.start)
         _log("Command received: START")
         return {"ok": True, "message": "Program started/resumed"}
 
     # STOP
     if name == "stop":
-        gcode_runner.stop()
+        await _serial(gcode_runner.stop)
         _log("Command received: STOP")
         return {"ok": True, "message": "Program paused"}
 
     # RESET
     if name == "reset":
-        gcode_runner.reset()
+        await _serial(gcode_runner.reset)
         _log("Command received: RESET")
         return {"ok": True, "message": "Program reset"}
 
     # TEST MODE
     if name == "set_test_mode":
         mode = str(payload.get("mode", "none")).lower()
-        SYSTEM_STATE["teststation"]["mode"] = mode
+        SYSTEM_STATE.update("teststation", mode=mode)
         _log(f"Command received: SET_TEST_MODE ({mode})")
         return {"ok": True, "message": f"Test mode set to {mode}"}
     
@@ -105,16 +112,38 @@ def post_command(cmd: CommandRequest):
         if arduino_service is None:
             raise HTTPException(status_code=500, detail="Arduino service not initialized")
 
-        data = arduino_service.measure()
-        SYSTEM_STATE["teststation"]["mode"] = data.get("mode", "none")
-        SYSTEM_STATE["teststation"]["last_adc"] = data.get("value_text", "-")   # eskiden adc'ydi artik VALUE TEXT
-        SYSTEM_STATE["teststation"]["last_voltage_v"] = data.get("voltage", 0.0)
-        SYSTEM_STATE["teststation"]["last_result"] = data.get("result", "UNKNOWN")
-        SYSTEM_STATE["teststation"]["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        def on_done(data: dict) -> None:
+            SYSTEM_STATE.update(
+                "teststation",
+                mode=data.get("mode", "none"),
+                last_adc=data.get("value_text", "-"),  # eskiden adc'ydi artik VALUE TEXT
+                last_voltage_v=data.get("voltage", 0.0),
+                last_result=data.get("result", "UNKNOWN"),
+                last_updated=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            )
+            _log(f"TEST_MEASURE done: {data.get('result', 'UNKNOWN')}")
+
+        # olcum arka planda: worker thread 10sn bloklanmasin
+        job_id = arduino_service.submit_measure_job(on_done=on_done)
+        job = arduino_service.get_job(job_id)
 
         _log("Command received: TEST_MEASURE")
-        return {"ok": True, "data": data}
+        return {"ok": True, "job_id": job_id, "status": job["status"] if job else "queued"}
 
     # Error : bilinmeyen bir komut
     _log(f"Unknown command received: {cmd.name}")
     return {"ok": False, "error": f"Unknown command: {cmd.name}"}
+
+
+# endpoint : GET - test_measure isinin durumu
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status and result of a test_measure job (queued | running | done | error)."""
+    from src.app.main import arduino_service
+    if arduino_service is None:
+        raise HTTPException(status_code=500, detail="Arduino service not initialized")
+
+    job = arduino_service.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return {"ok": True, "job": job}
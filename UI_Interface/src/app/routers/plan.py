@@ -15,16 +15,19 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List
 
-from src.app.routers.status import SYSTEM_STATE
+from src.app.core.state import SYSTEM_STATE
+from src.app.services.log_store import log
 
 # API key
 from fastapi import Depends
 from src.app.security import require_api_key
+from src.app.core.responses import FastJSONResponse
 
 router = APIRouter(
     prefix="/api",
     tags=["Plan"],
-    dependencies=[Depends(require_api_key)] # API key
+    dependencies=[Depends(require_api_key)], # API key
+    default_response_class=FastJSONResponse,
 )
 
 
@@ -50,11 +53,11 @@ def set_plan(req: PlanRequest):
             raise HTTPException(status_code=400, detail=f"Duplicate component in plan: {p}")
         seen_parts.add(p)
 
-    SYSTEM_STATE["plan"] = [item.model_dump() for item in req.items]
+    SYSTEM_STATE.set("plan", [item.model_dump() for item in req.items])
     # zaman eklentisi
-    SYSTEM_STATE["plan_received_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    SYSTEM_STATE.set("plan_received_at", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     
     # log
-    SYSTEM_STATE["logs"].append(f"[{SYSTEM_STATE['plan_received_at']}] Plan received: {len(req.items)} steps")
+    log(f"Plan received: {len(req.items)} steps", source="plan")
 
-    return {"ok": True, "count": len(req.items), "received_at": SYSTEM_STATE["plan_received_at"]}
+    return FastJSONResponse({"ok": True, "count": len(req.items), "received_at": SYSTEM_STATE["plan_received_at"]})
@@ -3,111 +3,245 @@ File Name       : status.py
 Author          : Eda
 Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
 Created Date    : 2026-02-01
-Last Modified   : 2026-02-04
+Last Modified   : 2026-10-17
 
 Description:
 This module defines the /api/status endpoint.
 It provides the current system status information to the web UI,
 including robot state, test station state, logs, and connection status.
+Logs come from the central log store (services/log_store.py);
+/api/status/logs returns only the records after a given sequence id.
+
+Polling is cheap when nothing changes: every answer carries an ETag built
+from the state version (If-None-Match -> 304), and ?since=<version> returns
+only the sections changed after that version plus the new log lines.
 
 This endpoint is periodically polled by the dashboard frontend.
+/api/status/stream pushes the same state as Server-Sent Events:
+one full snapshot, then only the changed sections and new log lines.
 """
 
-from fastapi import APIRouter
+import asyncio
+import bisect
+import threading
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 # API key
 from fastapi import Depends
 from src.app.security import require_api_key
+from src.app.core.responses import FastJSONResponse
+
+# sistem durumu: versiyonlu, thread-safe store (core/state.py)
+from src.app.core.state import SYSTEM_STATE
 
 # Router
 router = APIRouter(
     prefix="/api/status",
     tags=["Status"],
-    dependencies=[Depends(require_api_key)] # API key
+    dependencies=[Depends(require_api_key)], # API key
+    default_response_class=FastJSONResponse,
 )
 
-# sonra bak !!!!!!! - gecici veri
-# sistem durumu - gecici
-SYSTEM_STATE = {
-    "robot": {
-        "status": "idle",
-        "current_task": "-",
-        "x": 0,
-        "y": 0,
-        "z": 0
-    },
-
-    "program": {
-        "running": False,
-        "paused": False,
-        "current_step": 0,
-        "total_steps": 0,
-        "current_label": "-",
-        "vacuum_on": False,
-        "pcb_done": {
-            "R1": False,
-            "R2": False,
-            "D1": False,
-            "D2": False,
-        },
-    },
-
-    "grbl": {
-        "state": "unknown",                 # Idle/Run/Hold/Alarm
-        "mpos": {"x": 0.0, "y": 0.0, "z": 0.0},
-        "last_ok": None,                 # True/False/None
-        "last_line": None,               # son gcode satırı - demo
-        "last_updated": None             # ISO string
-    },
-
-    "teststation": {
-        "mode": "none",
-        "last_adc": None,
-        "last_voltage_v": None,
-        "last_result": None,
-        "last_updated": None
-    },
-
-    "logs": [],
-
-    "image_processing": {
-        "last_detection": {
-            "component": None,      # R1, R2, D1, D2
-            "type": None,           # R, D
-            "confidence": None       # 0 - 1
-        },
-        "last_placement": {         # yerlestirme dogrulaması
-            "pad": None,            # a, b, c, d
-            "accuracy": None,        # dogruluk 0 -100
-            "status": "unknown"
-        },
-        "last_updated": None
-    },
-
-    "connections": {
-        "arduino_motors": {
-           "status": False,
-            "port": None
-        },
-        "arduino_teststation": {
-            "status": False,
-            "port": None
-        },
-        "camera": {
-        "status": False,
-        "port": None
-        }
-    },
-}
+# state versiyonu -> o andaki log sira numarasi (?since= ile yeni log satirlari icin)
+# versiyona gore sirali: abone store kilidi icinde, versiyon sirasiyla cagrilir
+# (sirali ekleme ek guvence)
+_LOG_MARKS: list = []
+_LOG_MARKS_MAX = 4096
+_LOG_MARKS_LOCK = threading.Lock()
+_LOG_MARKS_TRIMMED = False
+
+
+def _on_state_change(name: str, version: int, value) -> None:
+    global _LOG_MARKS_TRIMMED
+    if name == "log":
+        with _LOG_MARKS_LOCK:
+            bisect.insort(_LOG_MARKS, (version, value.get("last_seq", 0)))
+            if len(_LOG_MARKS) > _LOG_MARKS_MAX:
+                del _LOG_MARKS[:len(_LOG_MARKS) - _LOG_MARKS_MAX]
+                _LOG_MARKS_TRIMMED = True
+
+
+SYSTEM_STATE.subscribe(_on_state_change, locked=True)
+
+
+def _log_seq_at(version: int) -> Optional[int]:
+    """Log seq that was current at state `version` (None if no longer known)."""
+    with _LOG_MARKS_LOCK:
+        idx = bisect.bisect_right(_LOG_MARKS, (version, float("inf")))
+        if idx > 0:
+            return _LOG_MARKS[idx - 1][1]
+        if not _LOG_MARKS_TRIMMED:
+            # bu versiyondan once hic log yoktu
+            return 0
+        return None
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # weak comparison: W/ oneki yok sayilir
+    return etag.removeprefix("W/") in (t.removeprefix("W/") for t in tags)
+
 
 # sistemin su anki durumunu alir : GET
 @router.get("/")
-def get_status():
+def get_status(
+    logs: int = Query(default=300, ge=0, le=10000),
+    since: int | None = Query(default=None, ge=0),
+    if_none_match: str | None = Header(default=None),
+):
     """
     Get the current system status.
 
+    Args:
+        logs:  number of newest log lines to include (0 = none);
+               use /api/status/logs?after=<log_seq> for incremental logs.
+        since: state version from a previous answer; only the sections changed
+               after it are returned ("changed") plus the new log lines
+               ("logs_append", at most the newest `logs`; "logs_truncated"
+               is set when older ones were left out).
+
+    The ETag is derived from the state version (log appends bump it too);
+    If-None-Match with the current ETag answers 304 Not Modified.
+
     Returns:
         dict: A dictionary containing robot state, test station state,
               connection flags, and system logs.
     """
-    return SYSTEM_STATE
+    from src.app.services import log_store as ls
+
+    current = SYSTEM_STATE.version
+    if since is not None and since > current:
+        # sunucu yeniden baslamis: istemcinin versiyonu gecersiz, tam durum
+        since = None
+
+    etag = f'W/"{current}-{logs}"' if since is None else f'W/"{current}-{logs}-{since}"'
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    if since is not None:
+        # versiyon ve log seq ayni andan: sonraki ?since=version tekrar gondermesin
+        version, changed, sections = SYSTEM_STATE.delta_since(since)
+        log_seq = sections["log"].get("last_seq", 0)
+        after = _log_seq_at(since)
+        truncated = False
+        if after is None:
+            new_logs = ls.log_store.lines(logs, upto=log_seq) if logs else []
+        else:
+            records = ls.log_store.after(after, upto=log_seq)
+            if logs and len(records) > logs:
+                # dashboard log kutusu kuyruk gosterir: en yeniler, eksik kisim bildirilir
+                truncated = True
+                records = records[-logs:]
+            new_logs = [ls.format_line(r) for r in records]
+        body = {"version": version, "changed": changed, "logs_append": new_logs, "log_seq": log_seq}
+        if truncated:
+            body["logs_truncated"] = True
+    else:
+        version, snapshot = SYSTEM_STATE.versioned_snapshot()
+        log_seq = snapshot["log"].get("last_seq", 0)
+        body = {
+            **snapshot,
+            "version": version,
+            "logs": ls.log_store.lines(logs, upto=log_seq) if logs else [],
+            "log_seq": log_seq,
+        }
+
+    # etag cevapla ayni versiyonu gostersin
+    etag = f'W/"{version}-{logs}"' if since is None else f'W/"{version}-{logs}-{since}"'
+    # jsonable_encoder atlaniyor: snapshot dogrudan encode edilir
+    return FastJSONResponse(body, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+# loglar - sadece verilen sira numarasindan sonrakiler
+@router.get("/logs")
+def get_logs(
+    after: int = Query(default=0, ge=0),
+    limit: int = Query(default=0, ge=0, le=10000),
+    level: str | None = Query(default=None),
+):
+    """
+    Structured log records with seq > `after` (oldest first).
+    Poll with after=<last_seq of the previous answer>. With a limit, after > 0
+    pages forward (the oldest `limit` records); after=0 gives the newest.
+    "truncated" means more records were left out: keep polling with last_seq.
+    """
+    from src.app.services import log_store as ls
+
+    # ust sinir once okunur: last_seq sadece taranmis kayitlari gostersin
+    upto = ls.log_store.last_seq
+    items = ls.log_store.after(after, limit=limit + 1 if limit else 0, level=level, upto=upto)
+    truncated = bool(limit) and len(items) > limit
+    if truncated:
+        items = items[:limit] if after > 0 else items[-limit:]
+
+    # sayfa kesildiyse devam noktasi son gonderilen kayit
+    last_seq = items[-1]["seq"] if truncated and after > 0 else max(after, upto)
+    return FastJSONResponse({
+        "ok": True,
+        "first_seq": ls.log_store.first_seq,
+        "last_seq": last_seq,
+        "truncated": truncated,
+        "items": items,
+    })
+
+
+async def _sse_events(request: Request, hub, version: int):
+    hub.subscribe()
+    try:
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            events = hub.events_after(version)
+            for event, v, payload in events:
+                yield f"event: {event}\nid: {v}\ndata: {payload}\n\n"
+                version = v
+
+            now = time.monotonic()
+            if events:
+                last_sent = now
+            elif now - last_sent > 15.0:
+                # proxy/tarayici baglantiyi kapatmasin
+                yield ": ping\n\n"
+                last_sent = now
+
+            await asyncio.sleep(hub.period_s)
+    finally:
+        hub.unsubscribe()
+
+
+# sistem durumu - push (SSE)
+@router.get("/stream")
+async def stream_status(request: Request):
+    """
+    Server-Sent Events stream of SYSTEM_STATE.
+
+    Events:
+        full  : whole state (on connect or when a client fell too far behind)
+        delta : only changed sections ("changed") and new log lines ("logs_append")
+    Updates are coalesced to PNP_STATUS_STREAM_HZ.
+    """
+    from src.app.services.status_stream import status_stream_hub
+
+    if status_stream_hub is None:
+        raise HTTPException(status_code=503, detail="Status stream not initialized")
+
+    # yeniden baglanan istemci kaldigi versiyondan devam edebilir
+    try:
+        version = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        version = 0
+    if version > status_stream_hub.version:
+        version = 0
+
+    return StreamingResponse(
+        _sse_events(request, status_stream_hub, version),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,49 @@
+"""
+File Name       : test_station.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Test station measurement history.
+GET /api/teststation/history : newest-first page of measurements
+(offset / limit, optional component filter, max_points downsampling)
+together with rolling statistics (mean, stddev, Cpk).
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from src.app.security import require_api_key
+from src.app.core.responses import FastJSONResponse
+
+
+router = APIRouter(
+    prefix="/api/teststation",
+    tags=["TestStation"],
+    dependencies=[Depends(require_api_key)],
+    default_response_class=FastJSONResponse,
+)
+
+
+@router.get("/history")
+def get_history(
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=10000),
+    max_points: int = Query(default=0, ge=0, le=10000),
+    component: Optional[str] = Query(default=None, max_length=8),
+):
+    from src.app.services import measurement_history as mh
+
+    if mh.measurement_history is None:
+        raise HTTPException(status_code=503, detail="Measurement history not initialized")
+
+    data = mh.measurement_history.query(
+        offset=offset,
+        limit=limit,
+        max_points=max_points,
+        component=component.upper() if component else None,
+    )
+    return FastJSONResponse({"ok": True, **data})
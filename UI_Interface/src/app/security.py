@@ -3,7 +3,7 @@ File Name       : security.py
 Author          : Eda
 Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
 Created Date    : 2026-02-05
-Last Modified   : 2026-02-05
+Last Modified   : 2026-10-17
 
 Description:
 Simple API key security for WLAN usage.
@@ -16,6 +16,7 @@ from fastapi import Header, HTTPException
 from src.app.core.config import API_KEY
 
 
-def require_api_key(x_api_key: str | None = Header(default=None, alias="X-API-Key")) -> None:
+# async: kontrol anlik, threadpool'a gitmesin
+async def require_api_key(x_api_key: str | None = Header(default=None, alias="X-API-Key")) -> None:
     if x_api_key != API_KEY:
         raise HTTPException(status_code=401, detail="Unauthorized")
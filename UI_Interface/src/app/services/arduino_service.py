@@ -3,18 +3,134 @@ File Name       : arduino_service.py
 Author          : Eda
 Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
 Created Date    : 2026-02-04
-Last Modified   : 2026-03-05
+Last Modified   : 2026-10-17
 
 Description:
 Test station Arduino service with DEMO and REAL modes.
 - DEMO mode: Simulates ADC readings
 - REAL mode: Reads from Arduino via USB serial
+
+REAL mode: a single owner thread talks to the serial port and executes
+queued commands one at a time. measure_async() returns a Future
+(asyncio: `await asyncio.wrap_future(fut)`); measure() waits for it.
+Measurement jobs started over HTTP are tracked by id (submit_measure_job).
+Every finished measurement is recorded in measurement_history (if initialized).
 """
 
+import queue
 import threading
 import time
 import re
-from typing import Dict, Any
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, Optional
+
+
+# firmware satirlari (derlenmis bir kez)
+# ornek: "ADC=123.4  Vout=0.1234 V  R2=456.7 Ohm   Diyot yonu DUZ"
+_RE_VOUT = re.compile(r"Vout=([0-9]+(?:\.[0-9]+)?)")
+_RE_R2 = re.compile(r"R2=([0-9]+(?:\.[0-9]+)?)\s*(kOhm|Ohm)", re.IGNORECASE)
+_RE_DIODE_REV = re.compile(r"Diyot yonu TERS")
+_RE_DIODE_FWD = re.compile(r"Diyot yonu DUZ")
+_RE_INVALID = re.compile(r"Gecerli olcum alinamadi")
+_RE_DONE = re.compile(r"Olcum bitti")
+
+
+class MeasurementParser:
+    """
+    Incremental parser for the test-station output.
+    feed() returns the result dict as soon as a defining line arrives:
+        "Diyot yonu TERS"          -> DIODE_REVERSED
+        "Gecerli olcum alinamadi"  -> INVALID
+        R2=... (+ "Diyot yonu DUZ" on the same line) -> DIODE_FORWARD / RESISTOR_OK
+        "Olcum bitti"              -> whatever was seen so far
+    Phase timestamps (perf_counter) go into result["timing_ms"].
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks: Dict[str, float] = {}
+        self.lines: list[str] = []
+        self.vout = 0.0
+        self.value_ohm: Optional[float] = None
+        self.value_text = "-"
+        self.expects_tail = False   # "Olcum bitti" sonucdan sonra gelecek mi
+
+    def mark(self, phase: str) -> None:
+        self.marks.setdefault(phase, time.perf_counter())
+
+    def _timing(self) -> Dict[str, float]:
+        out = {}
+        for phase in ("sent", "first_line", "result"):
+            if phase in self.marks:
+                out[phase] = round((self.marks[phase] - self.t0) * 1000.0, 1)
+        return out
+
+    def _result(self, mode: str, value_text: str, voltage: float, result: str) -> Dict[str, Any]:
+        self.mark("result")
+        return {
+            "mode": mode,
+            "value_text": value_text,
+            "value_ohm": self.value_ohm if mode == "resistor" else None,
+            "voltage": voltage,
+            "result": result,
+            "timing_ms": self._timing(),
+            "lines": len(self.lines),
+        }
+
+    def feed(self, line: str) -> Optional[Dict[str, Any]]:
+        line = line.strip()
+        if not line:
+            return None
+
+        # onceki olcumden kalan "Olcum bitti" - bu olcume ait degil
+        if _RE_DONE.search(line) and not self.lines:
+            return None
+
+        self.mark("first_line")
+        self.lines.append(line)
+
+        # ters diyot: arduino servo hareketi yapip return ediyor (Olcum bitti yok)
+        if _RE_DIODE_REV.search(line):
+            return self._result("diode", "OPEN", 0.0, "DIODE_REVERSED")
+
+        if _RE_INVALID.search(line):
+            self.expects_tail = True
+            return self._result("none", "-", 0.0, "INVALID")
+
+        m_v = _RE_VOUT.search(line)
+        if m_v:
+            self.vout = float(m_v.group(1))
+
+        m_r = _RE_R2.search(line)
+        if m_r:
+            value = float(m_r.group(1))
+            if m_r.group(2).lower() == "kohm":
+                self.value_ohm = round(value * 1000.0, 3)
+                self.value_text = f"{value:.3f} kOhm"
+            else:
+                self.value_ohm = value
+                self.value_text = f"{value:.1f} Ohm"
+
+            self.expects_tail = True
+            # diyot yonu ayni satirda
+            if _RE_DIODE_FWD.search(line):
+                return self._result("diode", "NOT OPEN", self.vout, "DIODE_FORWARD")
+            return self._result("resistor", self.value_text, self.vout, "RESISTOR_OK")
+
+        if _RE_DIODE_FWD.search(line):
+            return self._result("diode", "NOT OPEN", self.vout, "DIODE_FORWARD")
+
+        if _RE_DONE.search(line):
+            return self.finish()
+        return None
+
+    def finish(self) -> Dict[str, Any]:
+        """Result from the lines seen so far (end marker or deadline)."""
+        if not self.lines:
+            return self._result("none", "-", 0.0, "NO_RESPONSE")
+        return self._result("resistor", self.value_text, self.vout, "RESISTOR_OK")
 
 
 class ArduinoService:
@@ -29,6 +145,18 @@ class ArduinoService:
 
         # real: serial baglanti 
         self.ser = None
+
+        # seri portun tek sahibi: komut kuyrugu + owner thread (real)
+        self._cmd_queue: "queue.Queue[tuple[str, Future] | None]" = queue.Queue()
+        self._owner: threading.Thread | None = None
+        self.measure_timeout_s = 10.0   # servo ters diyotta 5sn bekliyor
+        self._tail_pending = False      # erken cikista "Olcum bitti" henuz okunmadi
+
+        # http olcum isleri: job_id -> kayit (son 50)
+        self._jobs_lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.max_jobs = 50
+
         print(f"[ARDUINO] Initialized in {'DEMO' if demo_mode else 'REAL'} mode")
 
     def connect(self) -> bool:
@@ -43,6 +171,7 @@ class ArduinoService:
             time.sleep(2)
             print(f"[ARDUINO] Connected to {self.port}")
             self._connected = True
+            self._start_owner()
             return True
            
         except Exception as e:
@@ -52,6 +181,7 @@ class ArduinoService:
     
     def disconnect(self):
         """Disconnect from Arduino"""
+        self._stop_owner()
         if self.ser:
             self.ser.close()
             self.ser = None
@@ -95,20 +225,148 @@ class ArduinoService:
     #         print(f"[ARDUINO] Read error: {e}")
     #         return {"adc": 0, "voltage": 0.0, "result": "ERROR"}
 
-    def measure(self) -> Dict[str, Any]:
+    # seri port sahibi thread
+    def _start_owner(self) -> None:
+        if self._owner and self._owner.is_alive():
+            return
+        self._owner = threading.Thread(target=self._owner_loop, daemon=True)
+        self._owner.start()
+
+    def _stop_owner(self) -> None:
+        if self._owner and self._owner.is_alive():
+            self._cmd_queue.put(None)
+            self._owner.join(timeout=self.measure_timeout_s + 1)
+        self._owner = None
+
+        # kuyrukta kalanlar
+        while True:
+            try:
+                item = self._cmd_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_result({"mode": "none", "value_text": "-", "voltage": 0.0, "result": "NO_CONNECTION"})
+
+    def _owner_loop(self) -> None:
+        while True:
+            item = self._cmd_queue.get()
+            if item is None:
+                return
+            kind, fut = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                if kind == "measure":
+                    fut.set_result(self._measure_serial())
+                else:
+                    fut.set_exception(ValueError(f"Unknown command: {kind}"))
+            except Exception as e:
+                fut.set_exception(e)
+
+            # sonuc verildi; erken biten olcumun kuyrugunu bosta oku
+            if self._tail_pending:
+                self._drain_tail()
+
+    def measure_async(self, component: Optional[str] = None) -> Future:
         """
-        Trigger measurement on Arduino (send 'b') and parse returned text.
-        Returns fields compatible with SYSTEM_STATE['teststation'].
+        Queue a measurement; returns a Future resolving to the measure() dict.
+        Measurements run one at a time on the serial owner thread.
+        component (e.g. "R1") is stored with the result in the measurement history.
         """
+        fut: Future = Future()
+
         if self.demo_mode:
             # demo
-            return {
+            fut.set_result({
                 "mode": "resistor",
                 "value_text": "4.700 kOhm",
+                "value_ohm": 4700.0,
                 "voltage": 0.0,
                 "result": "OK",
-            }
+            })
+            self._record(fut, component)
+            return fut
+
+        if not self.ser or not self._connected or not self._owner or not self._owner.is_alive():
+            fut.set_result({"mode": "none", "value_text": "-", "voltage": 0.0, "result": "NO_CONNECTION"})
+            return fut
+
+        fut.add_done_callback(lambda f: self._record(f, component))
+        self._cmd_queue.put(("measure", fut))
+        return fut
+
+    def _record(self, fut: Future, component: Optional[str]) -> None:
+        """Append a finished measurement to the history ring buffer."""
+        from src.app.services import measurement_history as mh
+
+        if mh.measurement_history is None or fut.cancelled() or fut.exception() is not None:
+            return
+        data = fut.result()
+        if data.get("result") in ("NO_CONNECTION", "ERROR"):
+            return
+        mh.measurement_history.append(data, component=component)
+
+    def measure(self) -> Dict[str, Any]:
+        """
+        Trigger measurement on Arduino (send 'b') and parse returned text.
+        Returns fields compatible with SYSTEM_STATE['teststation'].
+        Blocking wrapper around measure_async().
+        """
+        fut = self.measure_async()
+        try:
+            # kuyrukta bekleyen bir olcum de olabilir
+            return fut.result(timeout=2 * self.measure_timeout_s + 1)
+        except Exception as e:
+            print(f"[ARDUINO] Measure error: {e}")
+            return {"mode": "none", "value_text": "-", "voltage": 0.0, "result": "ERROR"}
+
+    # http olcum isleri
+    def submit_measure_job(self, on_done=None) -> str:
+        """Start a measurement and return its job id (see get_job)."""
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "finished_at": None,
+            "result": None,
+        }
+        with self._jobs_lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+        def _done(f: Future) -> None:
+            try:
+                data = f.result()
+                status = "done"
+            except Exception as e:
+                data = {"mode": "none", "value_text": "-", "voltage": 0.0, "result": "ERROR", "error": str(e)}
+                status = "error"
+            with self._jobs_lock:
+                job["status"] = status
+                job["result"] = data
+                job["finished_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            if on_done is not None:
+                on_done(data)
+
+        fut = self.measure_async()
+        if not fut.done():
+            job["status"] = "running"
+        fut.add_done_callback(_done)
+        return job_id
 
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _measure_serial(self) -> Dict[str, Any]:
+        """
+        Measurement on the serial port (owner thread only).
+        Lines are parsed as they arrive; the result is returned as soon as the
+        defining line is seen (R2=..., diode direction, invalid).
+        """
         if not self.ser or not self._connected:
             return {"mode": "none", "value_text": "-", "voltage": 0.0, "result": "NO_CONNECTION"}
 
@@ -119,82 +377,47 @@ class ArduinoService:
             except Exception:
                 pass
 
+            parser = MeasurementParser()
+
             # olcumu tetikleme
             self.ser.write(b"b")
             self.ser.flush()
+            parser.mark("sent")
 
-            deadline = time.time() + 10.0  # servo ters diyotta 5sn bekliyor
-            lines: list[str] = []
+            deadline = time.time() + self.measure_timeout_s  # servo ters diyotta 5sn bekliyor
+            result = None
 
             while time.time() < deadline:
                 raw = self.ser.readline()
                 if not raw:
                     continue
-                line = raw.decode("utf-8", errors="ignore").strip()
-                if not line:
-                    continue
-                lines.append(line)
-
-                # erken cikis
-                if "Olcum bitti" in line:
-                    break
-
-                # ters diyotta arduino return ediyor (servo hareketi yapip return)
-                if "Diyot yonu TERS" in line:
+                result = parser.feed(raw.decode("utf-8", errors="ignore"))
+                if result is not None:
                     break
 
-            text = "\n".join(lines)
-
-            # 1) ters diyot / open circuit
-            if "Diyot yonu TERS" in text:
-                return {
-                    "mode": "diode",
-                    "value_text": "OPEN",
-                    "voltage": 0.0,
-                    "result": "DIODE_REVERSED",
-                }
-
-            # 2) gecerli degil
-            if "Gecerli olcum alinamadi" in text:
-                return {"mode": "none", "value_text": "-", "voltage": 0.0, "result": "INVALID"}
-
-            # 3) DUZ diyot veya direnc: ADC=... Vout=... R2=...
-            # ornek: "ADC=123.4  Vout=0.1234 V  R2=456.7 Ohm   Diyot yonu DUZ"
-            vout = 0.0
-            m_v = re.search(r"Vout=([0-9]+(?:\.[0-9]+)?)", text)
-            if m_v:
-                vout = float(m_v.group(1))
-
-            # R2 parse (Ohm / kOhm)
-            value_text = "-"
-            m_r_k = re.search(r"R2=([0-9]+(?:\.[0-9]+)?)\s*kOhm", text, flags=re.IGNORECASE)
-            m_r_o = re.search(r"R2=([0-9]+(?:\.[0-9]+)?)\s*Ohm", text, flags=re.IGNORECASE)
-            if m_r_k:
-                value_text = f"{float(m_r_k.group(1)):.3f} kOhm"
-            elif m_r_o:
-                value_text = f"{float(m_r_o.group(1)):.1f} Ohm"
-
-            if "Diyot yonu DUZ" in text:
-                # acik devre degil
-                return {
-                    "mode": "diode",
-                    "value_text": "NOT OPEN",
-                    "voltage": vout,
-                    "result": "DIODE_FORWARD",
-                }
-
-            # direnc durumunda
-            return {
-                "mode": "resistor",
-                "value_text": value_text,
-                "voltage": vout,
-                "result": "RESISTOR_OK",
-            }
+            if result is None:
+                # deadline: gelen satirlardan ne cikarsa
+                result = parser.finish()
+            elif parser.expects_tail:
+                # erken cikis: "Olcum bitti" sonradan gelecek, siradaki komuttan once okunacak
+                self._tail_pending = True
+            return result
 
         except Exception as e:
             print(f"[ARDUINO] Measure error: {e}")
             return {"mode": "none", "value_text": "-", "voltage": 0.0, "result": "ERROR"}
 
+    def _drain_tail(self, timeout: float = 0.3) -> None:
+        """Read the trailing lines of an early-terminated measurement."""
+        self._tail_pending = False
+        if not self.ser:
+            return
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            raw = self.ser.readline()
+            if raw and _RE_DONE.search(raw.decode("utf-8", errors="ignore")):
+                return
+
 
     def start_polling(self):
         """Start background polling"""
@@ -216,11 +439,10 @@ class ArduinoService:
     def _polling_loop(self):
         """Background loop for ADC polling"""
         # circular import olamsin diye fonksiyon icine alindi
-        from src.app.routers.status import SYSTEM_STATE
+        from src.app.core.state import SYSTEM_STATE
         
         # baglanti durumu guncellemesi icin
-        SYSTEM_STATE["connections"]["arduino_teststation"]["status"] = self._connected
-        SYSTEM_STATE["connections"]["arduino_teststation"]["port"] = self.port if self._connected else None
+        self._publish_connection(SYSTEM_STATE)
         
         # demo: 
         adc_demo_value = 100
@@ -234,20 +456,27 @@ class ArduinoService:
                 
                 voltage = round(adc_demo_value * 5.0 / 1023.0, 2)
                 
-                SYSTEM_STATE["teststation"]["last_adc"] = adc_demo_value
-                SYSTEM_STATE["teststation"]["last_voltage_v"] = voltage
-                SYSTEM_STATE["teststation"]["last_result"] = "OK"
-                SYSTEM_STATE["teststation"]["last_updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
+                SYSTEM_STATE.update(
+                    "teststation",
+                    last_adc=adc_demo_value,
+                    last_voltage_v=voltage,
+                    last_result="OK",
+                    last_updated=time.strftime("%Y-%m-%d %H:%M:%S"),
+                )
             else:
-                # real:                
-                SYSTEM_STATE["teststation"]["last_updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
-                SYSTEM_STATE["connections"]["arduino_teststation"]["status"] = self._connected
-                SYSTEM_STATE["connections"]["arduino_teststation"]["port"] = self.port if self._connected else None
+                # real: last_updated sadece olcum sonucunda degisir
+                self._publish_connection(SYSTEM_STATE)
             
             time.sleep(self.interval_s)
         
         # durduguunda baglanti yok diye
-        SYSTEM_STATE["connections"]["arduino_teststation"]["status"] = False
+        with SYSTEM_STATE.edit("connections") as conn:
+            conn["arduino_teststation"]["status"] = False
+
+    def _publish_connection(self, state) -> None:
+        with state.edit("connections") as conn:
+            conn["arduino_teststation"]["status"] = self._connected
+            conn["arduino_teststation"]["port"] = self.port if self._connected else None
     
 
 arduino_service = None
@@ -3,7 +3,7 @@ File Name       : camera_service.py
 Author          : Eda
 Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
 Created Date    : 2026-02-04
-Last Modified   : 2026-02-04
+Last Modified   : 2026-10-17
 
 Description:
 This service provides camera frames for the web UI.
@@ -12,23 +12,65 @@ Later, it can be extended to MJPEG streaming.
 Camera service with DEMO and REAL modes.
 - DEMO mode: Uses PC webcam (index 0)
 - REAL mode: Uses Raspberry Pi Camera Module
+
+Optional background capture (start_capture):
+one grabber thread keeps a lock-protected latest-frame slot filled
+(monotonic frame id + timestamp). Readers take the newest frame without
+touching the device, or wait for a frame newer than a given id.
+MJPEG viewers share one JPEG encode per captured frame (get_stream_jpeg).
+Async callers wait for frames with wait_for_frame_async() (no thread parked
+on the condition) and only hand the encode to a thread (encode_stream_jpeg).
 """
 
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
 import cv2
 
+# farkli genislik isteyen izleyiciler icin en fazla bu kadar encode saklanir
+JPEG_CACHE_MAX = 4
+
 class CameraService:
-    def __init__(self, demo_mode: bool = True, device_index: int = 0):
+    def __init__(self, demo_mode: bool = True, device_index: int = 0, max_fps: float = 0.0):
         self.demo_mode = demo_mode
         self.device_index = device_index
         self.cap = None
         # pi camera module icin
         self.picam = None
         self.picam_configured = False
+
+        # cihaz erisimi tek seferde bir thread (open/close/read)
+        self._device_lock = threading.RLock()
+
+        # arka plan yakalama - latest-frame slot
+        self.max_fps = float(max_fps)       # 0 => kamera hizinda
+        self._frame_cond = threading.Condition()
+        self._latest_frame = None
+        self._latest_id = 0                 # monoton artan frame id
+        self._latest_ts = 0.0               # time.monotonic()
+        self._grab_thread: threading.Thread | None = None
+        self._grab_stop = threading.Event()
+        self._async_waiters: list = []      # (loop, future) - wait_for_frame_async
+
+        # mjpeg stream: izleyici sayisi + cozunurluk basina son encode edilen frame
+        self._viewer_lock = threading.Lock()
+        self._viewers = 0
+        self._capture_owned_by_stream = False
+        self._jpeg_lock = threading.Lock()
+        self._jpeg_cache: "OrderedDict[int, tuple[int, bytes]]" = OrderedDict()  # genislik -> (frame_id, jpeg), LRU
+        self._jpeg_frame_w = 0              # son encode edilen frame genisligi
+
         print(f"[CAMERA] Initialized in {'DEMO' if demo_mode else 'REAL'} mode")
 
 
     def open(self) -> bool:
         """Open the camera device."""
+        with self._device_lock:
+            return self._open()
+
+    def _open(self) -> bool:
         if self.demo_mode:
             if getattr(self, "cap", None) is not None:
                 return True
@@ -87,6 +129,10 @@ class CameraService:
     
 
     def close(self):
+        with self._device_lock:
+            self._close()
+
+    def _close(self):
         cap = getattr(self, "cap", None)
         if cap is not None:
             try:
@@ -109,54 +155,263 @@ class CameraService:
             self.picam_configured = False
 
 
-    def get_frame(self):
+    def _capture(self):
         """
-        Capture one frame and return it as BGR numpy array.
+        Capture one frame from the device (synchronous).
         DEMO: OpenCV webcam
         REAL: Picamera2
         """
-        # demo
-        if self.demo_mode:
-            if self.cap is None and not self.open():
+        with self._device_lock:
+            # demo
+            if self.demo_mode:
+                if self.cap is None and not self._open():
+                    return None
+
+                ok, frame = self.cap.read()
+                if not ok or frame is None:
+                    print("[CAMERA] Failed to read frame (DEMO)")
+                    return None
+                return frame
+
+            # real
+            if self.picam is None and not self._open():
                 return None
 
-            ok, frame = self.cap.read()
-            if not ok or frame is None:
-                print("[CAMERA] Failed to read frame (DEMO)")
+            try:
+                frame = self.picam.capture_array()
+                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+                return frame
+            except Exception as e:
+                print(f"[CAMERA] Failed to capture frame (REAL): {e}")
                 return None
-            return frame
 
-        # real
-        if self.picam is None and not self.open():
+    def get_frame(self, fresh: bool = False, timeout: float = 2.0):
+        """
+        Return one frame as BGR numpy array.
+
+        Without background capture: synchronous capture on the calling thread.
+        With background capture:
+            fresh=False -> newest frame in the slot (no device access)
+            fresh=True  -> wait for a frame captured after this call
+                           (e.g. after the gantry stopped moving)
+        Frames from the slot are shared between readers: do not modify in place.
+        """
+        if not self.is_capturing():
+            return self._capture()
+
+        if fresh:
+            latest = self.wait_for_frame(after_id=self._latest_id, timeout=timeout)
+        else:
+            latest = self.get_latest()
+            if latest is None:
+                # ilk frame henuz gelmedi
+                latest = self.wait_for_frame(after_id=0, timeout=timeout)
+
+        return latest[2] if latest is not None else None
+
+    # arka plan yakalama
+    def start_capture(self) -> None:
+        """Start the background frame-grabber thread (opt-in)."""
+        if self.is_capturing():
+            return
+
+        self._grab_stop.clear()
+        self._grab_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._grab_thread.start()
+        print("[CAMERA] Background capture started")
+
+    def stop_capture(self) -> None:
+        """Stop the background frame-grabber thread."""
+        self._grab_stop.set()
+        if self._grab_thread:
+            self._grab_thread.join(timeout=2)
+        self._grab_thread = None
+
+        # bekleyen okuyuculari uyandir
+        with self._frame_cond:
+            self._frame_cond.notify_all()
+            self._wake_async_waiters_locked()
+        print("[CAMERA] Background capture stopped")
+
+    def is_capturing(self) -> bool:
+        return self._grab_thread is not None and self._grab_thread.is_alive()
+
+    def get_latest(self):
+        """
+        Non-blocking read of the latest-frame slot.
+        Returns (frame_id, timestamp, frame) or None if no frame captured yet.
+        """
+        with self._frame_cond:
+            if self._latest_frame is None:
+                return None
+            return self._latest_id, self._latest_ts, self._latest_frame
+
+    def wait_for_frame(self, after_id: int = 0, timeout: float = 2.0):
+        """
+        Block until a frame with id > after_id is available.
+        Returns (frame_id, timestamp, frame) or None on timeout / capture stopped.
+        """
+        deadline = time.monotonic() + timeout
+        with self._frame_cond:
+            while self._latest_frame is None or self._latest_id <= after_id:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.is_capturing():
+                    return None
+                self._frame_cond.wait(remaining)
+            return self._latest_id, self._latest_ts, self._latest_frame
+
+    def _wake_async_waiters_locked(self) -> None:
+        # _frame_cond tutulurken cagrilir
+        for loop, fut in self._async_waiters:
+            loop.call_soon_threadsafe(_resolve, fut)
+        self._async_waiters.clear()
+
+    async def wait_for_frame_async(self, after_id: int = 0, timeout: float = 2.0):
+        """
+        Async version of wait_for_frame(): the grabber thread wakes the event
+        loop when a new frame is published, no worker thread is blocked.
+        """
+        deadline = time.monotonic() + timeout
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._frame_cond:
+                if self._latest_frame is not None and self._latest_id > after_id:
+                    return self._latest_id, self._latest_ts, self._latest_frame
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.is_capturing():
+                    return None
+                fut = loop.create_future()
+                self._async_waiters.append((loop, fut))
+
+            try:
+                await asyncio.wait_for(fut, remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._frame_cond:
+                    if (loop, fut) in self._async_waiters:
+                        self._async_waiters.remove((loop, fut))
+
+    # mjpeg stream
+    def add_viewer(self) -> None:
+        """Register a stream viewer; starts background capture if it is not running."""
+        with self._viewer_lock:
+            self._viewers += 1
+            if not self.is_capturing():
+                self.start_capture()
+                self._capture_owned_by_stream = True
+
+    def remove_viewer(self) -> None:
+        """Unregister a stream viewer; stops capture if only the stream needed it."""
+        with self._viewer_lock:
+            self._viewers = max(0, self._viewers - 1)
+            if self._viewers == 0 and self._capture_owned_by_stream:
+                self._capture_owned_by_stream = False
+                self.stop_capture()
+
+    def get_stream_jpeg(self, after_id: int = 0, max_width: int = 0, quality: int = 80, timeout: float = 2.0):
+        """
+        Wait for a frame newer than after_id and return (frame_id, jpeg_bytes).
+        Each frame is encoded once per resolution and shared by all viewers.
+        Returns None if no new frame arrives within timeout.
+        """
+        latest = self.wait_for_frame(after_id=after_id, timeout=timeout)
+        if latest is None:
             return None
+        frame_id, _, frame = latest
+        return self.encode_stream_jpeg(frame_id, frame, max_width=max_width, quality=quality)
 
-        try:
-            frame = self.picam.capture_array()
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-            return frame
-        except Exception as e:
-            print(f"[CAMERA] Failed to capture frame (REAL): {e}")
+    @staticmethod
+    def _jpeg_key(max_width: int, frame_w: int) -> int:
+        # 0 veya frame'den genis: kucultme yok, hepsi ayni anahtar
+        if max_width <= 0 or (frame_w and max_width >= frame_w):
+            return 0
+        return max_width
+
+    def peek_stream_jpeg(self, frame_id: int, max_width: int = 0):
+        """Cached (frame_id, jpeg) if this frame is already encoded at this width (no lock, no encode)."""
+        cached = self._jpeg_cache.get(self._jpeg_key(max_width, self._jpeg_frame_w))
+        if cached is not None and cached[0] >= frame_id:
+            return cached
+        return None
+
+    def encode_stream_jpeg(self, frame_id: int, frame, max_width: int = 0, quality: int = 80):
+        """Encode a captured frame once per resolution; returns (frame_id, jpeg) or None."""
+        h, w = frame.shape[:2]
+        key = self._jpeg_key(max_width, w)
+        with self._jpeg_lock:
+            self._jpeg_frame_w = w
+            cached = self._jpeg_cache.get(key)
+            if cached is not None and cached[0] >= frame_id:
+                self._jpeg_cache.move_to_end(key)
+                return cached
+
+            if key:
+                frame = cv2.resize(frame, (key, int(h * key / w)), interpolation=cv2.INTER_AREA)
+
+            ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+            if not ok:
+                print("[CAMERA] Failed to encode stream frame")
+                return None
+
+            cached = (frame_id, buf.tobytes())
+            self._jpeg_cache[key] = cached
+            self._jpeg_cache.move_to_end(key)
+            while len(self._jpeg_cache) > JPEG_CACHE_MAX:
+                self._jpeg_cache.popitem(last=False)
+            return cached
+
+    def _capture_loop(self) -> None:
+        min_period = 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+
+        while not self._grab_stop.is_set():
+            t0 = time.monotonic()
+            frame = self._capture()
+
+            if frame is None:
+                # kamera yok / okunamadi - cihaza yuklenmeden tekrar dene
+                self._grab_stop.wait(0.5)
+                continue
+
+            with self._frame_cond:
+                self._latest_id += 1
+                self._latest_ts = time.monotonic()
+                self._latest_frame = frame
+                self._frame_cond.notify_all()
+                self._wake_async_waiters_locked()
+
+            if min_period > 0:
+                self._grab_stop.wait(max(0.0, min_period - (time.monotonic() - t0)))
+
+
+    def encode_jpeg(self, frame, quality: int = 90) -> bytes | None:
+        """Encode a BGR frame to JPEG bytes (single encode, no decode round trip)."""
+        ok, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+        if not ok:
+            print("[CAMERA] Failed to encode frame")
             return None
-    
+
+        return buf.tobytes()
 
     def get_jpeg(self) -> bytes | None:
         frame = self.get_frame()
         if frame is None:
             return None
 
-        ok, buf = cv2.imencode(".jpg", frame)
-        if not ok:
-            print("[CAMERA] Failed to encode frame")
-            return None
+        return self.encode_jpeg(frame)
 
-        return buf.tobytes()
+
+def _resolve(fut) -> None:
+    # event loop thread'inde calisir
+    if not fut.done():
+        fut.set_result(None)
 
 
 camera_service = None
 
 
-def init_camera_service(demo_mode: bool, device_index: int = 0):
+def init_camera_service(demo_mode: bool, device_index: int = 0, max_fps: float = 0.0):
     """Initialize camera service singleton"""
     global camera_service
-    camera_service = CameraService(demo_mode=demo_mode, device_index=device_index)
+    camera_service = CameraService(demo_mode=demo_mode, device_index=device_index, max_fps=max_fps)
     return camera_service
@@ -4,11 +4,13 @@ Author          : Eda
 Description:
 Single fixed Pick&Place program definition.
 G-codes will be filled later by the team.
+Steps declare their action, the resources they hold and their dependencies;
+execution order is resolved by step_scheduler.StepGraph.
 """
 
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Optional, Dict, List
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Tuple
 
 # komponent ve pad eslestirmesi
 # rahatca degisiklik yapılabilsin diye
@@ -20,6 +22,9 @@ PAD_BY_COMPONENT: Dict[str, str] = {
 }
 
 # vision
+# varsayilan yerlestirme sirasi (route optimizer ile degistirilebilir)
+DEFAULT_ORDER: List[str] = ["R1", "R2", "D1", "D2"]
+
 TARGET_BOX_BY_PAD: Dict[str, list[int]] = {
     "A": [150, 150, 210, 180],
     "B": [250, 150, 310, 180],
@@ -62,6 +67,10 @@ class Step:
     gcode: str | List[str] # "G91;G0 X50;G90" veya ["G91", "G0 X50", "G90"]
     marks_done_component: Optional[str] = None # yerlestirme tamamlaninca set edilliyor
     vacuum_expected: Optional[bool] = None # durum takibi icin
+    # "gcode" | "capture" (hareket bitince frame) | "detect" | "verify_place" | "measure"
+    action: str = "gcode"
+    resources: Tuple[str, ...] = ("gantry",) # ayni kaynagi tutan adimlar program sirasiyla
+    depends_on: List[str] = field(default_factory=list) # ek bagimliliklar (step id)
 
 
 def _normalize_gcode(x: str | List[str]) -> List[str]:
@@ -114,16 +123,18 @@ def validate_required_gcodes() -> None:
         )
     
 
-def build_program() -> List[Step]:
+def build_program(order: Optional[List[str]] = None) -> List[Step]:
     """
     Fixed program:
       For each component:
         - go feeder
         - vacuum on
-        - go test station (press + dwell)
+        - pick, capture frame (gantry held) -> detect (vision, runs during next moves)
+        - go test station (press + dwell) -> measure (gantry held until the result)
         - go pcb pad
-        - place + vacuum off
+        - place + vacuum off, capture frame -> verify placement
     G-codes are placeholders to be replaced.
+    order: component order (default DEFAULT_ORDER, e.g. from route_optimizer).
     """
     steps: List[Step] = []
 
@@ -134,11 +145,15 @@ def build_program() -> List[Step]:
             label="Go to HOME (startup position)",
             gcode=GCODE["HOME"],    # TODO: fill
             vacuum_expected=False,
+            resources=("gantry", "vacuum"),
         )
     )
 
-    # siralama buradan degistirilebilir
-    order = ["R1", "R2", "D1", "D2"]
+    # siralama DEFAULT_ORDER'dan veya disaridan (route optimizer)
+    order = list(order) if order else list(DEFAULT_ORDER)
+    unknown = [c for c in order if c not in PAD_BY_COMPONENT]
+    if unknown:
+        raise ValueError(f"Unknown components in order: {', '.join(unknown)}")
     # comp ile sira tutuluyor, akis ayni oldugundan tekrar etmemek icin
     for comp in order:
         pad = PAD_BY_COMPONENT[comp]
@@ -156,6 +171,7 @@ def build_program() -> List[Step]:
                 label=f"{comp}: Vacuum ON",
                 gcode=GCODE["VAC_ON"],                 # TODO
                 vacuum_expected=True,
+                resources=("gantry", "vacuum"),
             ),
             Step( # almak icin z ekseni hareketi
                 id=f"{comp}_PICK_Z",
@@ -163,6 +179,21 @@ def build_program() -> List[Step]:
                 gcode=GCODE[f"{comp}_PICK_Z"],        # TODO
                 vacuum_expected=True,
             ),
+            Step( # kafa dururken frame, gantry tutuluyor
+                id=f"{comp}_PICK_CAPTURE",
+                label=f"{comp}: Capture pick frame",
+                gcode="",
+                action="capture",
+                resources=("gantry", "camera"),
+            ),
+            Step( # detection, sonraki hareketlerle paralel
+                id=f"{comp}_PICK_VISION",
+                label=f"{comp}: Pick detection",
+                gcode="",
+                action="detect",
+                resources=("vision",),
+                depends_on=[f"{comp}_PICK_CAPTURE"],
+            ),
             Step( # test istasyonuna gitme
                 id=f"{comp}_TO_TEST",
                 label=f"{comp}: Move to test station",
@@ -175,6 +206,13 @@ def build_program() -> List[Step]:
                 gcode=GCODE["TEST_PRESS_DWELL"],        # TODO
                 vacuum_expected=True,
             ),
+            Step( # olcum bitene kadar parca problarda: gantry tutuluyor
+                id=f"{comp}_TEST_MEASURE",
+                label=f"{comp}: Test measurement",
+                gcode="",
+                action="measure",
+                resources=("gantry", "teststation"),
+            ),
             Step( # pcb'ye gitme
                 id=f"{comp}_TO_PCB",
                 label=f"{comp}: Move to PCB pad {pad}",
@@ -187,6 +225,22 @@ def build_program() -> List[Step]:
                 gcode=GCODE["VAC_OFF"],           # TODO
                 marks_done_component=comp,
                 vacuum_expected=False,
+                resources=("gantry", "vacuum"),
+            ),
+            Step(
+                id=f"{comp}_PLACE_CAPTURE",
+                label=f"{comp}: Capture placement frame",
+                gcode="",
+                action="capture",
+                resources=("gantry", "camera"),
+            ),
+            Step(
+                id=f"{comp}_PLACE_VISION",
+                label=f"{comp}: Verify placement on pad {pad}",
+                gcode="",
+                action="verify_place",
+                resources=("vision",),
+                depends_on=[f"{comp}_PLACE_CAPTURE"],
             ),
         ]
 
@@ -196,6 +250,8 @@ def build_program() -> List[Step]:
             label="Program finished",
             gcode="",
             vacuum_expected=False,
+            # tum kaynaklar: bekleyen vision/olcum bitmeden bitmesin
+            resources=("gantry", "vacuum", "camera", "vision", "teststation"),
         )
     )
 
@@ -4,19 +4,34 @@ Author          : Eda
 Description:
 Runs a fixed G-code program step-by-step with stop/resume/reset support.
 Updates SYSTEM_STATE for UI (task/logs, vacuum state, PCB completion).
+
+Steps are executed through a StepGraph (resources + dependencies).
+Serial mode runs one ready step at a time, which is the program order.
+Pipelined mode (PNP_RUNNER_PIPELINE=true) runs independent ready steps on a
+worker pool: detection / placement verification (vision) overlaps with the
+next gantry moves, while capture and measurement steps hold the gantry so
+motion waits for the frame and for the part to leave the probes.
 """
 
 from __future__ import annotations
 import threading
 import time
-from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from typing import Optional
 
-from src.app.services.gcode_programs import build_program, validate_required_gcodes
+from src.app.services.gcode_programs import (
+    DEFAULT_ORDER,
+    PAD_BY_COMPONENT,
+    build_program,
+    validate_required_gcodes,
+)
+from src.app.services import route_optimizer
+from src.app.services.log_store import log
+from src.app.services.step_scheduler import StepGraph
 
 
 class GCodeRunner:
-    def __init__(self):
+    def __init__(self, pipelined: bool = False, workers: int = 2, optimize_order: bool = False):
         self._lock = threading.Lock()
         self._thread: Optional[threading.Thread] = None
 
@@ -29,35 +44,36 @@ class GCodeRunner:
         # start'a basinca (!!ozellikle idx=0 iken) yeniden build edilecek
         self.program = []
 
-        print("[GCODE_RUNNER] Initialized")
+        # pipeline: bagimsiz adimlar (vision) havuzda, gantry adimlari sirayla
+        self.pipelined = bool(pipelined)
+        self.workers = max(1, int(workers))
+        self.optimize_order = bool(optimize_order)
+
+        # biten adimlar (resume buradan devam eder) ve capture -> vision frame'leri
+        self._done: set[str] = set()
+        self._frames: dict = {}
+
+        print(f"[GCODE_RUNNER] Initialized (pipelined={self.pipelined})")
 
     def is_running(self) -> bool:
         return self._thread is not None and self._thread.is_alive()
 
-    def _log(self, msg: str) -> None:
-        from src.app.routers.status import SYSTEM_STATE
-        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        SYSTEM_STATE["logs"].append(f"[{ts}] {msg}")
-
-        # loglarin siniri
-        if len(SYSTEM_STATE["logs"]) > 300:
-            SYSTEM_STATE["logs"] = SYSTEM_STATE["logs"][-300:]
+    def _log(self, msg: str, level: str = "INFO") -> None:
+        log(msg, level=level, source="runner")
 
     def start(self) -> None:
         """
         Start or resume.
         If already running, just unpause.
         """
-        from src.app.routers.status import SYSTEM_STATE
+        from src.app.core.state import SYSTEM_STATE
 
         try: # eksik bir yer varsa hata versin
             validate_required_gcodes()
         except Exception as e:
             self._log(f"GCodeRunner: START blocked - {e}")
-            SYSTEM_STATE["robot"]["status"] = "error"
-            SYSTEM_STATE["robot"]["current_task"] = "GCODE missing"
-            SYSTEM_STATE["program"]["running"] = False
-            SYSTEM_STATE["program"]["paused"] = False
+            SYSTEM_STATE.update("robot", status="error", current_task="GCODE missing")
+            SYSTEM_STATE.update("program", running=False, paused=False)
             return
 
         with self._lock:
@@ -66,23 +82,29 @@ class GCodeRunner:
 
             # eger bastan baslaniyorsa yeniden build et (!!idx=0)
             if self.current_step_idx == 0 and not self.is_running():
-                self.program = build_program()
+                self.program = build_program(order=self._component_order())
 
 
             if self.is_running():
-                SYSTEM_STATE["program"]["paused"] = False
-                SYSTEM_STATE["program"]["running"] = True
-                SYSTEM_STATE["robot"]["status"] = "running"
+                SYSTEM_STATE.update("program", paused=False, running=True)
+                SYSTEM_STATE.update("robot", status="running")
                 self._log("GCodeRunner: RESUME")
                 return
 
             self._thread = threading.Thread(target=self._loop, daemon=True)
             self._thread.start()
-            SYSTEM_STATE["program"]["running"] = True
-            SYSTEM_STATE["program"]["paused"] = False
-            SYSTEM_STATE["robot"]["status"] = "running"
+            SYSTEM_STATE.update("program", running=True, paused=False)
+            SYSTEM_STATE.update("robot", status="running")
             self._log("GCodeRunner: START")
 
+    def _component_order(self) -> list[str]:
+        if not self.optimize_order:
+            return list(DEFAULT_ORDER)
+
+        route = route_optimizer.optimize_order(DEFAULT_ORDER, PAD_BY_COMPONENT)
+        self._log(f"Route: {route.summary()}")
+        return route.order
+
     def stop(self) -> None:
         """
         Pause execution. Vacuum state stays as-is.
@@ -90,11 +112,9 @@ class GCodeRunner:
         self._pause_event.set()
         self._log("GCodeRunner: STOP (paused)")
 
-        from src.app.routers.status import SYSTEM_STATE
-        SYSTEM_STATE["robot"]["status"] = "stopped"
-        SYSTEM_STATE["robot"]["current_task"] = "-"
-        SYSTEM_STATE["program"]["paused"] = True
-        SYSTEM_STATE["program"]["running"] = True  
+        from src.app.core.state import SYSTEM_STATE
+        SYSTEM_STATE.update("robot", status="stopped", current_task="-")
+        SYSTEM_STATE.update("program", paused=True, running=True)
         # paused ama program hala "aktif"
 
     def reset(self) -> None:
@@ -112,6 +132,7 @@ class GCodeRunner:
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout=1.5)
 
+
         try:
             from src.app.main import robot_service
             if robot_service is not None:
@@ -120,24 +141,29 @@ class GCodeRunner:
                 # home'a gitmek istiyorsak asagidakini yaz:
                 # robot_service.send_gcode("...HOME GCODE...")
         except Exception as e:
-            self._log(f"GCodeRunner reset safety actions failed: {e}")
+            self._log(f"GCodeRunner reset safety actions failed: {e}", level="ERROR")
 
         self.current_step_idx = 0
         self.vacuum_on = False
-
-        from src.app.routers.status import SYSTEM_STATE
-        SYSTEM_STATE["robot"]["status"] = "idle"
-        SYSTEM_STATE["robot"]["current_task"] = "-"
-        SYSTEM_STATE["program"]["current_step"] = 0
-        SYSTEM_STATE["program"]["total_steps"] = 0
-        SYSTEM_STATE["program"]["current_label"] = "-"
-        SYSTEM_STATE["program"]["vacuum_on"] = False
-        SYSTEM_STATE["program"]["running"] = False
-        SYSTEM_STATE["program"]["paused"] = False
+        self._done.clear()
+        self._frames.clear()
+
+        from src.app.core.state import SYSTEM_STATE
+        SYSTEM_STATE.update("robot", status="idle", current_task="-")
+        SYSTEM_STATE.update(
+            "program",
+            current_step=0,
+            total_steps=0,
+            current_label="-",
+            vacuum_on=False,
+            running=False,
+            paused=False,
+        )
 
         # pcb tamamlamasini sifirlama
-        for k in SYSTEM_STATE["program"]["pcb_done"].keys():
-            SYSTEM_STATE["program"]["pcb_done"][k] = False
+        with SYSTEM_STATE.edit("program") as program:
+            for k in program["pcb_done"].keys():
+                program["pcb_done"][k] = False
 
         self._log("GCodeRunner: RESET done")
         self._thread = None
@@ -154,34 +180,60 @@ class GCodeRunner:
         return not self._stop_event.is_set()
 
     def _send_many(self, robot, lines: list[str]) -> bool:
-        from src.app.routers.status import SYSTEM_STATE
+        """
+        Stream a step's G-code lines (GRBL character counting).
+        On pause, no new lines are written; streaming continues after resume.
+        """
+        from src.app.core.state import SYSTEM_STATE
+
+        remaining = [ln.strip() for ln in lines if ln and ln.strip()]  # bos satir atlama
 
-        for line in lines:
+        def on_result(idx: int, line: str, ok: bool, resp: str) -> None:
+            # GRBL'in son bilgisi ile UI guncellenmeli
+            SYSTEM_STATE.update(
+                "grbl",
+                last_line=line,
+                last_ok=bool(ok),
+                last_updated=time.strftime("%Y-%m-%dT%H:%M:%S"),
+            )
+            if not ok:
+                self._log(f"GCode error on: {line} ({resp})", level="ERROR")
+
+        def should_stop() -> bool:
+            return self._pause_event.is_set() or self._stop_event.is_set()
+
+        while remaining:
             if not self._wait_if_paused():
                 return False
-            
-            line = (line or "").strip()
-            if not line:
-                continue  # bos satir atlama
 
-            ok = robot.send_gcode(line)
+            results = robot.send_gcode_stream(remaining, on_result=on_result, should_stop=should_stop)
 
-            # GRBL'in son bilgisi ile UI guncellenmeli
-            SYSTEM_STATE["grbl"]["last_line"] = line
-            SYSTEM_STATE["grbl"]["last_ok"] = bool(ok)
-            SYSTEM_STATE["grbl"]["last_updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            # gonderilemeyenler (pause) resume sonrasi
+            sent = sum(1 for r in results if r is not None)
 
-            if not ok:
-                self._log(f"GCode error on: {line}")
-                SYSTEM_STATE["robot"]["status"] = "error"
-                SYSTEM_STATE["robot"]["current_task"] = "G-code error"
-                SYSTEM_STATE["program"]["running"] = False
-                SYSTEM_STATE["program"]["paused"] = False
+            # hata veya hic gonderilemedi (baglanti yok)
+            if any(r is False for r in results) or (sent == 0 and not should_stop()):
+                SYSTEM_STATE.update("robot", status="error", current_task="G-code error")
+                SYSTEM_STATE.update("program", running=False, paused=False)
                 return False
 
+            remaining = remaining[sent:]
+
         return True
     
 
+    def _wait_motion_complete(self, robot, step) -> bool:
+        """Block until the gantry is stationary; on failure stop the program with an error."""
+        from src.app.core.state import SYSTEM_STATE
+
+        if robot.wait_motion_complete():
+            return True
+
+        self._log(f"Motion not complete after {step.id} (timeout/alarm)")
+        SYSTEM_STATE.update("robot", status="error", current_task="Motion timeout")
+        SYSTEM_STATE.update("program", running=False, paused=False)
+        return False
+
     # vision
     def _extract_comp_and_pad(self, step_id: str):
         """
@@ -203,38 +255,41 @@ class GCodeRunner:
         return comp, pad
 
 
-    def _run_pick_vision(self, step_id: str) -> None:
-        from src.app.routers.status import SYSTEM_STATE
+    def _capture_frame(self):
+        """Capture a frame while the head is stationary (None if vision is not available)."""
         from src.app.main import camera_service, vision_service
 
         if camera_service is None or vision_service is None:
-            return
+            return None
         if not vision_service.is_ready():
-            return
+            return None
 
-        frame = camera_service.get_frame()
-        if frame is None:
-            return
+        # hareket bittikten sonra yakalanan frame (arka plan yakalamada eski frame degil)
+        return camera_service.get_frame(fresh=True)
 
-        boxes, scores, class_ids = vision_service.detect(frame)
-        det = vision_service.summarize_detection(boxes, scores, class_ids)
+    def _run_pick_vision(self, frame) -> None:
+        from src.app.core.state import SYSTEM_STATE
+        from src.app.main import vision_service
+        from src.app.services.vision_service import PRIORITY_RUNNER
 
-        SYSTEM_STATE["image_processing"]["last_detection"] = {
-            "component": det.get("component"),
-            "type": det.get("type"),
-            "confidence": det.get("confidence"),
-        }
-        SYSTEM_STATE["image_processing"]["last_updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        boxes, scores, class_ids = vision_service.detect(frame, priority=PRIORITY_RUNNER)
+        det = vision_service.summarize_detection(boxes, scores, class_ids)
 
-    def _run_place_vision(self, step_id: str) -> None:
-        from src.app.routers.status import SYSTEM_STATE
-        from src.app.main import camera_service, vision_service
+        SYSTEM_STATE.update(
+            "image_processing",
+            last_detection={
+                "component": det.get("component"),
+                "type": det.get("type"),
+                "confidence": det.get("confidence"),
+            },
+            last_updated=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        )
+
+    def _run_place_vision(self, step_id: str, frame) -> None:
+        from src.app.core.state import SYSTEM_STATE
+        from src.app.main import vision_service
         from src.app.services.gcode_programs import TARGET_BOX_BY_PAD
-
-        if camera_service is None or vision_service is None:
-            return
-        if not vision_service.is_ready():
-            return
+        from src.app.services.vision_service import PRIORITY_RUNNER
 
         comp, pad = self._extract_comp_and_pad(step_id)
         if not pad:
@@ -242,153 +297,247 @@ class GCodeRunner:
 
         target_box = TARGET_BOX_BY_PAD.get(pad)
         if not target_box:
-            SYSTEM_STATE["image_processing"]["last_placement"] = {
-                "pad": pad,
-                "accuracy": None,
-                "status": "NO_TARGET_BOX"
-            }
-            SYSTEM_STATE["image_processing"]["last_updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            SYSTEM_STATE.update(
+                "image_processing",
+                last_placement={
+                    "pad": pad,
+                    "accuracy": None,
+                    "status": "NO_TARGET_BOX"
+                },
+                last_updated=time.strftime("%Y-%m-%dT%H:%M:%S"),
+            )
             return
 
-        frame = camera_service.get_frame()
-        if frame is None:
-            return
-
-        boxes, scores, class_ids = vision_service.detect(frame)
+        boxes, scores, class_ids = vision_service.detect(frame, priority=PRIORITY_RUNNER)
         det = vision_service.summarize_detection(boxes, scores, class_ids)
         result = vision_service.score_target(target_box, boxes)
 
         status_txt = "OK" if result["iou"] > 0 else "NO_MATCH"
 
-        SYSTEM_STATE["image_processing"]["last_detection"] = {
-            "component": det.get("component"),
-            "type": det.get("type"),
-            "confidence": det.get("confidence"),
-        }
-
-        SYSTEM_STATE["image_processing"]["last_placement"] = {
-            "pad": pad,
-            "accuracy": float(result["accuracy"]),
-            "status": status_txt
-        }
-
-        SYSTEM_STATE["image_processing"]["last_updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        # tespit + yerlestirme tek versiyonda yayinlaniyor
+        SYSTEM_STATE.update(
+            "image_processing",
+            last_detection={
+                "component": det.get("component"),
+                "type": det.get("type"),
+                "confidence": det.get("confidence"),
+            },
+            last_placement={
+                "pad": pad,
+                "accuracy": float(result["accuracy"]),
+                "status": status_txt
+            },
+            last_updated=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        )
 
 
     # test station
-    def _run_test_measure(self) -> None:
+    def _run_test_measure(self, component: Optional[str] = None) -> bool:
         """
         Test istasyonu adimindan sonra Arduino olcumunu tetikler
         ve SYSTEM_STATE["teststation"] icini gunceller.
+        Olcum arka planda; sonuc beklenirken reset ile cikilabilir.
+        Returns False if hard-stopped while waiting.
         """
-        from src.app.routers.status import SYSTEM_STATE
+        from src.app.core.state import SYSTEM_STATE
         from src.app.main import arduino_service
 
         if arduino_service is None:
             self._log("Test measure skipped: Arduino service not initialized")
-            return
+            return True
+
+        fut = arduino_service.measure_async(component=component)
+        while not fut.done():
+            if self._stop_event.is_set():
+                fut.cancel()
+                return False
+            time.sleep(0.02)
 
         try:
-            data = arduino_service.measure()
+            data = fut.result()
 
-            SYSTEM_STATE["teststation"]["mode"] = data.get("mode", "none")
-            SYSTEM_STATE["teststation"]["last_adc"] = data.get("value_text", "-")
-            SYSTEM_STATE["teststation"]["last_voltage_v"] = data.get("voltage", 0.0)
-            SYSTEM_STATE["teststation"]["last_result"] = data.get("result", "UNKNOWN")
-            SYSTEM_STATE["teststation"]["last_updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            SYSTEM_STATE.update(
+                "teststation",
+                mode=data.get("mode", "none"),
+                last_adc=data.get("value_text", "-"),
+                last_voltage_v=data.get("voltage", 0.0),
+                last_result=data.get("result", "UNKNOWN"),
+                last_updated=time.strftime("%Y-%m-%d %H:%M:%S"),
+            )
 
             self._log(f"Test measurement done: {data.get('result', 'UNKNOWN')}")
         except Exception as e:
-            self._log(f"Test measurement failed: {e}")
+            self._log(f"Test measurement failed: {e}", level="ERROR")
+        return True
 
 
-    def _loop(self) -> None:
-        from src.app.routers.status import SYSTEM_STATE
-        from src.app.main import robot_service
-
-        if robot_service is None:
-            self._log("Robot service not initialized")
-            SYSTEM_STATE["robot"]["status"] = "error"
-            SYSTEM_STATE["program"]["running"] = False
-            return
+    # adimlar
+    def _run_step(self, robot, step) -> bool:
+        """
+        Execute one step by its action.
+        Returns False on a failure that must stop the program.
+        """
+        from src.app.core.state import SYSTEM_STATE
 
-        SYSTEM_STATE["robot"]["status"] = "running"
-        SYSTEM_STATE["program"]["running"] = True
-        SYSTEM_STATE["program"]["paused"] = False
+        if step.action == "gcode":
+            if not self._send_many(robot, step.gcode):
+                return False
 
-        total = len(self.program)
-        SYSTEM_STATE["program"]["total_steps"] = total
+            # vakum takibinin guncellemesi
+            if step.vacuum_expected is not None:
+                self.vacuum_on = bool(step.vacuum_expected)
+                SYSTEM_STATE.update("program", vacuum_on=self.vacuum_on)
 
-        while self.current_step_idx < total:
-            if self._stop_event.is_set():
-                break
+            # yerlestirme bitince PCB'de bitti isaretlemesi yapiliyor
+            # boylelikle UI'de yerlestirilenin rengi degisebilecek
+            # vakum kapandiginda
+            if step.marks_done_component:
+                with SYSTEM_STATE.edit("program") as program:
+                    program["pcb_done"][step.marks_done_component] = True
+            return True
 
-            if self._pause_event.is_set():
-                SYSTEM_STATE["program"]["paused"] = True
-                if not self._wait_if_paused():
+        if step.action == "capture":
+            # vision kafanin durmasini gerektiriyor
+            if not self._wait_motion_complete(robot, step):
+                return False
+            self._frames[step.id] = self._capture_frame()
+            return True
+
+        if step.action in ("detect", "verify_place"):
+            frame = None
+            for dep in step.depends_on:
+                frame = self._frames.pop(dep, None)
+                if frame is not None:
                     break
-                SYSTEM_STATE["program"]["paused"] = False
-                SYSTEM_STATE["robot"]["status"] = "running"
+            if frame is None:
+                # vision hazir degil / frame alinamadi
+                return True
+
+            try:
+                if step.action == "detect":
+                    self._run_pick_vision(frame)
+                else:
+                    self._run_place_vision(step.id, frame)
+            except Exception as e:
+                self._log(f"{step.id}: vision failed: {e}", level="ERROR")
+            return True
+
+        if step.action == "measure":
+            # olcum sirasinda parca problarda durmali
+            if not self._wait_motion_complete(robot, step):
+                return False
+            return self._run_test_measure(component=step.id.split("_")[0])
 
-            step = self.program[self.current_step_idx]
+        self._log(f"{step.id}: unknown action '{step.action}'")
+        return False
 
-            SYSTEM_STATE["program"]["current_step"] = self.current_step_idx + 1
-            SYSTEM_STATE["program"]["current_label"] = step.label
-            SYSTEM_STATE["program"]["vacuum_on"] = self.vacuum_on
+    def _execute(self, robot, step, idx: int, total: int) -> bool:
+        from src.app.core.state import SYSTEM_STATE
 
-            SYSTEM_STATE["robot"]["status"] = "running"
-            SYSTEM_STATE["robot"]["current_task"] = step.label
-            self._log(f"STEP {self.current_step_idx + 1}/{total}: {step.label}")
+        # UI'de gosterilen adim: gantry'yi tutan adim
+        if "gantry" in step.resources:
+            SYSTEM_STATE.update(
+                "program",
+                current_step=idx + 1,
+                current_label=step.label,
+                vacuum_on=self.vacuum_on,
+            )
+            SYSTEM_STATE.update("robot", current_task=step.label)
+        self._log(f"STEP {idx + 1}/{total}: {step.label}")
 
-            # gcode calistirma
-            ok = self._send_many(robot_service, step.gcode)
-            if not ok:
-                return
-            
+        try:
+            return self._run_step(robot, step)
+        except Exception as e:
+            self._log(f"{step.id}: step failed: {e}", level="ERROR")
+            SYSTEM_STATE.update("robot", status="error", current_task="Step error")
+            SYSTEM_STATE.update("program", running=False, paused=False)
+            return False
 
-            # vision
-            # PICK sonrasi detection
-            if step.id.endswith("_PICK_Z"):
-                self._run_pick_vision(step.id)
 
+    def _loop(self) -> None:
+        from src.app.core.state import SYSTEM_STATE
+        from src.app.main import robot_service
 
-            # TEST sonrasi arduino olcumu
-            if step.id.endswith("_TEST_PRESS"):
-                self._run_test_measure()
+        if robot_service is None:
+            self._log("Robot service not initialized")
+            SYSTEM_STATE.update("robot", status="error")
+            SYSTEM_STATE.update("program", running=False)
+            return
 
+        try:
+            graph = StepGraph(self.program)
+        except ValueError as e:
+            self._log(f"GCodeRunner: invalid program - {e}")
+            SYSTEM_STATE.update("robot", status="error")
+            SYSTEM_STATE.update("program", running=False)
+            return
 
-            # vision
-            # PLACE sonrasi placement verification
-            if step.id.endswith("_PLACE"):
-                self._run_place_vision(step.id)
+        SYSTEM_STATE.update("robot", status="running")
+        SYSTEM_STATE.update("program", running=True, paused=False)
 
+        total = len(graph)
+        SYSTEM_STATE.update("program", total_steps=total)
 
-            # vakum takibinin guncellemesi
-            if step.vacuum_expected is not None:
-                self.vacuum_on = bool(step.vacuum_expected)
-                SYSTEM_STATE["program"]["vacuum_on"] = self.vacuum_on
+        # seri: ayni anda tek adim (= program sirasi), pipeline: bagimsiz adimlar paralel
+        limit = self.workers if self.pipelined else 1
+        running: dict[Future, object] = {}
+        failed = False
 
-            # yerlestirme bitince PCB'de bitti isaretlemesi yapiliyor
-            # boylelikle UI'de yerlestirilenin rengi degisebilecek
-            # vakum kapandiginda
-            if step.marks_done_component:
-                SYSTEM_STATE["program"]["pcb_done"][step.marks_done_component] = True
+        with ThreadPoolExecutor(max_workers=limit, thread_name_prefix="runner") as pool:
+            while len(self._done) < total:
+                if self._stop_event.is_set() or failed:
+                    break
+
+                if self._pause_event.is_set():
+                    # calisan adimlar kendi icinde duruyor (gcode), yenisi baslamiyor
+                    SYSTEM_STATE.update("program", paused=True)
+                    if not self._wait_if_paused():
+                        break
+                    SYSTEM_STATE.update("program", paused=False)
+                    SYSTEM_STATE.update("robot", status="running")
+
+                for step in graph.ready(self._done, (st.id for st in running.values())):
+                    if len(running) >= limit:
+                        break
+                    fut = pool.submit(self._execute, robot_service, step, graph.index[step.id], total)
+                    running[fut] = step
+
+                if not running:
+                    # hazir adim yok ve calisan yok: graph tutarsiz
+                    self._log("GCodeRunner: no runnable step left")
+                    failed = True
+                    break
+
+                finished, _ = wait(list(running), timeout=0.1, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    step = running.pop(fut)
+                    if fut.result():
+                        self._done.add(step.id)
+                    else:
+                        failed = True
+
+                self.current_step_idx = len(self._done)
 
-            self.current_step_idx += 1
+            # calisan adimlarin bitmesini bekle
+            for fut in wait(list(running)).done:
+                step = running.pop(fut)
+                if fut.result():
+                    self._done.add(step.id)
+            self.current_step_idx = len(self._done)
+
+        if failed:
+            return
 
         # finished
-        SYSTEM_STATE["robot"]["status"] = "idle"
-        SYSTEM_STATE["robot"]["current_task"] = "done"
-        SYSTEM_STATE["program"]["running"] = False
-        SYSTEM_STATE["program"]["paused"] = False
-        SYSTEM_STATE["program"]["current_label"] = "done"
+        SYSTEM_STATE.update("robot", status="idle", current_task="done")
+        SYSTEM_STATE.update("program", running=False, paused=False, current_label="done")
         self._log("GCodeRunner: finished")
 
 
 gcode_runner = None
 
 
-def init_gcode_runner():
+def init_gcode_runner(pipelined: bool = False, workers: int = 2, optimize_order: bool = False):
     global gcode_runner
-    gcode_runner = GCodeRunner()
+    gcode_runner = GCodeRunner(pipelined=pipelined, workers=workers, optimize_order=optimize_order)
     return gcode_runner
\ No newline at end of file
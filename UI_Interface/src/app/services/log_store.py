@@ -0,0 +1,174 @@
+"""
+File Name       : log_store.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Central log store (replaces the SYSTEM_STATE["logs"] list).
+Records are kept in a bounded deque (PNP_LOG_MAX, oldest dropped):
+    {"seq": N, "ts": "...", "level": "INFO", "source": "runner", "message": "..."}
+seq is monotonic, so clients fetch only new entries (after(seq)).
+Optionally every record is also written as a JSON line to a rotating file
+(PNP_LOG_FILE, logging.handlers.RotatingFileHandler).
+
+Usage:
+    from src.app.services.log_store import log
+    log("Command received: START", source="commands")
+"""
+
+import json
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+
+class LogStore:
+    def __init__(
+        self,
+        max_entries: int = 300,
+        file_path: Optional[str] = None,
+        file_max_bytes: int = 1024 * 1024,
+        file_backups: int = 3,
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._records: deque = deque(maxlen=self.max_entries)
+        self._seq = 0
+        self._listeners: List = []
+
+        # diske yazma (istege bagli)
+        self._file_logger: Optional[logging.Logger] = None
+        if file_path:
+            try:
+                handler = RotatingFileHandler(
+                    file_path, maxBytes=file_max_bytes, backupCount=file_backups, encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger = logging.getLogger("pnp.log_store")
+                logger.handlers.clear()
+                logger.addHandler(handler)
+                logger.setLevel(logging.DEBUG)
+                logger.propagate = False
+                self._file_logger = logger
+            except OSError as e:
+                print(f"[LOG_STORE] Could not open log file {file_path}: {e}")
+
+        print(f"[LOG_STORE] Initialized (max={self.max_entries}, file={file_path if self._file_logger else None})")
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    @property
+    def first_seq(self) -> int:
+        """seq of the oldest kept record (after(seq) with seq < first_seq - 1 missed some)."""
+        with self._lock:
+            return self._records[0]["seq"] if self._records else self._seq + 1
+
+    def append(self, message: str, level: str = "INFO", source: str = "app") -> Dict[str, Any]:
+        level = level.upper() if level.upper() in LEVELS else "INFO"
+        with self._lock:
+            self._seq += 1
+            record = {
+                "seq": self._seq,
+                "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "level": level,
+                "source": source,
+                "message": str(message),
+            }
+            self._records.append(record)
+            listeners = list(self._listeners)
+
+        if self._file_logger is not None:
+            self._file_logger.log(
+                getattr(logging, level, logging.INFO),
+                json.dumps(record, ensure_ascii=False, separators=(",", ":")),
+            )
+        for fn in listeners:
+            try:
+                fn(record)
+            except Exception as e:
+                print(f"[LOG_STORE] Listener error: {e}")
+        return record
+
+    def add_listener(self, fn) -> None:
+        """fn(record) is called after every append (outside the lock)."""
+        with self._lock:
+            self._listeners.append(fn)
+
+    def after(
+        self,
+        seq: int = 0,
+        limit: int = 0,
+        level: Optional[str] = None,
+        upto: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Records with seq > `seq` (oldest first).
+        limit > 0: with seq > 0 the oldest `limit` (paging, continue from the
+        last returned seq); with seq == 0 the newest `limit` (tail).
+        upto: only records with seq <= upto (e.g. the log seq of a state snapshot).
+        """
+        with self._lock:
+            # seq ardisik: ilk kaydin seq'inden ofset hesaplanabilir
+            if self._records:
+                skip = max(0, seq - self._records[0]["seq"] + 1)
+                items = list(self._records)[skip:]
+            else:
+                items = []
+
+        if upto is not None:
+            items = [r for r in items if r["seq"] <= upto]
+        if level:
+            items = [r for r in items if r["level"] == level.upper()]
+        if limit > 0:
+            # sayfalama eskiden yeniye: bosluk kalmasin
+            items = items[:limit] if seq > 0 else items[-limit:]
+        return items
+
+    def lines(self, limit: int = 0, upto: Optional[int] = None) -> List[str]:
+        """Old "[ts] message" strings (dashboard log box)."""
+        return [format_line(r) for r in self.after(0, limit, upto=upto)]
+
+    def clear(self) -> None:
+        # seq sifirlanmaz: istemcilerin after(seq) sorgulari gecerli kalsin
+        with self._lock:
+            self._records.clear()
+
+
+def format_line(record: Dict[str, Any]) -> str:
+    return f"[{record['ts']}] {record['message']}"
+
+
+# ilk importtan itibaren kullanilabilsin; init_log_store() ayarlarla yeniden kurar
+log_store = LogStore()
+
+
+def log(message: str, level: str = "INFO", source: str = "app") -> Dict[str, Any]:
+    """Append a record to the current log store."""
+    return log_store.append(message, level=level, source=source)
+
+
+def init_log_store(
+    max_entries: int = 300,
+    file_path: Optional[str] = None,
+    file_max_bytes: int = 1024 * 1024,
+    file_backups: int = 3,
+):
+    """Initialize log store singleton"""
+    global log_store
+    log_store = LogStore(
+        max_entries=max_entries,
+        file_path=file_path,
+        file_max_bytes=file_max_bytes,
+        file_backups=file_backups,
+    )
+    return log_store
@@ -0,0 +1,279 @@
+"""
+File Name       : measurement_history.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Bounded, array-backed history of test-station measurements (numpy ring buffer).
+Each record: seq, timestamp, component, mode, value_ohm, vout, result.
+
+Rolling statistics (count, mean, stddev, Cpk) are kept per component,
+incrementally (running sum / sum of squares, updated on append and when the
+oldest record is overwritten): R1, R2, ... have different values, so a mean
+or Cpk over the mixed window would be meaningless. Cpk uses the component's
+nominal from PNP_TEST_NOMINALS (e.g. "R1=4700,R2=10000"), falling back to
+PNP_TEST_NOMINAL_OHM, +- PNP_TEST_TOL_PCT.
+Only resistor readings with a value take part in the statistics.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+RECORD_DTYPE = np.dtype([
+    ("seq", "i8"),
+    ("ts", "f8"),           # unix time
+    ("component", "U8"),
+    ("mode", "U8"),
+    ("value_ohm", "f8"),    # NaN => deger yok
+    ("vout", "f8"),
+    ("result", "U16"),
+])
+
+
+class MeasurementHistory:
+    def __init__(
+        self,
+        capacity: int = 1024,
+        nominal_ohm: Optional[float] = None,
+        tol_pct: float = 5.0,
+        nominals: Optional[Dict[str, float]] = None,
+    ):
+        self.capacity = max(1, int(capacity))
+        self.nominal_ohm = nominal_ohm if nominal_ohm else None      # varsayilan
+        self.nominals = {k.upper(): float(v) for k, v in (nominals or {}).items() if v}
+        self.tol_pct = tol_pct
+
+        self._lock = threading.Lock()
+        self._buf = np.zeros(self.capacity, dtype=RECORD_DTYPE)
+        self._head = 0          # bir sonraki yazilacak index
+        self._size = 0
+        self._seq = 0
+
+        # artimli istatistik, komponent basina: component -> [n, sum, sumsq]
+        self._comp: Dict[str, List[float]] = {}
+        self._results: Counter = Counter()
+        self._since_recompute = 0
+
+        print(f"[HISTORY] Initialized (capacity={self.capacity}, nominal={self.nominal_ohm}, nominals={self.nominals or '-'}, tol={tol_pct}%)")
+
+    def nominal_for(self, component: Optional[str]) -> Optional[float]:
+        return self.nominals.get((component or "").upper(), self.nominal_ohm)
+
+    @staticmethod
+    def _stat_value(rec) -> Optional[float]:
+        value = float(rec["value_ohm"])
+        if rec["mode"] != "resistor" or not math.isfinite(value):
+            return None
+        return value
+
+    def _add_stats(self, rec, sign: int) -> None:
+        value = self._stat_value(rec)
+        if value is not None:
+            comp = str(rec["component"])
+            acc = self._comp.setdefault(comp, [0, 0.0, 0.0])
+            acc[0] += sign
+            acc[1] += sign * value
+            acc[2] += sign * value * value
+            if acc[0] <= 0:
+                del self._comp[comp]
+        self._results[str(rec["result"])] += sign
+        if self._results[str(rec["result"])] <= 0:
+            del self._results[str(rec["result"])]
+
+    def _recompute_locked(self) -> None:
+        # toplam/kare toplam cikarmalarinin kayan nokta hatasi birikmesin
+        window = self._window_locked()
+        mask = (window["mode"] == "resistor") & np.isfinite(window["value_ohm"])
+        valid = window[mask]
+        self._comp = {}
+        for comp in np.unique(valid["component"]):
+            values = valid["value_ohm"][valid["component"] == comp]
+            self._comp[str(comp)] = [int(values.size), float(values.sum()), float(np.square(values).sum())]
+        self._results = Counter(str(r) for r in window["result"])
+        self._since_recompute = 0
+
+    def append(self, data: Dict[str, Any], component: Optional[str] = None, ts: Optional[float] = None) -> int:
+        """Record one measure() result; returns its sequence number."""
+        value = data.get("value_ohm")
+        with self._lock:
+            self._seq += 1
+            rec = np.zeros((), dtype=RECORD_DTYPE)
+            rec["seq"] = self._seq
+            rec["ts"] = time.time() if ts is None else ts
+            # C1 ve c1 ayni komponent: buyuk harfle saklanir (nominals gibi)
+            rec["component"] = (component or "").upper()[:8]
+            rec["mode"] = str(data.get("mode", "none"))[:8]
+            rec["value_ohm"] = float(value) if value is not None else np.nan
+            rec["vout"] = float(data.get("voltage") or 0.0)
+            rec["result"] = str(data.get("result", "UNKNOWN"))[:16]
+
+            if self._size == self.capacity:
+                # en eski kayit uzerine yaziliyor
+                self._add_stats(self._buf[self._head], -1)
+            else:
+                self._size += 1
+
+            self._buf[self._head] = rec
+            self._add_stats(rec, +1)
+            self._head = (self._head + 1) % self.capacity
+
+            self._since_recompute += 1
+            if self._since_recompute >= self.capacity:
+                self._recompute_locked()
+            return self._seq
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _window_locked(self) -> np.ndarray:
+        """Records in chronological order (copy)."""
+        if self._size < self.capacity:
+            return self._buf[:self._size].copy()
+        return np.concatenate((self._buf[self._head:], self._buf[:self._head]))
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Window summary: record count, result counts and statistics per
+        component (no mean/Cpk across different parts).
+        Records without a component (manual test_measure) are listed under "-".
+        """
+        with self._lock:
+            comps = {c: tuple(acc) for c, acc in self._comp.items()}
+            results = dict(self._results)
+            total = self._size
+
+        by_component = {}
+        for comp in sorted(comps):
+            n, s, sq = comps[comp]
+            by_component[comp or "-"] = _stats_dict(
+                int(n), s, sq, None, None, self.nominal_for(comp), self.tol_pct,
+            )
+        return {
+            "records": total,
+            "count": int(sum(acc[0] for acc in comps.values())),
+            "results": results,
+            "by_component": by_component,
+        }
+
+    def query(
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        max_points: int = 0,
+        component: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Page of records, newest first: skip `offset`, take `limit`.
+        max_points > 0 downsamples the page by a fixed stride.
+        With a component filter the statistics (mean, stddev, Cpk) are computed
+        for that component; without it, stats() gives them per component.
+        """
+        with self._lock:
+            window = self._window_locked()
+
+        if component:
+            component = component.upper()
+            window = window[window["component"] == component[:8]]
+
+        newest_first = window[::-1]
+        total = int(newest_first.size)
+        page = newest_first[max(0, offset): max(0, offset) + max(0, limit)]
+
+        stride = 1
+        if max_points and page.size > max_points:
+            stride = math.ceil(page.size / max_points)
+            page = page[::stride]
+
+        if component:
+            mask = (window["mode"] == "resistor") & np.isfinite(window["value_ohm"])
+            values = window["value_ohm"][mask]
+            stats = _stats_dict(
+                int(values.size), float(values.sum()), float(np.square(values).sum()),
+                dict(Counter(str(r) for r in window["result"])), total, self.nominal_for(component), self.tol_pct,
+            )
+        else:
+            stats = self.stats()
+
+        return {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "stride": stride,
+            "items": _records_to_dicts(page),
+            "stats": stats,
+        }
+
+
+def _stats_dict(n, s, sq, results, total, nominal, tol_pct) -> Dict[str, Any]:
+    mean = s / n if n else None
+    std = None
+    if n > 1:
+        var = (sq - s * s / n) / (n - 1)
+        std = math.sqrt(max(var, 0.0))
+
+    usl = lsl = cpk = None
+    if nominal:
+        usl = nominal * (1.0 + tol_pct / 100.0)
+        lsl = nominal * (1.0 - tol_pct / 100.0)
+        if mean is not None and std:
+            cpk = min(usl - mean, mean - lsl) / (3.0 * std)
+
+    out = {
+        "records": total,
+        "count": n,
+        "mean_ohm": mean,
+        "std_ohm": std,
+        "nominal_ohm": nominal,
+        "tol_pct": tol_pct,
+        "usl_ohm": usl,
+        "lsl_ohm": lsl,
+        "cpk": cpk,
+        "results": results,
+    }
+    # komponent alt ozetinde records/results ust seviyede
+    if total is None:
+        del out["records"], out["results"]
+    return out
+
+
+def _records_to_dicts(page: np.ndarray) -> List[Dict[str, Any]]:
+    items = []
+    for rec in page:
+        value = float(rec["value_ohm"])
+        items.append({
+            "seq": int(rec["seq"]),
+            "ts": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(float(rec["ts"]))),
+            "component": str(rec["component"]) or None,
+            "mode": str(rec["mode"]),
+            "value_ohm": value if math.isfinite(value) else None,
+            "vout": float(rec["vout"]),
+            "result": str(rec["result"]),
+        })
+    return items
+
+
+measurement_history = None
+
+
+def init_measurement_history(
+    capacity: int = 1024,
+    nominal_ohm: Optional[float] = None,
+    tol_pct: float = 5.0,
+    nominals: Optional[Dict[str, float]] = None,
+):
+    """Initialize measurement history singleton"""
+    global measurement_history
+    measurement_history = MeasurementHistory(
+        capacity=capacity, nominal_ohm=nominal_ohm, tol_pct=tol_pct, nominals=nominals,
+    )
+    return measurement_history
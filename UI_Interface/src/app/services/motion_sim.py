@@ -0,0 +1,322 @@
+"""
+File Name       : motion_sim.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Offline motion time estimator / dry-run simulator for G-code programs.
+Parses G0/G1/G4/M8/M9/G90/G91 (G20/G21) and times each move with a
+GRBL-like trapezoidal profile using max rates ($110-$112, mm/min) and
+accelerations ($120-$122, mm/s^2). Each move starts and ends at rest,
+so estimates are slightly pessimistic compared to GRBL junction blending.
+
+    simulate_program() : per-step + total cycle time, gantry idle gaps
+                         (capture / measurement) and the pipelined estimate
+    MotionSimulator    : also used by RobotService in DEMO mode
+                         (PNP_DEMO_MOTION_SIM=true) instead of a fixed sleep
+
+Usage (from UI_Interface/):
+    python -m src.app.services.motion_sim
+    python -m src.app.services.motion_sim --from-coords --measure 1.5 --settings grbl_settings.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+# $$ ciktisindaki ayarlar (varsayilanlar grbl 1.1 ile ayni)
+DEFAULT_SETTINGS: Dict[int, float] = {
+    110: 500.0, 111: 500.0, 112: 500.0,     # max rate, mm/min
+    120: 10.0, 121: 10.0, 122: 10.0,        # acceleration, mm/s^2
+}
+
+_WORD_RE = re.compile(r"([A-Z])\s*([-+]?\d*\.?\d+)")
+_SETTING_RE = re.compile(r"^\s*\$(\d+)\s*=\s*([-+]?\d*\.?\d+)")
+
+AXES = ("X", "Y", "Z")
+
+
+@dataclass
+class MachineProfile:
+    max_rate_mm_min: Tuple[float, float, float] = (500.0, 500.0, 500.0)
+    accel_mm_s2: Tuple[float, float, float] = (10.0, 10.0, 10.0)
+
+    @classmethod
+    def from_settings(cls, settings: Dict[int, float]) -> "MachineProfile":
+        merged = {**DEFAULT_SETTINGS, **settings}
+        return cls(
+            max_rate_mm_min=(merged[110], merged[111], merged[112]),
+            accel_mm_s2=(merged[120], merged[121], merged[122]),
+        )
+
+    @classmethod
+    def from_grbl_dump(cls, text: str) -> "MachineProfile":
+        """Parse `$$` output (lines like `$110=5000.000`)."""
+        settings: Dict[int, float] = {}
+        for line in text.splitlines():
+            m = _SETTING_RE.match(line)
+            if m:
+                settings[int(m.group(1))] = float(m.group(2))
+        return cls.from_settings(settings)
+
+
+def trapezoid_time(distance: float, v_max: float, accel: float) -> float:
+    """Rest-to-rest move time (s) for distance (mm), v_max (mm/s), accel (mm/s^2)."""
+    if distance <= 0:
+        return 0.0
+    if accel <= 0:
+        return distance / v_max
+    # tepe hiza ulasamiyorsa ucgen profil
+    if distance < v_max * v_max / accel:
+        return 2.0 * math.sqrt(distance / accel)
+    return distance / v_max + v_max / accel
+
+
+class MotionSimulator:
+    def __init__(self, profile: Optional[MachineProfile] = None):
+        self.profile = profile or MachineProfile()
+        self.pos = [0.0, 0.0, 0.0]
+        self.absolute = True        # G90 / G91
+        self.inches = False         # G20 / G21
+        self.feed_mm_min = 0.0      # G1 modal F
+        self.motion_mode = 0        # 0 = G0, 1 = G1 (modal)
+        self.coolant = False        # M8 / M9 (vakum)
+        self.elapsed_s = 0.0
+
+    @property
+    def position(self) -> Dict[str, float]:
+        return {"x": self.pos[0], "y": self.pos[1], "z": self.pos[2]}
+
+    def _move_time(self, target: List[float], rapid: bool) -> float:
+        delta = [t - p for t, p in zip(target, self.pos)]
+        dist = math.sqrt(sum(d * d for d in delta))
+        if dist == 0:
+            return 0.0
+
+        # her eksenin hiz/ivme siniri hareket yonune gore olceklenir (grbl planner gibi)
+        v_max = math.inf
+        accel = math.inf
+        for d, rate, acc in zip(delta, self.profile.max_rate_mm_min, self.profile.accel_mm_s2):
+            unit = abs(d) / dist
+            if unit > 0:
+                v_max = min(v_max, rate / 60.0 / unit)
+                accel = min(accel, acc / unit)
+
+        if not rapid and self.feed_mm_min > 0:
+            v_max = min(v_max, self.feed_mm_min / 60.0)
+
+        return trapezoid_time(dist, v_max, accel)
+
+    def execute(self, line: str) -> float:
+        """Apply one G-code line to the machine state; return its duration (s)."""
+        line = line.split(";", 1)[0].split("(", 1)[0].strip().upper()
+        if not line:
+            return 0.0
+
+        words = _WORD_RE.findall(line)
+        g_codes = [float(v) for k, v in words if k == "G"]
+        m_codes = [int(float(v)) for k, v in words if k == "M"]
+        values = {k: float(v) for k, v in words if k not in ("G", "M", "N")}
+
+        duration = 0.0
+        dwell = False
+        for g in g_codes:
+            if g == 90:
+                self.absolute = True
+            elif g == 91:
+                self.absolute = False
+            elif g == 20:
+                self.inches = True
+            elif g == 21:
+                self.inches = False
+            elif g == 4:
+                dwell = True
+            elif g in (0, 1):
+                self.motion_mode = int(g)
+
+        for m in m_codes:
+            if m in (7, 8):
+                self.coolant = True
+            elif m == 9:
+                self.coolant = False
+
+        scale = 25.4 if self.inches else 1.0
+        if "F" in values:
+            self.feed_mm_min = values["F"] * scale
+
+        if dwell:
+            # grbl: G4 P saniye
+            duration = max(0.0, values.get("P", 0.0))
+        elif any(a in values for a in AXES) and (self.motion_mode in (0, 1)):
+            target = list(self.pos)
+            for i, a in enumerate(AXES):
+                if a in values:
+                    v = values[a] * scale
+                    target[i] = v if self.absolute else self.pos[i] + v
+            duration = self._move_time(target, rapid=self.motion_mode == 0)
+            self.pos = target
+
+        self.elapsed_s += duration
+        return duration
+
+    def run(self, lines: List[str]) -> float:
+        return sum(self.execute(ln) for ln in lines)
+
+
+# program simulasyonu
+@dataclass
+class StepTiming:
+    id: str
+    label: str
+    action: str
+    motion_s: float = 0.0
+    idle_s: float = 0.0        # gantry dururken bekleme (capture / olcum)
+    vision_s: float = 0.0      # gantry disinda (detect / verify)
+
+    @property
+    def total_s(self) -> float:
+        return self.motion_s + self.idle_s + self.vision_s
+
+
+@dataclass
+class SimReport:
+    steps: List[StepTiming] = field(default_factory=list)
+    serial_s: float = 0.0       # tum adimlar sirayla
+    pipelined_s: float = 0.0    # kaynak/bagimlilik grafiginin kritik yolu
+
+    @property
+    def motion_s(self) -> float:
+        return sum(s.motion_s for s in self.steps)
+
+    @property
+    def idle_s(self) -> float:
+        return sum(s.idle_s for s in self.steps)
+
+    @property
+    def vision_s(self) -> float:
+        return sum(s.vision_s for s in self.steps)
+
+    def format(self) -> str:
+        rows = [f"{'step':<20} {'action':<12} {'motion':>8} {'idle':>8} {'vision':>8}"]
+        for s in self.steps:
+            rows.append(f"{s.id:<20} {s.action:<12} {s.motion_s:8.2f} {s.idle_s:8.2f} {s.vision_s:8.2f}")
+        rows.append(
+            f"motion {self.motion_s:.2f} s | gantry idle {self.idle_s:.2f} s | vision {self.vision_s:.2f} s"
+        )
+        rows.append(f"cycle: serial {self.serial_s:.2f} s | pipelined {self.pipelined_s:.2f} s")
+        return "\n".join(rows)
+
+
+def simulate_program(
+    steps: list,
+    profile: Optional[MachineProfile] = None,
+    capture_s: float = 0.1,
+    vision_s: float = 0.15,
+    measure_s: float = 1.0,
+) -> SimReport:
+    """
+    Time a build_program() step list.
+    Non-G-code actions use the given estimates: capture/measure hold the
+    gantry (idle gap), detect/verify_place run beside the motion.
+    """
+    from src.app.services.step_scheduler import StepGraph
+
+    sim = MotionSimulator(profile)
+    report = SimReport()
+    durations: Dict[str, float] = {}
+
+    for step in steps:
+        t = StepTiming(id=step.id, label=step.label, action=step.action)
+        if step.action == "gcode":
+            t.motion_s = sim.run(step.gcode)
+        elif step.action == "capture":
+            t.idle_s = capture_s
+        elif step.action == "measure":
+            t.idle_s = measure_s
+        elif step.action in ("detect", "verify_place"):
+            t.vision_s = vision_s
+        report.steps.append(t)
+        durations[step.id] = t.total_s
+
+    report.serial_s = sum(durations.values())
+
+    # kritik yol: adim, bagimliliklarinin hepsi bitince baslar (sinirsiz worker)
+    graph = StepGraph(steps)
+    finish: Dict[str, float] = {}
+
+    def _finish(sid: str) -> float:
+        if sid not in finish:
+            start = max((_finish(d) for d in graph.deps[sid]), default=0.0)
+            finish[sid] = start + durations[sid]
+        return finish[sid]
+
+    report.pipelined_s = max((_finish(s.id) for s in steps), default=0.0)
+    return report
+
+
+def gcode_from_coordinates() -> Dict[str, List[str]]:
+    """
+    Fill the GCODE table from robot_actions coordinates (dry runs before the
+    real table is written). Uses the same helpers the robot actions use.
+    """
+    from src.app.services import robot_actions as ra
+    from src.app.services.gcode_programs import PAD_BY_COMPONENT
+
+    def safe_xy(pos) -> List[str]:
+        return [ra._g0(z=ra.SAFE_Z), ra._g0(x=pos[0], y=pos[1])]
+
+    table: Dict[str, List[str]] = {
+        "HOME": ["G90", ra._g0(z=ra.SAFE_Z), ra._g0(x=0, y=0)],
+        "VAC_ON": ["M8"],
+        "VAC_OFF": [ra._g0(z=ra.PLACE_Z), "M9", ra._g0(z=ra.SAFE_Z)],
+        "MOVE_TEST": safe_xy(ra.TEST_STATION_POS),
+        "TEST_PRESS_DWELL": [ra._g0(z=ra.TEST_STATION_POS[2]), "G4 P0.5"],
+    }
+    for comp, pad in PAD_BY_COMPONENT.items():
+        feeder = ra.FEEDER_POS.get(comp)
+        if feeder is not None:
+            table[f"{comp}_FEEDER_MOVE"] = safe_xy(feeder)
+            table[f"{comp}_PICK_Z"] = [ra._g0(z=ra.PICK_Z), ra._g0(z=ra.SAFE_Z)]
+        if pad in ra.PAD_POS:
+            table[f"MOVE_PCB_{pad}"] = safe_xy(ra.PAD_POS[pad])
+    return table
+
+
+def main() -> None:
+    from src.app.services import gcode_programs
+
+    ap = argparse.ArgumentParser(description="Dry-run cycle time estimate for build_program()")
+    ap.add_argument("--settings", help="file with GRBL `$$` output ($110.. $122)")
+    ap.add_argument("--from-coords", action="store_true",
+                    help="fill empty GCODE entries from robot_actions coordinates")
+    ap.add_argument("--capture", type=float, default=0.1, help="frame capture time (s)")
+    ap.add_argument("--vision", type=float, default=0.15, help="inference time per frame (s)")
+    ap.add_argument("--measure", type=float, default=1.0, help="test station measurement (s)")
+    ap.add_argument("--order", help="component order, e.g. R2,R1,D1,D2")
+    args = ap.parse_args()
+
+    profile = None
+    if args.settings:
+        with open(args.settings, "r", encoding="utf-8") as f:
+            profile = MachineProfile.from_grbl_dump(f.read())
+
+    if args.from_coords:
+        for key, lines in gcode_from_coordinates().items():
+            if not gcode_programs.GCODE.get(key):
+                gcode_programs.GCODE[key] = lines
+
+    order = [c.strip().upper() for c in args.order.split(",")] if args.order else None
+    steps = gcode_programs.build_program(order=order)
+    report = simulate_program(steps, profile, args.capture, args.vision, args.measure)
+    print(report.format())
+
+
+if __name__ == "__main__":
+    main()
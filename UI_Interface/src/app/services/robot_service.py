@@ -3,37 +3,132 @@ File Name       : robotService.py
 Author          : Eda
 Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
 Created Date    : 2026-02-03
-Last Modified   : 2026-02-25
+Last Modified   : 2026-10-17
 
 Description:
 Robot control service with DEMO and REAL modes.
 - DEMO mode: Simulates robot motion
 - REAL mode: Communicates with GRBL over serial
+
+Serial I/O (REAL mode):
+One reader thread owns the serial port input and demultiplexes GRBL output:
+    <...>            -> status slot (query_status_async futures)
+    ok / error:N     -> oldest pending command future
+    ALARM / [MSG] .. -> event stream (get_events)
+Writes go through a TX queue that uses GRBL's character-counting protocol:
+lines are written as long as they fit in the 128-byte serial RX buffer,
+so the planner never idles between lines (send_gcode_stream).
+
+Status (REAL mode):
+The polling thread only writes the real-time '?' byte, faster while the
+machine is moving (Run/Jog/Home) and slower while Idle. Reports are parsed
+by the reader thread in one pass (MPos/WPos/WCO/FS/Bf/Ov/Pn/Ln) and pushed
+straight into SYSTEM_STATE.
+
+Motion completion:
+An 'ok' only means a line was buffered. wait_motion_complete() blocks until
+the machine is really stationary (Idle + empty planner from status reports,
+or a G4 P0 sync) and is used only where vision/measurement needs it.
 """
 
 import threading
 import time
 import re
-from typing import Dict, Any
-#from src.app.routers.status import SYSTEM_STATE
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, List, Optional
+#from src.app.core.state import SYSTEM_STATE
+
+# grbl seri giris buffer boyutu (grbl 1.1: 128 byte)
+GRBL_RX_BUFFER_SIZE = 128
+
+# status raporu: <State[:sub]|alan:deger|...>
+_STATUS_RE = re.compile(r"^<([A-Za-z]+)(?::(\d+))?(?:\|(.*))?>$")
+
+# hareket halindeki durumlar - hizli polling
+_MOVING_STATES = {"run", "jog", "home", "hold"}
+
+
+def _floats(text: str) -> List[float]:
+    try:
+        return [float(v) for v in text.split(",")]
+    except ValueError:
+        return []
+
+
+@dataclass
+class GcodeAck:
+    line: str
+    ok: bool
+    response: str    # "ok", "error:N", "ALARM:N", "timeout", "disconnected"...
 
 
 class RobotService:
-    def __init__(self, demo_mode: bool = True, port: str = "/dev/ttyACM0", baudrate: int = 115200):
+    def __init__(
+        self,
+        demo_mode: bool = True,
+        port: str = "/dev/ttyACM0",
+        baudrate: int = 115200,
+        streaming: bool = True,
+        motion_wait: str = "status",
+        motion_timeout_s: float = 30.0,
+        demo_motion_sim: bool = False,
+        demo_time_scale: float = 1.0,
+    ):
         self.demo_mode = demo_mode
         self.port = port
         self.baudrate = baudrate
         self.interval_s = 0.2 # 200ms polling
+        # real: uyarlamali '?' polling
+        self.poll_fast_s = 0.1      # Run/Jog/Home/Hold
+        self.poll_idle_s = 0.5      # Idle/Alarm/...
         self._thread: threading.Thread | None = None
         self._stop_event = threading.Event()
 
+        # streaming: karakter sayma ile buffer'i dolu tut; False => satir satir ok bekle
+        self.streaming = streaming
+        self.rx_buffer_size = GRBL_RX_BUFFER_SIZE
+        self.stream_timeout_s = 10.0  # ok icin en fazla bekleme
+
         # grbl - sadece real mode'da
         self.ser = None
 
+        # seri port sahibi okuyucu thread + gonderim kuyrugu (real)
+        self._reader: threading.Thread | None = None
+        self._reader_stop = threading.Event()
+        self._io_lock = threading.Lock()
+        self._tx_queue: deque = deque()     # (line, bytes, future) - henuz yazilmadi
+        self._pending: deque = deque()      # (line, bytes, future) - grbl buffer'inda, ok bekliyor
+        self._in_flight = 0                 # grbl rx buffer'indaki byte
+
+        # status slot
+        self._status_cond = threading.Condition()
+        self._last_status: Dict[str, Any] | None = None
+        self._status_waiters: List[Future] = []
+        self._wco = [0.0, 0.0, 0.0]         # grbl WCO'yu ara ara gonderir - son deger
+        self._planner_free_max = 0          # Bf: gorulen en buyuk bos blok sayisi = planner bos
+
+        # hareket tamamlanma bekleme: "status" (Idle + bos planner) veya "dwell" (G4 P0)
+        self.motion_wait = motion_wait
+        self.motion_timeout_s = motion_timeout_s
+
+        # ALARM / [MSG] / karsilama vb.
+        self._event_lock = threading.Lock()
+        self._events: deque = deque(maxlen=200)
+        self._event_seq = 0
+
         # ilk konum - grbl ile guncellenecek veya simulasyon ile - real+demo
         self.position = {"x": 0.0, "y": 0.0, "z": 0.0}
         self.status = "idle"  # idle, running, alarm
 
+        # demo: sabit 50ms yerine hareket suresi simulasyonu (opt-in)
+        self.simulator = None
+        self.demo_time_scale = demo_time_scale
+        if demo_mode and demo_motion_sim:
+            from src.app.services.motion_sim import MotionSimulator
+            self.simulator = MotionSimulator()
+
         print(f"[ROBOT] Initialized in {'DEMO' if demo_mode else 'REAL'} mode")
 
     def _safe_readline(self) -> str:
@@ -49,6 +144,13 @@ class RobotService:
         """Drain some pending lines to clear buffer (REAL mode)."""
         if not self.ser:
             return
+        # grbl reset sonrasi "\r\nGrbl 1.1h ..." gonderir: bos satirda durmak
+        # karsilama mesajini okuyucu thread'e birakiyordu
+        try:
+            self.ser.reset_input_buffer()
+            return
+        except Exception:
+            pass
         for _ in range(max_lines):
             line = self._safe_readline()
             if not line:
@@ -80,6 +182,11 @@ class RobotService:
             
             self._drain_input()
             self.status = "idle"
+
+            # bundan sonra portu sadece okuyucu thread okur
+            self.ser.timeout = 0.1
+            self._start_reader()
+
             print(f"[ROBOT] Connected to GRBL on {self.port} @ {self.baudrate}")
             return True
             
@@ -91,16 +198,170 @@ class RobotService:
     
     def disconnect(self) -> None:
         """Disconnect from GRBL"""
+        self._stop_reader()
         if self.ser:
             try:
                 self.ser.close()
             except Exception:
                 pass
             self.ser = None
+        self._fail_all("disconnected")
         self.status = "disconnected"
         print("[ROBOT] Disconnected from GRBL")
 
+    # seri port okuyucu (tek sahip)
+    def _start_reader(self) -> None:
+        if self._reader and self._reader.is_alive():
+            return
+        self._reader_stop.clear()
+        self._reader = threading.Thread(target=self._reader_loop, daemon=True)
+        self._reader.start()
+
+    def _stop_reader(self) -> None:
+        self._reader_stop.set()
+        if self._reader and self._reader is not threading.current_thread():
+            self._reader.join(timeout=2)
+        self._reader = None
+
+    def _reader_loop(self) -> None:
+        while not self._reader_stop.is_set():
+            if not self.ser:
+                break
+            try:
+                raw = self.ser.readline()
+            except Exception as e:
+                print(f"[ROBOT] Serial read error: {e}")
+                self.status = "error"
+                self._fail_all("read error")
+                break
+
+            line = raw.decode("utf-8", errors="ignore").strip() if raw else ""
+            if line:
+                self._dispatch_line(line)
+
+    def _dispatch_line(self, line: str) -> None:
+        """Route one line of GRBL output."""
+        low = line.lower()
+
+        # status raporu
+        if line.startswith("<"):
+            self._on_status(self._parse_grbl_status(line))
+            return
+
+        # komut yaniti - en eski bekleyen satira
+        if low.startswith("ok") or low.startswith("error"):
+            with self._io_lock:
+                entry = self._pending.popleft() if self._pending else None
+                if entry is not None:
+                    self._in_flight -= len(entry[1])
+            if entry is None:
+                self._push_event(f"unexpected response: {line}")
+                return
+
+            ok = low.startswith("ok")
+            if not ok:
+                print(f"[ROBOT] G-code error for '{entry[0]}': {line}")
+                self.status = "alarm"
+            entry[2].set_result(GcodeAck(entry[0], ok, line))
+            self._pump()
+            return
+
+        self._push_event(line)
+
+        # alarm veya reset: grbl buffer'lari bosaltir, bekleyen ok gelmez
+        if low.startswith("alarm"):
+            print(f"[ROBOT] GRBL alarm: {line}")
+            self.status = "alarm"
+            self._fail_all(line)
+        elif low.startswith("grbl "):
+            self._fail_all("reset")
+
+    def _on_status(self, data: Dict[str, Any]) -> None:
+        self.status = data["status"]
+        self.position = {"x": data["x"], "y": data["y"], "z": data["z"]}
+        self._publish_status(data)
+
+        with self._status_cond:
+            self._last_status = data
+            waiters, self._status_waiters = self._status_waiters, []
+            self._status_cond.notify_all()
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(data)
+
+    def _push_event(self, line: str) -> None:
+        with self._event_lock:
+            self._event_seq += 1
+            self._events.append({"seq": self._event_seq, "ts": time.time(), "line": line})
+
+    def get_events(self, after_seq: int = 0) -> List[Dict[str, Any]]:
+        """GRBL messages that are neither responses nor status reports (ALARM, [MSG:..], banner)."""
+        with self._event_lock:
+            return [e for e in self._events if e["seq"] > after_seq]
+
+    def _fail_all(self, reason: str) -> None:
+        with self._io_lock:
+            entries = list(self._pending) + list(self._tx_queue)
+            self._pending.clear()
+            self._tx_queue.clear()
+            self._in_flight = 0
+        for line, _, fut in entries:
+            if fut.done():
+                continue
+            if not fut.running() and not fut.set_running_or_notify_cancel():
+                continue  # iptal edilmis
+            fut.set_result(GcodeAck(line, False, reason))
+
+    def _pump(self) -> None:
+        """Write queued lines while they fit in GRBL's RX buffer (character counting)."""
+        with self._io_lock:
+            while self._tx_queue:
+                line, data, fut = self._tx_queue[0]
+                limit = self.rx_buffer_size if self.streaming else 0
+                # buffer'dan uzun tek satir / streaming kapali: bos buffer'a yine de gonder
+                if self._pending and self._in_flight + len(data) > limit:
+                    break
+
+                self._tx_queue.popleft()
+                if not fut.set_running_or_notify_cancel():
+                    continue  # iptal edildi (pause/stop)
+
+                if not self.ser:
+                    fut.set_result(GcodeAck(line, False, "disconnected"))
+                    continue
+                try:
+                    self.ser.write(data)
+                except Exception as e:
+                    print(f"[ROBOT] Send error: {e}")
+                    self.status = "error"
+                    fut.set_result(GcodeAck(line, False, f"write error: {e}"))
+                    continue
+
+                self._pending.append((line, data, fut))
+                self._in_flight += len(data)
+
     # g-code gonderme
+    def send_gcode_async(self, gcode: str) -> Future:
+        """
+        Queue one G-code line (REAL mode). Returns a Future resolved with a GcodeAck
+        when GRBL answers ok / error:N (or the line is dropped by alarm/reset).
+        Not-yet-written lines can be cancelled with future.cancel().
+        """
+        fut: Future = Future()
+        line = gcode.strip()
+
+        if self.demo_mode or not self.ser or not self._reader or not self._reader.is_alive():
+            # demo veya baglanti yok: senkron yol
+            fut.set_running_or_notify_cancel()
+            ok = self.send_gcode(line)
+            fut.set_result(GcodeAck(line, ok, "ok" if ok else "error:disconnected"))
+            return fut
+
+        with self._io_lock:
+            self._tx_queue.append((line, (line + "\n").encode("utf-8"), fut))
+        self._pump()
+        return fut
+
     def send_gcode(self, gcode: str) -> bool:
         """
         Send G-code command to GRBL (REAL mode) or simulate (DEMO mode)
@@ -108,43 +369,238 @@ class RobotService:
         if self.demo_mode:
             # demo:
             print(f"[ROBOT DEMO] G-code: {gcode}")
-            time.sleep(0.05)
+            if self.simulator is None:
+                time.sleep(0.05)
+                return True
+
+            # simulasyon: hareket suresi kadar bekle, konumu guncelle
+            duration = self.simulator.execute(gcode)
+            self.position = self.simulator.position
+            if duration > 0:
+                time.sleep(duration * self.demo_time_scale)
             return True
         
-        if not self.ser:
+        if not self.ser or not self._reader or not self._reader.is_alive():
             print("[ROBOT] Not connected to GRBL")
             self.status = "disconnected"
             return False
-        
+
+        fut = self.send_gcode_async(gcode)
         try:
-            self.ser.write((gcode.strip() + "\n").encode("utf-8"))
-            
-            # grbl'den "ok" bilgisini bekleme
-            deadline = time.time() + 1.5
-            while time.time() < deadline:
-                line = self._safe_readline()
+            ack = fut.result(timeout=self.stream_timeout_s)
+        except FutureTimeoutError:
+            print(f"[ROBOT] Timeout waiting ok for: {gcode}")
+            return False
+
+        if ack.ok:
+            print(f"[ROBOT] G-code ok: {gcode}")
+        return ack.ok
+
+    def send_gcode_stream(
+        self,
+        lines: List[str],
+        on_result: Optional[Callable[[int, str, bool, str], None]] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> List[Optional[bool]]:
+        """
+        Stream G-code lines using GRBL's character-counting protocol.
+
+        Parameters:
+            lines       : G-code lines (empty lines are skipped and reported as True)
+            on_result   : called as on_result(index, line, ok, response) for every
+                          acknowledged line, in order
+            should_stop : polled while streaming; when it returns True, lines not yet
+                          written are cancelled (lines already in GRBL's buffer
+                          are still acknowledged)
+
+        Returns:
+            Per-line results: True (ok), False (error / alarm / timeout), None (not sent).
+        """
+        results: List[Optional[bool]] = [None] * len(lines)
+
+        def report(idx: int, line: str, ok: bool, resp: str) -> None:
+            results[idx] = ok
+            if on_result is not None:
+                on_result(idx, line, ok, resp)
+
+        if self.demo_mode:
+            # demo: satir satir
+            for i, raw in enumerate(lines):
+                line = (raw or "").strip()
                 if not line:
+                    results[i] = True
                     continue
+                if should_stop is not None and should_stop():
+                    break
+                ok = self.send_gcode(line)
+                report(i, line, ok, "ok" if ok else "error")
+                if not ok:
+                    break
+            return results
 
-                # basarili
-                if line.lower().startswith("ok"):
-                    print(f"[ROBOT] G-code ok: {gcode}")
-                    return True
+        if not self.ser or not self._reader or not self._reader.is_alive():
+            print("[ROBOT] Not connected to GRBL")
+            self.status = "disconnected"
+            return results
 
-                # hatali: format: "error:xx"
-                if line.lower().startswith("error") or "alarm" in line.lower():
-                    print(f"[ROBOT] G-code error for '{gcode}': {line}")
-                    self.status = "alarm"
-                    return False
-                
-            print(f"[ROBOT] Timeout waiting ok for: {gcode}")
-            return False    
-        
+        # hepsini kuyruga at - okuyucu thread ok geldikce buffer'i doldurur
+        futures: List[Optional[Future]] = []
+        for i, raw in enumerate(lines):
+            line = (raw or "").strip()
+            if not line:
+                results[i] = True
+                futures.append(None)
+                continue
+            futures.append(self.send_gcode_async(line))
+
+        def cancel_rest(start: int) -> None:
+            for f in futures[start:]:
+                if f is not None:
+                    f.cancel()
+
+        for i, fut in enumerate(futures):
+            if fut is None:
+                continue
+
+            deadline = time.time() + self.stream_timeout_s
+            while True:
+                if should_stop is not None and should_stop():
+                    cancel_rest(i)
+                try:
+                    ack = fut.result(timeout=0.05)
+                    break
+                except FutureTimeoutError:
+                    if time.time() > deadline:
+                        print(f"[ROBOT] Stream timeout on: {lines[i].strip()}")
+                        cancel_rest(i)
+                        report(i, lines[i].strip(), False, "timeout")
+                        return results
+                except Exception:
+                    # CancelledError - gonderilmedi
+                    ack = None
+                    break
+
+            if ack is None:
+                continue
+            report(i, ack.line, ack.ok, ack.response)
+            if not ack.ok:
+                # hata sonrasi yeni satir yazma
+                cancel_rest(i + 1)
+
+        return results
+
+    def query_status_async(self) -> Future:
+        """
+        Request a status report. Returns a Future resolved with the next parsed
+        status report delivered by the reader thread.
+        """
+        fut: Future = Future()
+        if self.demo_mode or not self.ser or not self._reader or not self._reader.is_alive():
+            fut.set_result(self.query_status())
+            return fut
+
+        with self._status_cond:
+            self._status_waiters.append(fut)
+        if not self.request_status():
+            with self._status_cond:
+                if fut in self._status_waiters:
+                    self._status_waiters.remove(fut)
+            fut.set_result({"status": "error", "x": 0, "y": 0, "z": 0})
+        return fut
+
+    def request_status(self) -> bool:
+        """Write the real-time '?' byte (REAL mode). The report arrives on the reader thread."""
+        if not self.ser:
+            return False
+        try:
+            # gercek zamanli komut: tek byte, satir sonu yok (yeni satir 'ok' uretir,
+            # karakter sayma eslesmesini bozar)
+            self.ser.write(b'?')
+            return True
         except Exception as e:
-            print(f"[ROBOT] Send error: {e}")
-            self.status = "error"
+            print(f"[ROBOT] Query error: {e}")
             return False
-    
+
+    def wait_motion_complete(self, timeout: Optional[float] = None, method: Optional[str] = None) -> bool:
+        """
+        Block until all sent motion has finished and the machine is stationary.
+
+        method:
+            "status" : wait for every queued line to be acknowledged, then for a
+                       status report with Idle and an empty planner (Bf), or two
+                       consecutive Idle reports when Bf is not reported
+            "dwell"  : send G4 P0; GRBL answers ok only after the planner is empty
+
+        Returns False on timeout, alarm or missing connection.
+        """
+        if self.demo_mode:
+            return True
+
+        if not self.ser or not self._reader or not self._reader.is_alive():
+            return False
+
+        timeout = self.motion_timeout_s if timeout is None else timeout
+        method = method or self.motion_wait
+        deadline = time.time() + timeout
+
+        if method == "dwell":
+            try:
+                return self.send_gcode_async("G4 P0").result(timeout=timeout).ok
+            except FutureTimeoutError:
+                print("[ROBOT] Timeout waiting for motion complete (G4 P0)")
+                return False
+
+        # 1) gonderilen tum satirlar icin ok (son satirin future'i)
+        with self._io_lock:
+            last = self._tx_queue[-1][2] if self._tx_queue else (self._pending[-1][2] if self._pending else None)
+        if last is not None:
+            try:
+                ack = last.result(timeout=max(0.0, deadline - time.time()))
+                if not ack.ok:
+                    return False
+            except FutureTimeoutError:
+                print("[ROBOT] Timeout waiting for motion complete (ok)")
+                return False
+            except Exception:
+                pass  # iptal edilmis satir
+
+        # 2) status raporlari: Idle + bos planner
+        idle_reports = 0
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                print("[ROBOT] Timeout waiting for motion complete (Idle)")
+                return False
+
+            try:
+                st = self.query_status_async().result(timeout=min(1.0, remaining))
+            except FutureTimeoutError:
+                continue
+
+            state = st.get("status")
+            if state == "alarm":
+                return False
+
+            if state == "idle":
+                free = st.get("planner_free")
+                if free is not None:
+                    if free >= self._planner_free_max:
+                        return True
+                else:
+                    # Bf raporlanmiyor ($10): iki ardisik Idle
+                    idle_reports += 1
+                    if idle_reports >= 2:
+                        return True
+            else:
+                idle_reports = 0
+
+            time.sleep(min(self.poll_fast_s, max(0.0, deadline - time.time())))
+
+    def get_last_status(self) -> Dict[str, Any] | None:
+        """Latest parsed status report (non-blocking)."""
+        with self._status_cond:
+            return self._last_status
+
     def query_status(self) -> Dict[str, Any]: 
         """Query GRBL status or return simulated status"""
         if self.demo_mode:
@@ -156,49 +612,102 @@ class RobotService:
                 "z": self.position["z"]
             }
         
-        if not self.ser:
+        if not self.ser or not self._reader or not self._reader.is_alive():
             return {"status": "disconnected", "x": 0, "y": 0, "z": 0}
-        
+
         try:
-            # durum bilgisini almak icin grbl'e sor
-            self.ser.write(b'?\n')
-            
-            # grbl yaniti formati: <Idle|MPos:...,...,...|FS:...>
-            # <...> bu bicimi gorene kadar okuma yapilmali
-            for _ in range(8):
-                line = self._safe_readline()
-                if not line:
-                    continue
-                if line.startswith("<"):
-                    return self._parse_grbl_status(line)
+            return self.query_status_async().result(timeout=1.0)
+        except FutureTimeoutError:
             return {"status": "unknown", "x": 0.0, "y": 0.0, "z": 0.0}
-        
-        except Exception as e:
-            print(f"[ROBOT] Query error: {e}")
-            return {"status": "error", "x": 0, "y": 0, "z": 0}
     
 
     # grbl bilgisi (text biciminde) -> arayuz icin anlamli olabilmesi icin JSON olmali
     def _parse_grbl_status(self, line: str) -> Dict[str, Any]:
         """
-        Parse GRBL status line
-        Example: <Idle|MPos:...,...,...|FS:...>
+        Parse GRBL status line (single pass over the '|' fields)
+        Example: <Run|MPos:10.000,2.000,0.000|Bf:15,128|FS:500,0|Ov:100,100,100|Pn:XZ>
+        MPos is computed from WPos + WCO when GRBL reports work coordinates.
         """
-        result = {"status": "unknown", "x": 0, "y": 0, "z": 0}
-        
-        # grbl durum (Idle/Run/Hold/Alarm)
-        match = re.search(r'<(\w+)\|', line)
-        if match:
-            result["status"] = match.group(1).lower()
-        
-        # koordinatlar (MPos:x,y,z)
-        match = re.search(r'MPos:([\d.-]+),([\d.-]+),([\d.-]+)', line)
-        if match:
-            result["x"] = float(match.group(1))
-            result["y"] = float(match.group(2))
-            result["z"] = float(match.group(3))
-        
+        # konum alani yoksa (orn. <Alarm>) son bilinen konum
+        result: Dict[str, Any] = {
+            "status": "unknown",
+            "x": self.position["x"],
+            "y": self.position["y"],
+            "z": self.position["z"],
+        }
+
+        m = _STATUS_RE.match(line)
+        if not m:
+            return result
+
+        # grbl durum (Idle/Run/Hold:0/Jog/Alarm/Door:1/Check/Home/Sleep)
+        state, sub, body = m.groups()
+        result["status"] = state.lower()
+        if sub is not None:
+            result["substate"] = int(sub)
+
+        mpos = wpos = None
+        for field in (body or "").split("|"):
+            key, _, val = field.partition(":")
+            if key == "MPos":
+                mpos = _floats(val)
+            elif key == "WPos":
+                wpos = _floats(val)
+            elif key == "WCO":
+                wco = _floats(val)
+                if len(wco) >= 3:
+                    self._wco = wco[:3]
+            elif key == "FS":
+                fs = _floats(val)
+                if len(fs) >= 2:
+                    result["feed"], result["spindle"] = fs[0], fs[1]
+            elif key == "F":
+                f = _floats(val)
+                if f:
+                    result["feed"] = f[0]
+            elif key == "Bf":
+                bf = _floats(val)
+                if len(bf) >= 2:
+                    # planner'da bos blok, rx buffer'da bos byte
+                    result["planner_free"], result["rx_free"] = int(bf[0]), int(bf[1])
+                    self._planner_free_max = max(self._planner_free_max, int(bf[0]))
+            elif key == "Ov":
+                ov = _floats(val)
+                if len(ov) >= 3:
+                    result["ov"] = {"feed": int(ov[0]), "rapid": int(ov[1]), "spindle": int(ov[2])}
+            elif key == "Pn":
+                result["pins"] = val
+            elif key == "Ln":
+                f = _floats(val)
+                if f:
+                    result["line_no"] = int(f[0])
+
+        # koordinatlar (MPos = WPos + WCO)
+        if mpos is None and wpos is not None and len(wpos) >= 3:
+            mpos = [wpos[i] + self._wco[i] for i in range(3)]
+        if mpos is not None and len(mpos) >= 3:
+            result["x"], result["y"], result["z"] = mpos[0], mpos[1], mpos[2]
+            result["wpos"] = {
+                "x": mpos[0] - self._wco[0],
+                "y": mpos[1] - self._wco[1],
+                "z": mpos[2] - self._wco[2],
+            }
+
         return result
+
+    def _publish_status(self, data: Dict[str, Any]) -> None:
+        """Push a parsed status report into SYSTEM_STATE (reader thread)."""
+        from src.app.core.state import SYSTEM_STATE
+
+        SYSTEM_STATE.update("robot", status=data["status"], x=data["x"], y=data["y"], z=data["z"])
+
+        with SYSTEM_STATE.edit("grbl") as grbl:
+            grbl["state"] = data["status"]
+            grbl["mpos"] = {"x": float(data["x"]), "y": float(data["y"]), "z": float(data["z"])}
+            for key in ("wpos", "feed", "planner_free", "rx_free", "ov", "pins"):
+                if key in data:
+                    grbl[key] = data[key]
+            grbl["last_updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
     
     # polling
     def start_polling(self) -> None:
@@ -220,25 +729,32 @@ class RobotService:
 
     def _polling_loop(self) -> None:
         """Background loop for status polling"""
-        from src.app.routers.status import SYSTEM_STATE 
+        from src.app.core.state import SYSTEM_STATE
         # onceden bastaydi circular import olmasin diye buraya tasidik
         
         # arduino - nema17 (GRBL) baglanti durumu
-        if self.demo_mode:
-            SYSTEM_STATE["connections"]["arduino_motors"]["status"] = True
-            SYSTEM_STATE["connections"]["arduino_motors"]["port"] = self.port  # demo'da port string dursun
-        else:
-            SYSTEM_STATE["connections"]["arduino_motors"]["status"] = self.ser is not None
-            SYSTEM_STATE["connections"]["arduino_motors"]["port"] = self.port if self.ser is not None else None
+        with SYSTEM_STATE.edit("connections") as conn:
+            if self.demo_mode:
+                conn["arduino_motors"]["status"] = True
+                conn["arduino_motors"]["port"] = self.port  # demo'da port string dursun
+            else:
+                conn["arduino_motors"]["status"] = self.ser is not None
+                conn["arduino_motors"]["port"] = self.port if self.ser is not None else None
 
         direction = 1  # demo icin
         
         while not self._stop_event.is_set():
             if self.demo_mode:
                 # demo:
-                robot = SYSTEM_STATE["robot"]
+                robot = dict(SYSTEM_STATE["robot"])
                 
-                if robot.get("status") == "running":
+                if self.simulator is not None:
+                    # simulasyondaki konum
+                    robot["x"] = int(self.position["x"])
+                    robot["y"] = int(self.position["y"])
+                    robot["z"] = int(self.position["z"])
+                    self.status = robot.get("status", "idle")
+                elif robot.get("status") == "running":
                     # demo hareketi
                     self.position["x"] = self.position.get("x", 0) + direction * 2
                     self.position["y"] = self.position.get("y", 0) + 1
@@ -260,7 +776,10 @@ class RobotService:
                     robot["status"] = robot.get("status", "idle")
                     self.status = robot["status"]
 
-                SYSTEM_STATE["grbl"] = {
+                # sadece konum yaziliyor: status/current_task runner'a ait (kayip guncelleme olmasin)
+                SYSTEM_STATE.update("robot", x=robot.get("x", 0), y=robot.get("y", 0), z=robot.get("z", 0))
+
+                SYSTEM_STATE.set("grbl", {
                     "state": robot.get("status", "idle"),
                     "mpos": {
                         "x": float(robot.get("x", 0)),
@@ -270,48 +789,62 @@ class RobotService:
                     "last_ok": True,
                     "last_line": "G0 X... Y... (demo)",
                     "last_updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
-                }
+                })
                 # demo icin simulasyon
                 if robot.get("status") == "running":
-                    SYSTEM_STATE["image_processing"] = {
+                    SYSTEM_STATE.set("image_processing", {
                         "last_detection": {"component": "R1", "type": "resistor", "confidence": 0.92},
                         "last_placement": {"pad": "B", "accuracy": 87.5, "status": "OK"},
                         "last_updated": time.strftime("%Y-%m-%dT%H:%M:%S")
-                    }
+                    })
                 else:
-                    SYSTEM_STATE["image_processing"] = {
+                    SYSTEM_STATE.set("image_processing", {
                         "last_detection": {"component": None, "type": None, "confidence": None},
                         "last_placement": {"pad": None, "accuracy": None, "status": None},
                         "last_updated": time.strftime("%Y-%m-%dT%H:%M:%S")
-                    }
+                    })
 
             else:
-                # real: grbl bilgisi
-                data = self.query_status()
-                SYSTEM_STATE["robot"].update(data)
-                SYSTEM_STATE["grbl"] = {
-                    "state": SYSTEM_STATE["robot"].get("status", "unknown"),
-                    "mpos": {
-                        "x": float(SYSTEM_STATE["robot"].get("x", 0)),
-                        "y": float(SYSTEM_STATE["robot"].get("y", 0)),
-                        "z": float(SYSTEM_STATE["robot"].get("z", 0))
-                    },
-                    "last_ok": None,    # ok veya err
-                    "last_line": None,  # son gcode
-                    "last_updated": time.strftime("%Y-%m-%dT%H:%M:%S")
-                }
+                # real: sadece '?' gonder, rapor okuyucu thread'de islenip SYSTEM_STATE'e yaziliyor
+                self.request_status()
+                with SYSTEM_STATE.edit("connections") as conn:
+                    conn["arduino_motors"]["status"] = self.ser is not None
+
+                # uyarlamali aralik: hareket varken hizli, bosta yavas
+                moving = self.status in _MOVING_STATES
+                self._stop_event.wait(self.poll_fast_s if moving else self.poll_idle_s)
+                continue
             
             time.sleep(self.interval_s)
 
-        SYSTEM_STATE["connections"]["arduino_motors"]["status"] = False
+        with SYSTEM_STATE.edit("connections") as conn:
+            conn["arduino_motors"]["status"] = False
 
 
 robot_service = None
 
-def init_robot_service(demo_mode: bool, port: str = "/dev/ttyACM0"):
+def init_robot_service(
+    demo_mode: bool,
+    port: str = "/dev/ttyACM0",
+    baudrate: int = 115200,
+    streaming: bool = True,
+    motion_wait: str = "status",
+    motion_timeout_s: float = 30.0,
+    demo_motion_sim: bool = False,
+    demo_time_scale: float = 1.0,
+):
     """Initialize robot service singleton"""
     global robot_service
-    robot_service = RobotService(demo_mode=demo_mode, port=port)
+    robot_service = RobotService(
+        demo_mode=demo_mode,
+        port=port,
+        baudrate=baudrate,
+        streaming=streaming,
+        motion_wait=motion_wait,
+        motion_timeout_s=motion_timeout_s,
+        demo_motion_sim=demo_motion_sim,
+        demo_time_scale=demo_time_scale,
+    )
     return robot_service
     
 
@@ -0,0 +1,217 @@
+"""
+File Name       : route_optimizer.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Component ordering that minimizes XY travel of the gantry.
+Every part is visited as feeder -> test station -> pad, so only the leg from
+the previous pad to the next feeder depends on the order (an open, asymmetric
+TSP starting at the home position).
+
+    small boards (<= exact_max parts) : Held-Karp (exact)
+    larger boards                      : nearest neighbour + 2-opt
+
+Coordinates come from robot_actions (FEEDER_POS, PAD_POS, TEST_STATION_POS).
+Parts without coordinates keep their original relative order at the end.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+XY = Tuple[float, float]
+
+
+@dataclass
+class RouteResult:
+    order: List[str]
+    baseline_mm: float
+    optimized_mm: float
+    method: str                                         # "held-karp" | "nn+2opt" | "none"
+    skipped: List[str] = field(default_factory=list)    # koordinati olmayan parcalar
+
+    @property
+    def saved_mm(self) -> float:
+        return self.baseline_mm - self.optimized_mm
+
+    @property
+    def saved_pct(self) -> float:
+        return 100.0 * self.saved_mm / self.baseline_mm if self.baseline_mm > 0 else 0.0
+
+    def summary(self) -> str:
+        txt = (
+            f"{' -> '.join(self.order)} | travel {self.baseline_mm:.1f} -> {self.optimized_mm:.1f} mm "
+            f"(saved {self.saved_mm:.1f} mm, {self.saved_pct:.1f}%, {self.method})"
+        )
+        if self.skipped:
+            txt += f" | no coordinates: {', '.join(self.skipped)}"
+        return txt
+
+
+def _xy(pos) -> XY:
+    return float(pos[0]), float(pos[1])
+
+
+def _dist(a: XY, b: XY) -> float:
+    return float(np.hypot(a[0] - b[0], a[1] - b[1]))
+
+
+def _cost_matrices(feeders: np.ndarray, pads: np.ndarray, test: XY, start: XY):
+    """
+    fixed[j]   : feeder_j -> test -> pad_j (order independent)
+    start_c[j] : start -> feeder_j
+    trans[i,j] : pad_i -> feeder_j
+    """
+    t = np.asarray(test, dtype=np.float64)
+    fixed = np.hypot(*(feeders - t).T) + np.hypot(*(pads - t).T)
+    start_c = np.hypot(*(feeders - np.asarray(start, dtype=np.float64)).T)
+    diff = pads[:, None, :] - feeders[None, :, :]
+    trans = np.hypot(diff[..., 0], diff[..., 1])
+    np.fill_diagonal(trans, np.inf)
+    return fixed, start_c, trans
+
+
+def _path_cost(order: Sequence[int], start_c: np.ndarray, trans: np.ndarray) -> float:
+    if len(order) == 0:
+        return 0.0
+    idx = np.asarray(order)
+    return float(start_c[idx[0]] + trans[idx[:-1], idx[1:]].sum())
+
+
+def _held_karp(start_c: np.ndarray, trans: np.ndarray) -> List[int]:
+    n = len(start_c)
+    full = 1 << n
+    dp = np.full((full, n), np.inf)
+    parent = np.full((full, n), -1, dtype=np.int64)
+    for j in range(n):
+        dp[1 << j, j] = start_c[j]
+
+    for mask in range(1, full):
+        row = dp[mask]
+        if not np.isfinite(row).any():
+            continue
+        # mask'ta olmayan her j icin: dp[mask|j, j] = min_i dp[mask, i] + trans[i, j]
+        for j in range(n):
+            bit = 1 << j
+            if mask & bit:
+                continue
+            cand = row + trans[:, j]
+            i = int(np.argmin(cand))
+            nxt = mask | bit
+            if cand[i] < dp[nxt, j]:
+                dp[nxt, j] = cand[i]
+                parent[nxt, j] = i
+
+    # geri izleme
+    mask = full - 1
+    j = int(np.argmin(dp[mask]))
+    order = []
+    while j >= 0:
+        order.append(j)
+        prev = int(parent[mask, j])
+        mask ^= 1 << j
+        j = prev
+    return order[::-1]
+
+
+def _nearest_neighbour(start_c: np.ndarray, trans: np.ndarray) -> List[int]:
+    n = len(start_c)
+    left = np.ones(n, dtype=bool)
+    cur = int(np.argmin(start_c))
+    order = [cur]
+    left[cur] = False
+    for _ in range(n - 1):
+        row = np.where(left, trans[cur], np.inf)
+        cur = int(np.argmin(row))
+        order.append(cur)
+        left[cur] = False
+    return order
+
+
+def _two_opt(order: List[int], start_c: np.ndarray, trans: np.ndarray, max_passes: int = 20) -> List[int]:
+    """Segment reversal; asymmetric costs, so every candidate is re-evaluated."""
+    best = list(order)
+    best_cost = _path_cost(best, start_c, trans)
+    n = len(best)
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n - 1):
+            for k in range(i + 1, n):
+                cand = best[:i] + best[i:k + 1][::-1] + best[k + 1:]
+                cost = _path_cost(cand, start_c, trans)
+                if cost + 1e-9 < best_cost:
+                    best, best_cost = cand, cost
+                    improved = True
+        if not improved:
+            break
+    return best
+
+
+def optimize_order(
+    parts: Sequence[str],
+    pad_for: Dict[str, str] | Callable[[str], str],
+    feeder_pos: Optional[Dict[str, tuple]] = None,
+    pad_pos: Optional[Dict[str, tuple]] = None,
+    test_pos: Optional[tuple] = None,
+    start: XY = (0.0, 0.0),
+    exact_max: int = 10,
+) -> RouteResult:
+    """
+    Order `parts` to minimize total XY travel (start -> feeder -> test -> pad -> next feeder ...).
+    pad_for maps a part to its pad label (dict or function).
+    Missing coordinate tables default to robot_actions.
+    """
+    if feeder_pos is None or pad_pos is None or test_pos is None:
+        from src.app.services import robot_actions
+        feeder_pos = robot_actions.FEEDER_POS if feeder_pos is None else feeder_pos
+        pad_pos = robot_actions.PAD_POS if pad_pos is None else pad_pos
+        test_pos = robot_actions.TEST_STATION_POS if test_pos is None else test_pos
+
+    lookup = pad_for.get if isinstance(pad_for, dict) else pad_for
+
+    known: List[str] = []
+    skipped: List[str] = []
+    for part in parts:
+        pad = lookup(part)
+        if part in feeder_pos and pad in pad_pos:
+            known.append(part)
+        else:
+            skipped.append(part)
+
+    if not known:
+        return RouteResult(order=list(parts), baseline_mm=0.0, optimized_mm=0.0, method="none", skipped=skipped)
+
+    feeders = np.array([_xy(feeder_pos[p]) for p in known], dtype=np.float64)
+    pads = np.array([_xy(pad_pos[lookup(p)]) for p in known], dtype=np.float64)
+    fixed, start_c, trans = _cost_matrices(feeders, pads, _xy(test_pos), start)
+    fixed_total = float(fixed.sum())
+
+    baseline = list(range(len(known)))
+    if len(known) == 1:
+        best, method = baseline, "none"
+    elif len(known) <= exact_max:
+        best, method = _held_karp(start_c, trans), "held-karp"
+    else:
+        best, method = _two_opt(_nearest_neighbour(start_c, trans), start_c, trans), "nn+2opt"
+
+    # sezgisel yontem verilen siradan kotu olmasin
+    base_cost = _path_cost(baseline, start_c, trans)
+    best_cost = _path_cost(best, start_c, trans)
+    if best_cost > base_cost:
+        best, best_cost = baseline, base_cost
+
+    return RouteResult(
+        order=[known[i] for i in best] + skipped,
+        baseline_mm=fixed_total + base_cost,
+        optimized_mm=fixed_total + best_cost,
+        method=method,
+        skipped=skipped,
+    )
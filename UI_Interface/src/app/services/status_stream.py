@@ -0,0 +1,159 @@
+"""
+File Name       : status_stream.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Push channel for SYSTEM_STATE (Server-Sent Events).
+A single hub thread watches SYSTEM_STATE at a capped rate and publishes
+versioned events containing only the changed sections and new log lines.
+Changed sections come from the state store versions (changed_since), so only
+those are re-encoded.
+Each event is JSON-encoded once and shared by every connected dashboard.
+
+Event payloads:
+    full  : {"version": N, "state": {...whole SYSTEM_STATE...}}
+    delta : {"version": N, "changed": {section: value, ...}, "logs_append": [...], "log_seq": S}
+New log lines are taken from the log store by sequence id (log_store.after).
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+def _join_sections(*encoded: Dict[str, str]) -> str:
+    """Build a JSON object from already-encoded section values."""
+    items = []
+    for mapping in encoded:
+        for key, value in mapping.items():
+            items.append(f"{json.dumps(key)}:{value}")
+    return "{" + ",".join(items) + "}"
+
+
+class StatusStreamHub:
+    def __init__(self, max_rate_hz: float = 5.0, history: int = 32):
+        self.period_s = 1.0 / max_rate_hz if max_rate_hz > 0 else 0.2
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._subscribers = 0
+
+        self._version = 0
+        self._sections: Dict[str, str] = {}         # section -> son gonderilen json
+        self._state_version = -1                    # store versiyonu (-1 => hepsi)
+        self._logs: deque = deque()                # tam snapshot icin log satirlari
+        self._log_seq = 0
+        self._full_cache: Tuple[int, str] | None = None
+        # (version, delta_json) - yavas istemciler delta ile yetisebilsin diye
+        self._deltas: deque = deque(maxlen=history)
+
+        print("[STATUS_STREAM] Initialized")
+
+    # abonelik
+    def subscribe(self) -> None:
+        with self._lock:
+            self._subscribers += 1
+            if self._thread is None or not self._thread.is_alive():
+                # ilk abone: taze bir snapshot ile basla
+                self._tick_locked()
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self) -> None:
+        with self._lock:
+            self._subscribers = max(0, self._subscribers - 1)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def full_event(self) -> Tuple[int, str]:
+        """Whole state at the current version (encoded once per version)."""
+        with self._lock:
+            if self._full_cache is not None and self._full_cache[0] == self._version:
+                return self._full_cache
+
+            # bolumler zaten json - tekrar encode etmeden birlestir
+            state = _join_sections(self._sections, {
+                "logs": json.dumps(list(self._logs), separators=(",", ":")),
+                "log_seq": str(self._log_seq),
+            })
+            payload = f'{{"version":{self._version},"state":{state}}}'
+            self._full_cache = (self._version, payload)
+            return self._full_cache
+
+    def events_after(self, version: int) -> List[Tuple[str, int, str]]:
+        """
+        Events a client at `version` still needs: a list of (event, version, json).
+        Falls back to one full snapshot if the delta history no longer covers it.
+        """
+        with self._lock:
+            current = self._version
+            if version >= current:
+                return []
+            deltas = [d for d in self._deltas if d[0] > version]
+            covered = bool(deltas) and deltas[0][0] == version + 1
+
+        if version > 0 and covered:
+            return [("delta", v, payload) for v, payload in deltas]
+
+        v, payload = self.full_event()
+        return [("full", v, payload)]
+
+    # ureten thread
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.period_s)
+            with self._lock:
+                if self._subscribers == 0:
+                    self._thread = None
+                    return
+                self._tick_locked()
+
+    def _tick_locked(self) -> None:
+        from src.app.core.state import SYSTEM_STATE
+        from src.app.services import log_store as ls
+
+        # sadece son tick'ten beri versiyonu artan bolumler encode ediliyor
+        self._state_version, sections = SYSTEM_STATE.changed_since(self._state_version)
+        changed = {
+            k: json.dumps(v, sort_keys=True, separators=(",", ":"), default=str)
+            for k, v in sections.items()
+        }
+        records = ls.log_store.after(self._log_seq)
+        new_logs = [ls.format_line(r) for r in records]
+
+        if changed:
+            self._sections = {**self._sections, **changed}
+        if records:
+            self._log_seq = records[-1]["seq"]
+            if self._logs.maxlen != ls.log_store.max_entries:
+                self._logs = deque(self._logs, maxlen=ls.log_store.max_entries)
+            self._logs.extend(new_logs)
+
+        if not changed and not new_logs:
+            return
+
+        self._version += 1
+        parts = [f'"version":{self._version}']
+        if changed:
+            parts.append(f'"changed":{_join_sections(changed)}')
+        if new_logs:
+            parts.append(f'"logs_append":{json.dumps(new_logs, separators=(",", ":"))}')
+            parts.append(f'"log_seq":{self._log_seq}')
+        self._deltas.append((self._version, "{" + ",".join(parts) + "}"))
+
+
+status_stream_hub = None
+
+
+def init_status_stream_hub(max_rate_hz: float = 5.0):
+    """Initialize status stream hub singleton"""
+    global status_stream_hub
+    status_stream_hub = StatusStreamHub(max_rate_hz=max_rate_hz)
+    return status_stream_hub
@@ -0,0 +1,90 @@
+"""
+File Name       : step_scheduler.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Dependency graph for program steps.
+Every step declares the resources it holds (gantry, vacuum, camera, vision,
+teststation) and optional explicit dependencies. Steps that share a resource
+are ordered by their position in the program, so the gantry-bound steps keep
+the program order while vision tasks run alongside the next motions.
+
+The graph holds no threads. GCodeRunner asks it which steps are ready
+given the set of finished steps, and runs them.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Set
+
+
+RESOURCES = ("gantry", "vacuum", "camera", "vision", "teststation")
+
+
+class StepGraph:
+    def __init__(self, steps: list):
+        self.steps = list(steps)
+        self.index: Dict[str, int] = {}
+        self.deps: Dict[str, Set[str]] = {}
+
+        for i, step in enumerate(self.steps):
+            if step.id in self.index:
+                raise ValueError(f"Duplicate step id: {step.id}")
+            self.index[step.id] = i
+
+        # kaynak basina son sahip: ayni kaynagi tutan adimlar program sirasiyla
+        last_holder: Dict[str, str] = {}
+        for step in self.steps:
+            deps: Set[str] = set()
+
+            for dep in step.depends_on:
+                if dep not in self.index:
+                    raise ValueError(f"{step.id}: unknown dependency {dep}")
+                deps.add(dep)
+
+            for res in step.resources:
+                if res not in RESOURCES:
+                    raise ValueError(f"{step.id}: unknown resource {res}")
+                if res in last_holder:
+                    deps.add(last_holder[res])
+                last_holder[res] = step.id
+
+            self.deps[step.id] = deps
+
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        # kahn: ileriye bakan bir depends_on kaynak sirasiyla dongu yapabilir
+        remaining = {sid: len(deps) for sid, deps in self.deps.items()}
+        users: Dict[str, List[str]] = {sid: [] for sid in self.deps}
+        for sid, deps in self.deps.items():
+            for dep in deps:
+                users[dep].append(sid)
+
+        queue = [sid for sid, n in remaining.items() if n == 0]
+        seen = 0
+        while queue:
+            sid = queue.pop()
+            seen += 1
+            for user in users[sid]:
+                remaining[user] -= 1
+                if remaining[user] == 0:
+                    queue.append(user)
+
+        if seen != len(self.deps):
+            stuck = sorted((sid for sid, n in remaining.items() if n > 0), key=self.index.get)
+            raise ValueError(f"Step dependency cycle: {', '.join(stuck)}")
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def ready(self, done: Set[str], running: Iterable[str] = ()) -> list:
+        """Steps whose dependencies are all done, in program order."""
+        busy = set(running)
+        return [
+            step for step in self.steps
+            if step.id not in done and step.id not in busy and self.deps[step.id] <= done
+        ]
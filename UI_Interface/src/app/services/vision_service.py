@@ -3,7 +3,7 @@ File Name       : vision_service.py
 Author          : Eda
 Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
 Created Date    : 2026-02-25
-Last Modified   : 2026-02-25
+Last Modified   : 2026-10-17
 
 Description:
 This service provides camera frames for the web UI.
@@ -12,15 +12,25 @@ Later, it can be extended to MJPEG streaming.
 Camera service with DEMO and REAL modes.
 - DEMO mode: Uses PC webcam (index 0)
 - REAL mode: Uses Raspberry Pi Camera Module
+With PNP_VISION_WORKER=true the model runs in a separate process
+(services/vision_worker.py); detect() forwards frames there with a
+priority (runner verification before dashboard overlays) and falls back
+to in-process inference if the worker is gone.
 """
 from __future__ import annotations
 
 import os
+import threading
+from concurrent.futures import TimeoutError as FuturesTimeout
 from typing import List, Optional
 
 import cv2
 import numpy as np
 
+from src.app.vision.yolo_runtime import NMS_BACKENDS, decode_predictions, non_max_suppression
+# oncelikler worker modulunde; runner'lar buradan import eder
+from src.app.services.vision_worker import PRIORITY_OVERLAY, PRIORITY_RUNNER, WorkerBusy
+
 try:
     import onnxruntime as ort
 except Exception:
@@ -33,15 +43,41 @@ class VisionService:
         model_path: str,
         conf_thres: float = 0.7,
         imgsz: int = 640,
+        iou_thres: float = 0.30,
+        nms_backend: str = "greedy",
+        class_aware_nms: bool = True,
+        top_k: Optional[int] = None,
+        max_det: Optional[int] = None,
+        load_model: bool = True,
     ):
         self.model_path = model_path
         self.imgsz = int(imgsz)
         self.conf_thres = float(conf_thres)
 
+        # nms: decode -> nms -> score_target / summarize / overlay
+        self.iou_thres = float(iou_thres)
+        if nms_backend not in NMS_BACKENDS:
+            print(f"[VISION] Unknown NMS backend '{nms_backend}', using 'greedy'")
+            nms_backend = "greedy"
+        self.nms_backend = nms_backend
+        self.class_aware_nms = bool(class_aware_nms)
+        self.top_k = top_k
+        self.max_det = max_det
+
         self.session = None
         self.input_name = None
         self.class_names = {0: "resistor", 1: "diode"}
 
+        # worker sureci (opsiyonel) - model orada yuklu
+        self.worker = None
+        self.worker_timeout_s = 5.0
+        self._local_tried = load_model
+        self._local_lock = threading.Lock()
+
+        if load_model:
+            self._load_model()
+
+    def _load_model(self) -> None:
         if ort is None:
             print("[VISION] onnxruntime not available")
             return
@@ -57,55 +93,85 @@ class VisionService:
         self.input_name = self.session.get_inputs()[0].name
         print(f"[VISION] Model loaded: {self.model_path}")
 
+    def ensure_local_model(self) -> None:
+        # worker yoksa/olduyse modeli bir kez bu surece yukle
+        # kilit: ikinci thread yukleme bitmeden bos sonuc donmesin
+        with self._local_lock:
+            if self.session is None and not self._local_tried:
+                self._local_tried = True
+                print("[VISION] Falling back to in-process inference")
+                self._load_model()
+
+    def attach_worker(self, worker, timeout_s: float = 5.0) -> None:
+        """Send detect() calls to a VisionWorker process."""
+        self.worker = worker
+        self.worker_timeout_s = float(timeout_s)
 
     def is_ready(self) -> bool:
+        if self.worker is not None:
+            if self.worker.is_alive():
+                return self.worker.is_ready()
+            self.ensure_local_model()
         return self.session is not None and self.input_name is not None
 
-    def preprocess(self, frame: np.ndarray) -> np.ndarray:
-        self.orig_h, self.orig_w = frame.shape[:2]
+    def preprocess(self, frame: np.ndarray):
+        """Returns (model input, original (h, w)); no per-call state on self."""
+        # detect() ayni anda birden fazla thread'den cagrilabilir - boyut yerel kalir
+        orig_hw = frame.shape[:2]
 
         img = cv2.resize(frame, (self.imgsz, self.imgsz))
         img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         img = img.astype(np.float32) / 255.0
         img = np.transpose(img, (2, 0, 1))
         img = np.expand_dims(img, axis=0)
-        return img
+        return img, orig_hw
 
-    def postprocess(self, outputs):
+    def postprocess(self, outputs, orig_shape_hw):
         preds = outputs[0][0].T
 
-        boxes = []
-        scores = []
-        class_ids = []
-
-        for p in preds:
-            cx, cy, w, h = p[:4]
-            class_scores = p[4:]
-
-            cls = int(np.argmax(class_scores))
-            conf = float(class_scores[cls])
-
-            if conf < self.conf_thres:
-                continue
-
-            x1 = int((cx - w / 2) * self.orig_w / self.imgsz)
-            y1 = int((cy - h / 2) * self.orig_h / self.imgsz)
-            x2 = int((cx + w / 2) * self.orig_w / self.imgsz)
-            y2 = int((cy + h / 2) * self.orig_h / self.imgsz)
-
-            boxes.append([x1, y1, x2, y2])
-            scores.append(conf)
-            class_ids.append(cls)
-
-        return boxes, scores, class_ids
+        # vektorel decode - yolo_runtime ile ortak
+        boxes, scores, class_ids = decode_predictions(
+            preds,
+            orig_shape_hw,
+            self.imgsz,
+            self.conf_thres,
+        )
 
+        # cakisan kutularin elenmesi - cikti skora gore sirali (boxes[0] en iyi tespit)
+        keep = non_max_suppression(
+            boxes,
+            scores,
+            class_ids,
+            iou_thres=self.iou_thres,
+            class_aware=self.class_aware_nms,
+            top_k=self.top_k,
+            max_det=self.max_det,
+            backend=self.nms_backend,
+        )
 
-    def detect(self, frame: np.ndarray):
-        if not self.is_ready():
+        return boxes[keep].tolist(), scores[keep].tolist(), class_ids[keep].tolist()
+
+
+    def detect(self, frame: np.ndarray, priority: int = PRIORITY_OVERLAY):
+        if self.worker is not None and self.worker.is_alive():
+            try:
+                return self.worker.detect(frame, priority=priority, timeout=self.worker_timeout_s)
+            except FuturesTimeout:
+                # istek worker tarafinda iptal edildi (VisionWorker.detect)
+                print(f"[VISION] Worker timeout ({self.worker_timeout_s}s)")
+                return [], [], []
+            except WorkerBusy:
+                # overlay kuyrugu dolu: ham frame gosterilir, yerel inference yok
+                return [], [], []
+            except Exception as e:
+                print(f"[VISION] Worker detect failed ({e}), running in-process")
+                self.ensure_local_model()
+
+        if not self.is_ready() or self.session is None:
             return [], [], []
-        inp = self.preprocess(frame)
+        inp, orig_hw = self.preprocess(frame)
         outputs = self.session.run(None, {self.input_name: inp})  # only once
-        return self.postprocess(outputs)
+        return self.postprocess(outputs, orig_hw)
     
     def compute_iou(self, boxA, boxB) -> float:
         if boxB is None:
@@ -208,11 +274,28 @@ class VisionService:
 vision_service = None
 
 
-def init_vision_service():
+def init_vision_service(load_model: bool = True):
     global vision_service
     model_path = os.environ.get("PNP_VISION_MODEL", "src/app/vision/best.onnx")
     conf = float(os.environ.get("PNP_VISION_CONF", "0.7"))
-    vision_service = VisionService(model_path=model_path, conf_thres=conf)
+
+    # nms ayarlari (bos birakilirsa limit yok)
+    iou = float(os.environ.get("PNP_VISION_IOU", "0.30"))
+    nms_backend = os.environ.get("PNP_VISION_NMS", "greedy").strip().lower()
+    class_aware = os.environ.get("PNP_VISION_NMS_CLASS_AWARE", "true").lower() == "true"
+    top_k = int(os.environ.get("PNP_VISION_TOPK", "0")) or None
+    max_det = int(os.environ.get("PNP_VISION_MAX_DET", "0")) or None
+
+    vision_service = VisionService(
+        model_path=model_path,
+        conf_thres=conf,
+        iou_thres=iou,
+        nms_backend=nms_backend,
+        class_aware_nms=class_aware,
+        top_k=top_k,
+        max_det=max_det,
+        load_model=load_model,
+    )
     return vision_service
 
 # !!!!! model degistirirsek inference2.py ile vision_service.py dikkat et
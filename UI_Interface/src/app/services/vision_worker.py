@@ -0,0 +1,377 @@
+"""
+File Name       : vision_worker.py
+Author          : Eda
+Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
+Created Date    : 2026-10-17
+Last Modified   : 2026-10-17
+
+Description:
+Optional ONNX inference worker process (PNP_VISION_WORKER=true).
+
+The model is loaded in a separate process, so inference gets its own GIL and
+cores (optionally pinned with PNP_VISION_WORKER_CPUS). Frames are handed over
+through multiprocessing.shared_memory slots: the frame is copied once into a
+free slot and only (request id, slot, shape, dtype) goes over the request
+queue. Detections (plain lists) come back over a result queue.
+
+Requests wait in a priority queue in the main process. A request is sent to
+the worker only when a slot is free, so a runner verification
+(PRIORITY_RUNNER) always goes before waiting dashboard overlays
+(PRIORITY_OVERLAY). Requests above PRIORITY_RUNNER are capped at
+max_low_pending outstanding (WorkerBusy beyond that). A request whose caller
+timed out is cancelled, so the worker never runs it.
+
+    fut = vision_worker.submit(frame, priority=PRIORITY_RUNNER)
+    boxes, scores, class_ids = fut.result(timeout=5)
+
+If the worker dies, pending requests fail with WorkerUnavailable and
+VisionService falls back to in-process inference.
+"""
+
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FuturesTimeout
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# istek oncelikleri: kucuk deger once islenir
+PRIORITY_RUNNER = 0
+PRIORITY_OVERLAY = 10
+
+
+class WorkerUnavailable(RuntimeError):
+    """The vision worker process is not running (or died)."""
+
+
+class WorkerBusy(RuntimeError):
+    """Too many low-priority (overlay) requests outstanding."""
+
+
+def _worker_main(factory: Callable, shm_names: List[str], cpus: Optional[List[int]], req_q, res_q) -> None:
+    """Entry point of the worker process."""
+    import signal
+
+    # ctrl+c ana surece gelir; worker kapanisi stop() ile
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            print(f"[VISION_WORKER] CPU affinity failed: {e}")
+
+    svc = factory()
+    shms = [shared_memory.SharedMemory(name=name) for name in shm_names]
+    res_q.put(("ready", bool(svc.is_ready()), os.getpid()))
+
+    try:
+        while True:
+            msg = req_q.get()
+            if msg is None:
+                break
+
+            req_id, slot, shape, dtype = msg
+            frame = np.ndarray(shape, dtype=dtype, buffer=shms[slot].buf)
+            t0 = time.perf_counter()
+            try:
+                boxes, scores, class_ids = svc.detect(frame)
+                res_q.put(("result", req_id, boxes, scores, class_ids, (time.perf_counter() - t0) * 1000.0))
+            except Exception as e:
+                res_q.put(("error", req_id, f"{type(e).__name__}: {e}"))
+            finally:
+                # shm kapanmadan once view birakilmali
+                del frame
+    finally:
+        for shm in shms:
+            shm.close()
+
+
+class VisionWorker:
+    def __init__(
+        self,
+        factory: Optional[Callable] = None,
+        slots: int = 2,
+        slot_bytes: int = 8 * 1024 * 1024,
+        cpus: Optional[List[int]] = None,
+        start_timeout_s: float = 30.0,
+        max_low_pending: int = 2,
+    ):
+        if factory is None:
+            from src.app.services.vision_service import init_vision_service
+            factory = init_vision_service
+
+        self.factory = factory
+        self.slots = max(1, int(slots))
+        self.slot_bytes = int(slot_bytes)
+        self.cpus = cpus or None
+        self.start_timeout_s = start_timeout_s
+        self.max_low_pending = max(1, int(max_low_pending))
+        self._low_pending = 0               # runner disi, bitmemis istekler
+
+        self._ctx = mp.get_context("spawn")  # fork + thread'ler + onnx guvenli degil
+        self._proc = None
+        self._shms: List[shared_memory.SharedMemory] = []
+        self._req_q = None
+        self._res_q = None
+
+        # (priority, seq, frame, future) - kucuk oncelik once
+        self._pending: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        self._seq = itertools.count()
+        self._inflight: Dict[int, Tuple[Future, int]] = {}
+        self._lock = threading.Lock()
+
+        self._ready = threading.Event()
+        self._model_ready = False
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        self._done = 0
+        self._errors = 0
+        self._last_infer_ms: Optional[float] = None
+
+    # yasam dongusu
+    def start(self) -> bool:
+        if self.is_alive():
+            return True
+
+        self._stop.clear()
+        self._ready.clear()
+        self._shms = [
+            shared_memory.SharedMemory(create=True, size=self.slot_bytes) for _ in range(self.slots)
+        ]
+        self._free_slots = queue.Queue()
+        for i in range(self.slots):
+            self._free_slots.put(i)
+
+        self._req_q = self._ctx.Queue()
+        self._res_q = self._ctx.Queue()
+        self._proc = self._ctx.Process(
+            target=_worker_main,
+            args=(self.factory, [s.name for s in self._shms], self.cpus, self._req_q, self._res_q),
+            name="vision-worker",
+            daemon=True,
+        )
+        self._proc.start()
+
+        self._threads = [
+            threading.Thread(target=self._dispatch_loop, name="vision-dispatch", daemon=True),
+            threading.Thread(target=self._result_loop, name="vision-results", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+        if not self._ready.wait(self.start_timeout_s):
+            print("[VISION_WORKER] Worker did not report ready, stopping")
+            self.stop()
+            return False
+
+        print(f"[VISION_WORKER] Started (pid {self._proc.pid}, slots {self.slots} x {self.slot_bytes // 1024} KB, model_ready={self._model_ready})")
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        # dispatcher'i uyandir
+        self._pending.put((-1, -1, None, None))
+        self._free_slots.put(-1)
+
+        if self._proc is not None:
+            try:
+                self._req_q.put(None)
+                self._proc.join(timeout=3)
+                if self._proc.is_alive():
+                    self._proc.terminate()
+                    self._proc.join(timeout=1)
+            except Exception as e:
+                print(f"[VISION_WORKER] Stop error: {e}")
+
+        for t in self._threads:
+            t.join(timeout=2)
+        self._threads = []
+        self._fail_all(WorkerUnavailable("Vision worker stopped"))
+
+        for shm in self._shms:
+            try:
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._shms = []
+        self._proc = None
+        self._ready.clear()
+        print("[VISION_WORKER] Stopped")
+
+    def is_alive(self) -> bool:
+        return self._proc is not None and self._proc.is_alive() and not self._stop.is_set()
+
+    def is_ready(self) -> bool:
+        """Worker is running and its model is loaded."""
+        return self.is_alive() and self._ready.is_set() and self._model_ready
+
+    # istekler
+    def submit(self, frame: np.ndarray, priority: int = 10) -> Future:
+        """Queue a detection; the Future resolves to (boxes, scores, class_ids)."""
+        fut: Future = Future()
+        if not self.is_alive():
+            fut.set_exception(WorkerUnavailable("Vision worker not running"))
+            return fut
+
+        frame = np.asarray(frame)
+        if frame.nbytes > self.slot_bytes:
+            fut.set_exception(ValueError(f"Frame {frame.shape} larger than shared slot ({self.slot_bytes} B)"))
+            return fut
+
+        if priority > PRIORITY_RUNNER:
+            # overlay yigilmasin: bitmemis dusuk oncelikli istek sayisi sinirli
+            with self._lock:
+                if self._low_pending >= self.max_low_pending:
+                    fut.set_exception(WorkerBusy(f"{self._low_pending} low-priority requests pending"))
+                    return fut
+                self._low_pending += 1
+            fut.add_done_callback(self._low_done)
+
+        self._pending.put((int(priority), next(self._seq), frame, fut))
+        return fut
+
+    def _low_done(self, _fut) -> None:
+        with self._lock:
+            self._low_pending -= 1
+
+    def detect(self, frame: np.ndarray, priority: int = 10, timeout: Optional[float] = None):
+        fut = self.submit(frame, priority)
+        try:
+            return fut.result(timeout=timeout)
+        except FuturesTimeout:
+            # kuyruktaysa iptal: dispatcher atlar, slot harcanmaz
+            fut.cancel()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            inflight = len(self._inflight)
+        # iptal edilenler dispatcher onlari atlayana kadar heap'te kalir - sayilmaz
+        with self._pending.mutex:
+            queued = sum(1 for item in self._pending.queue if item[3] is not None and not item[3].done())
+        return {
+            "alive": self.is_alive(),
+            "model_ready": self._model_ready,
+            "queued": queued,
+            "inflight": inflight,
+            "low_pending": self._low_pending,
+            "done": self._done,
+            "errors": self._errors,
+            "last_infer_ms": self._last_infer_ms,
+        }
+
+    # ic thread'ler
+    def _dispatch_loop(self) -> None:
+        while not self._stop.is_set():
+            # once slot: oncelik secimi slot bosaldigi anda yapilir
+            slot = self._free_slots.get()
+            if slot < 0 or self._stop.is_set():
+                return
+
+            priority, req_id, frame, fut = self._pending.get()
+            if fut is None:
+                return
+            if not fut.set_running_or_notify_cancel():
+                self._free_slots.put(slot)
+                continue
+
+            try:
+                # tek kopya: frame -> paylasilan bellek (pickle yok)
+                view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self._shms[slot].buf)
+                np.copyto(view, frame)
+                del view
+                with self._lock:
+                    self._inflight[req_id] = (fut, slot)
+                self._req_q.put((req_id, slot, frame.shape, frame.dtype.str))
+            except Exception as e:
+                with self._lock:
+                    self._inflight.pop(req_id, None)
+                self._free_slots.put(slot)
+                fut.set_exception(e)
+
+    def _result_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                msg = self._res_q.get(timeout=0.5)
+            except queue.Empty:
+                if self._proc is not None and not self._proc.is_alive() and not self._stop.is_set():
+                    print(f"[VISION_WORKER] Worker died (exit code {self._proc.exitcode})")
+                    self._fail_all(WorkerUnavailable("Vision worker died"))
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+
+            kind = msg[0]
+            if kind == "ready":
+                self._model_ready = bool(msg[1])
+                self._ready.set()
+                continue
+
+            req_id = msg[1]
+            with self._lock:
+                entry = self._inflight.pop(req_id, None)
+            if entry is None:
+                continue
+            fut, slot = entry
+            self._free_slots.put(slot)
+
+            if kind == "result":
+                self._done += 1
+                self._last_infer_ms = round(msg[5], 2)
+                fut.set_result((msg[2], msg[3], msg[4]))
+            else:
+                self._errors += 1
+                fut.set_exception(RuntimeError(msg[2]))
+
+    def _fail_all(self, exc: Exception) -> None:
+        with self._lock:
+            entries = list(self._inflight.values())
+            self._inflight.clear()
+        for fut, _ in entries:
+            if not fut.done():
+                fut.set_exception(exc)
+
+        while True:
+            try:
+                _, _, _, fut = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if fut is not None and fut.set_running_or_notify_cancel():
+                fut.set_exception(exc)
+
+
+vision_worker = None
+
+
+def init_vision_worker(
+    slots: int = 2,
+    slot_bytes: int = 8 * 1024 * 1024,
+    cpus: Optional[List[int]] = None,
+    factory: Optional[Callable] = None,
+    max_low_pending: int = 2,
+):
+    """Initialize and start the vision worker singleton (None if it fails to start)."""
+    global vision_worker
+    worker = VisionWorker(
+        factory=factory, slots=slots, slot_bytes=slot_bytes, cpus=cpus, max_low_pending=max_low_pending,
+    )
+    vision_worker = worker if worker.start() else None
+    return vision_worker
+
+
+def stop_vision_worker() -> None:
+    global vision_worker
+    if vision_worker is not None:
+        vision_worker.stop()
+    vision_worker = None
@@ -3,7 +3,7 @@ File Name       : yolo_runtime.py
 Author          : Eda
 Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
 Created Date    : 2026-02-25
-Last Modified   : 2026-02-27
+Last Modified   : 2026-10-17
 
 Description:
 YOLO-style ONNX inference runtime.
@@ -34,11 +34,186 @@ class Detection:
     class_id: int
 
 
+def decode_predictions(
+    preds: np.ndarray,
+    orig_shape_hw,
+    imgsz: int,
+    conf_thres: float,
+    has_objectness: bool = False,
+    clamp: bool = False,
+):
+    """
+    Vectorized decode of raw YOLO rows (one row per candidate box).
+
+    Row layout:
+        has_objectness=False : [cx, cy, w, h, cls0, cls1, ...]        (YOLOv8, VisionService)
+        has_objectness=True  : [cx, cy, w, h, obj, cls0, cls1, ...]   (YOLOv5, YoloRuntime)
+
+    Returns:
+        boxes     : (N, 4) int64 array of [x1, y1, x2, y2] in original image pixels
+        scores    : (N,) array (float32 without objectness, float64 with objectness)
+        class_ids : (N,) int64 array
+    Rows keep their original order; numeric results match the old per-row loop.
+    """
+    preds = np.asarray(preds)
+    h, w = orig_shape_hw
+
+    cls_start = 5 if has_objectness else 4
+    cls_block = preds[:, cls_start:]
+
+    if preds.shape[0] == 0 or cls_block.shape[1] == 0:
+        return (
+            np.empty((0, 4), dtype=np.int64),
+            np.empty((0,), dtype=np.float64 if has_objectness else preds.dtype),
+            np.empty((0,), dtype=np.int64),
+        )
+
+    # tek seferde sinif skorlari - max, sonra esik filtresi
+    best = cls_block.max(axis=1)
+    if has_objectness:
+        # eski dongu: float(obj) * float(cls) -> float64
+        scores = preds[:, 4].astype(np.float64) * best.astype(np.float64)
+    else:
+        scores = best
+
+    # esik karsilastirmasi float64'te (eski dongu python float ile karsilastiriyordu)
+    keep = scores.astype(np.float64) >= float(conf_thres)
+    if not keep.any():
+        return (
+            np.empty((0, 4), dtype=np.int64),
+            scores[:0],
+            np.empty((0,), dtype=np.int64),
+        )
+
+    # argmax sadece esigi gecen satirlarda (masked)
+    class_ids = np.argmax(cls_block[keep], axis=1).astype(np.int64)
+    scores = scores[keep]
+
+    kept = preds[keep]
+    cx, cy, bw, bh = kept[:, 0], kept[:, 1], kept[:, 2], kept[:, 3]
+
+    # eski donguyle ayni islem sirasi: (c - s / 2) * dim / imgsz, int() -> sifira dogru kesme
+    x1 = (cx - bw / 2) * w / imgsz
+    y1 = (cy - bh / 2) * h / imgsz
+    x2 = (cx + bw / 2) * w / imgsz
+    y2 = (cy + bh / 2) * h / imgsz
+    boxes = np.stack([x1, y1, x2, y2], axis=1).astype(np.int64)
+
+    if clamp:
+        np.clip(boxes[:, 0::2], 0, w - 1, out=boxes[:, 0::2])
+        np.clip(boxes[:, 1::2], 0, h - 1, out=boxes[:, 1::2])
+
+    return boxes, scores, class_ids
+
+
+NMS_BACKENDS = ("greedy", "cv2", "none")
+
+
+def _box_iou_one_to_many(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    # VisionService.compute_iou ile ayni tanim (+1 piksel yok)
+    xA = np.maximum(box[0], boxes[:, 0])
+    yA = np.maximum(box[1], boxes[:, 1])
+    xB = np.minimum(box[2], boxes[:, 2])
+    yB = np.minimum(box[3], boxes[:, 3])
+
+    inter = np.clip(xB - xA, 0, None) * np.clip(yB - yA, 0, None)
+    area_a = max(0.0, float(box[2] - box[0])) * max(0.0, float(box[3] - box[1]))
+    area_b = np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+    union = area_a + area_b - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def _greedy_nms(boxes: np.ndarray, order: np.ndarray, iou_thres: float) -> np.ndarray:
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        if order.size == 1:
+            break
+        rest = order[1:]
+        ious = _box_iou_one_to_many(boxes[i], boxes[rest])
+        order = rest[ious <= iou_thres]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def _cv2_nms(boxes: np.ndarray, scores: np.ndarray, iou_thres: float) -> np.ndarray:
+    # cv2.dnn xywh bekliyor
+    xywh = np.stack(
+        [boxes[:, 0], boxes[:, 1], boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], axis=1
+    )
+    idx = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), 0.0, iou_thres)
+    idx = np.asarray(idx, dtype=np.int64).reshape(-1)
+    # skora gore siralama (greedy ile ayni cikti sirasi)
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def non_max_suppression(
+    boxes: np.ndarray,
+    scores: np.ndarray,
+    class_ids: np.ndarray,
+    iou_thres: float = 0.45,
+    class_aware: bool = True,
+    top_k: Optional[int] = None,
+    max_det: Optional[int] = None,
+    backend: str = "greedy",
+) -> np.ndarray:
+    """
+    Non-maximum suppression over decoded boxes.
+
+    Parameters:
+        boxes       : (N, 4) [x1, y1, x2, y2]
+        scores      : (N,)
+        class_ids   : (N,)
+        iou_thres   : boxes overlapping a kept box above this IoU are dropped
+        class_aware : only suppress boxes of the same class
+        top_k       : keep only the top_k highest scores before NMS (limits work)
+        max_det     : keep at most max_det boxes after NMS
+        backend     : "greedy" (numpy), "cv2" (cv2.dnn.NMSBoxes) or "none"
+
+    Returns:
+        Indices of kept boxes, sorted by score (highest first).
+    """
+    if backend not in NMS_BACKENDS:
+        raise ValueError(f"Unknown NMS backend: {backend} (expected one of {NMS_BACKENDS})")
+
+    n = int(len(scores))
+    if n == 0:
+        return np.empty((0,), dtype=np.int64)
+
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    scores = np.asarray(scores, dtype=np.float64)
+    class_ids = np.asarray(class_ids, dtype=np.int64)
+
+    order = np.argsort(-scores, kind="stable")
+    if top_k is not None and top_k > 0:
+        order = order[:top_k]
+
+    if backend == "none":
+        keep = order
+    else:
+        cand = boxes[order]
+        if class_aware:
+            # batched NMS: siniflari koordinat offset'i ile ayirma, tek gecis
+            offset = float(cand.max() - cand.min()) + 1.0
+            cand = cand + (class_ids[order] * offset)[:, None]
+
+        if backend == "greedy":
+            local = _greedy_nms(cand, np.arange(len(order)), float(iou_thres))
+        else:
+            local = _cv2_nms(cand, scores[order], float(iou_thres))
+        keep = order[local]
+
+    if max_det is not None and max_det > 0:
+        keep = keep[:max_det]
+    return keep
+
+
 class YoloRuntime:
     """
     YOLO-style ONNX runtime (based on inference2.py logic).
     - preprocess: resize->RGB->normalize->CHW
-    - postprocess: obj_conf * class_score
+    - postprocess: obj_conf * class_score -> NMS
     """
 
     def __init__(
@@ -48,10 +223,22 @@ class YoloRuntime:
         conf_thres: float = 0.5,
         providers: Optional[List[str]] = None,
         class_names: Optional[Dict[int, str]] = None,
+        iou_thres: float = 0.45,
+        nms_backend: str = "greedy",
+        class_aware_nms: bool = True,
+        top_k: Optional[int] = None,
+        max_det: Optional[int] = None,
     ):
         self.model_path = model_path
         self.imgsz = int(imgsz)
         self.conf_thres = float(conf_thres)
+
+        # nms ayarlari
+        self.iou_thres = float(iou_thres)
+        self.nms_backend = nms_backend
+        self.class_aware_nms = bool(class_aware_nms)
+        self.top_k = top_k
+        self.max_det = max_det
         self.class_names = class_names or {0: "resistor", 1: "diode"}
 
         self.session = None
@@ -86,35 +273,32 @@ class YoloRuntime:
         # inference2.py: outputs[0][0]  -> (num_boxes, 85)
         preds = outputs[0][0]
 
-        h, w = orig_shape_hw
-        dets: List[Detection] = []
-
-        for pred in preds:
-            obj_conf = float(pred[4])
-            class_scores = pred[5:]
-            cls_id = int(np.argmax(class_scores))
-            score = obj_conf * float(class_scores[cls_id])  # YOLO stili bu sekilde
-
-            if score < self.conf_thres:
-                continue
-
-            cx, cy, bw, bh = pred[:4]
-
-            x1 = int((cx - bw / 2) * w / self.imgsz)
-            y1 = int((cy - bh / 2) * h / self.imgsz)
-            x2 = int((cx + bw / 2) * w / self.imgsz)
-            y2 = int((cy + bh / 2) * h / self.imgsz)
-
-            # clamp
-            x1 = max(0, min(w - 1, x1))
-            y1 = max(0, min(h - 1, y1))
-            x2 = max(0, min(w - 1, x2))
-            y2 = max(0, min(h - 1, y2))
-
-            dets.append(Detection([x1, y1, x2, y2], float(score), cls_id))
+        boxes, scores, class_ids = decode_predictions(
+            preds,
+            orig_shape_hw,
+            self.imgsz,
+            self.conf_thres,
+            has_objectness=True,
+            clamp=True,
+        )
 
-        dets.sort(key=lambda d: d.score, reverse=True)
-        return dets
+        # nms - cikti skora gore sirali
+        order = non_max_suppression(
+            boxes,
+            scores,
+            class_ids,
+            iou_thres=self.iou_thres,
+            class_aware=self.class_aware_nms,
+            top_k=self.top_k,
+            max_det=self.max_det,
+            backend=self.nms_backend,
+        )
+        return [
+            Detection(box, score, cls_id)
+            for box, score, cls_id in zip(
+                boxes[order].tolist(), scores[order].tolist(), class_ids[order].tolist()
+            )
+        ]
 
     def detect(self, frame_bgr: np.ndarray) -> List[Detection]:
         if not self.is_ready():
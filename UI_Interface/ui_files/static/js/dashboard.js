@@ -3,7 +3,7 @@
 * Author          : Eda
 * Project         : ELE 495 Dissertation Project - SMD Pick and Place Machine
 * Created Date    : 2026-01-25
-* Last Modified   : 2026-03-04
+* Last Modified   : 2026-10-17
 * 
 * Description:
 * This file implements the client-side logic of the web-based user interface.
@@ -290,150 +290,244 @@ function setBadge(id, ok, label, port=null){
 
 
 // sistemin tum durumlari icin
-async function fetchStatus(){
-    try{
-        const res = await apiFetch("/api/status/");
-        if(!res.ok) 
-            return;
-        const data = await res.json();
+function renderStatus(data){
 
-        // const planCount = (data.plan || []).length;
-        // const planTs = data.plan_received_at;
+    // const planCount = (data.plan || []).length;
+    // const planTs = data.plan_received_at;
 
-        // if (planCount > 0) {
-        // setText("planInfo", `PLAN: LOADED (${planCount})  ${planTs ?? ""}`.trim());
-        // } else {
-        // setText("planInfo", "PLAN: EMPTY");
-        // }
+    // if (planCount > 0) {
+    // setText("planInfo", `PLAN: LOADED (${planCount})  ${planTs ?? ""}`.trim());
+    // } else {
+    // setText("planInfo", "PLAN: EMPTY");
+    // }
 
 
-        // robot
-        setText("robotStatus", data.robot?.status ?? "-");
-        setText("robotTask", data.robot?.current_task ?? "-");
-        setText("posX", data.robot?.x ?? "-");
-        setText("posY", data.robot?.y ?? "-");
-        setText("posZ", data.robot?.z ?? "-");
+    // robot
+    setText("robotStatus", data.robot?.status ?? "-");
+    setText("robotTask", data.robot?.current_task ?? "-");
+    setText("posX", data.robot?.x ?? "-");
+    setText("posY", data.robot?.y ?? "-");
+    setText("posZ", data.robot?.z ?? "-");
 
-        // robot - grbl
-        const grbl = data.grbl || {};
-        setText("grblState", grbl.state ?? "-");
+    // robot - grbl
+    const grbl = data.grbl || {};
+    setText("grblState", grbl.state ?? "-");
 
-        const mpos = grbl.mpos || {};
-        setText("grblX", mpos.x ?? "-");
-        setText("grblY", mpos.y ?? "-");
-        setText("grblZ", mpos.z ?? "-");
+    const mpos = grbl.mpos || {};
+    setText("grblX", mpos.x ?? "-");
+    setText("grblY", mpos.y ?? "-");
+    setText("grblZ", mpos.z ?? "-");
 
-        setText(
-            "grblOk", 
-            (grbl.last_ok === true) ? "OK" : 
-            (grbl.last_ok === false ? "NO" : "-")
-        );
+    setText(
+        "grblOk", 
+        (grbl.last_ok === true) ? "OK" : 
+        (grbl.last_ok === false ? "NO" : "-")
+    );
 
 
-        // test
-        setText("testMode", data.teststation?.mode ?? "-");
-        setText("testAdc", data.teststation?.last_adc ?? "-");
-        setText("testV", data.teststation?.last_voltage_v ?? "-");
-        setText("testResult", data.teststation?.last_result ?? "-");
-        setText("testUpdated", data.teststation?.last_updated ?? "-");
+    // test
+    setText("testMode", data.teststation?.mode ?? "-");
+    setText("testAdc", data.teststation?.last_adc ?? "-");
+    setText("testV", data.teststation?.last_voltage_v ?? "-");
+    setText("testResult", data.teststation?.last_result ?? "-");
+    setText("testUpdated", data.teststation?.last_updated ?? "-");
 
 
-        // program status
-        const prog = data.program || {};
+    // program status
+    const prog = data.program || {};
 
-        if (prog.current_label){
-            setText("robotTask", prog.current_label);
-        }
+    if (prog.current_label){
+        setText("robotTask", prog.current_label);
+    }
 
-        // fixed program label (if element exists)
-        setText("planInfo", "FIXED PROGRAM");
-
-        // pcb done -> yesil kutular
-        const done = prog.pcb_done || {};
-        const partMap = {
-            R1: "partR1",
-            R2: "partR2",
-            D1: "partD1",
-            D2: "partD2"
-        };
-
-        Object.keys(partMap).forEach((k) => {
-            const el = document.getElementById(partMap[k]);
-            if (!el) return;
-            el.classList.toggle("done", done[k] === true);
-        });
+    // fixed program label (if element exists)
+    setText("planInfo", "FIXED PROGRAM");
+
+    // pcb done -> yesil kutular
+    const done = prog.pcb_done || {};
+    const partMap = {
+        R1: "partR1",
+        R2: "partR2",
+        D1: "partD1",
+        D2: "partD2"
+    };
+
+    Object.keys(partMap).forEach((k) => {
+        const el = document.getElementById(partMap[k]);
+        if (!el) return;
+        el.classList.toggle("done", done[k] === true);
+    });
+
+
+    // image processing
+    const ip = data.image_processing || {};
+    const det = ip.last_detection || {};
+    const plc = ip.last_placement || {};
+
+    setText("visionComponent", det.component ?? "-");
+    setText("visionType", det.type ?? "-");
+    setText(
+        "visionConf",
+        (typeof det.confidence === "number") ? `${(det.confidence * 100).toFixed(1)}%` : "-"
+    );
+
+    setText("placePad", plc.pad ?? "-");
+    setText(
+        "placeAcc",
+        (typeof plc.accuracy === "number") ? `${plc.accuracy.toFixed(1)}%` : "-"
+    );
+    setText("placeStatus", plc.status ?? "-");
+    setText("visionUpdated", ip.last_updated ?? "-");
+
+
+    // logs -> gorev gecmisi
+    const logs = data.logs || [];
+    const historyBox = document.getElementById("historyBox");
+    if (historyBox) historyBox.textContent = logs.join("\n");
+
+
+    // baglanti durumu
+    setBadge("badgePi", true, "Pi");
+    const conn = data.connections || {};
+    // motors arduino
+    const m = conn.arduino_motors || {};
+    setBadge("badgeArduinoMotors", m.status, "Arduino Motors", m.port);
+    // teststation arduino
+    const t = conn.arduino_teststation || {};
+    setBadge("badgeArduinoTest", t.status, "Arduino Test", t.port);
+    // yeni connection yapisi (object icinde status var)
+    const cam = conn.camera || {};
+    // badge guncelle
+    setBadge("badgeCamera", cam.status, "Camera", cam.port);
+
+    // global kamera bilgisi
+    CAMERA_OK = cam.status === true;
+    // kamera placeholder kontrolu
+    const camOk = cam.status === true;
+
+    // kamera placeholder : suan JPEG kullaniyoruz sonra MJPEG'e gecebiliriz
+    const camImg = document.getElementById("cameraImg");
+    const camPh = document.getElementById("cameraPlaceholder");
+
+     // summary
+    document.getElementById("connSummary").textContent = "local network (demo)";
+
+    if (camImg && camPh){
+        if(camOk){
+            camImg.style.display = "block";
+            camPh.style.display = "none";
+        } else{
+            camImg.style.display = "none";
+            camPh.style.display = "grid";
+            camImg.src = "";
+        }
+    }
+}
 
+function showNoConnection(){
+    setBadge("badgePi", false, "Pi");
+    setBadge("badgeArduinoMotors", null, "Arduino Motors");
+    setBadge("badgeArduinoTest", null, "Arduino Test");
+    setBadge("badgeCamera", null, "Camera");
+    document.getElementById("connSummary").textContent = "no connection";
+}
 
-        // image processing
-        const ip = data.image_processing || {};
-        const det = ip.last_detection || {};
-        const plc = ip.last_placement || {};
-
-        setText("visionComponent", det.component ?? "-");
-        setText("visionType", det.type ?? "-");
-        setText(
-            "visionConf",
-            (typeof det.confidence === "number") ? `${(det.confidence * 100).toFixed(1)}%` : "-"
-        );
-
-        setText("placePad", plc.pad ?? "-");
-        setText(
-            "placeAcc",
-            (typeof plc.accuracy === "number") ? `${plc.accuracy.toFixed(1)}%` : "-"
-        );
-        setText("placeStatus", plc.status ?? "-");
-        setText("visionUpdated", ip.last_updated ?? "-");
-
-
-        // logs -> gorev gecmisi
-        const logs = data.logs || [];
-        const historyBox = document.getElementById("historyBox");
-        if (historyBox) historyBox.textContent = logs.join("\n");
-
-
-        // baglanti durumu
-        setBadge("badgePi", true, "Pi");
-        const conn = data.connections || {};
-        // motors arduino
-        const m = conn.arduino_motors || {};
-        setBadge("badgeArduinoMotors", m.status, "Arduino Motors", m.port);
-        // teststation arduino
-        const t = conn.arduino_teststation || {};
-        setBadge("badgeArduinoTest", t.status, "Arduino Test", t.port);
-        // yeni connection yapisi (object icinde status var)
-        const cam = conn.camera || {};
-        // badge guncelle
-        setBadge("badgeCamera", cam.status, "Camera", cam.port);
-
-        // global kamera bilgisi
-        CAMERA_OK = cam.status === true;
-        // kamera placeholder kontrolu
-        const camOk = cam.status === true;
-
-        // kamera placeholder : suan JPEG kullaniyoruz sonra MJPEG'e gecebiliriz
-        const camImg = document.getElementById("cameraImg");
-        const camPh = document.getElementById("cameraPlaceholder");
-
-         // summary
-        document.getElementById("connSummary").textContent = "local network (demo)";
-    
-        if (camImg && camPh){
-            if(camOk){
-                camImg.style.display = "block";
-                camPh.style.display = "none";
-            } else{
-                camImg.style.display = "none";
-                camPh.style.display = "grid";
-                camImg.src = "";
-            }
+async function fetchStatus(){
+    try{
+        // ilk cevaptan sonra sadece degisen bolumler (?since=versiyon)
+        const url = (STATUS_STATE && STATUS_POLL_VERSION) ? `/api/status/?since=${STATUS_POLL_VERSION}` : "/api/status/";
+        const res = await apiFetch(url);
+        if (res.status === 304)
+            return;
+        if(!res.ok) 
+            return;
+        const data = await res.json();
+        if (data.changed !== undefined){
+            applyStatusEvent("delta", data);
+        } else {
+            applyStatusEvent("full", { state: data });
         }
+        STATUS_POLL_VERSION = data.version || 0;
     }catch(e){
         console.warn("Status fetch error:", e);
-        setBadge("badgePi", false, "Pi");
-        setBadge("badgeArduinoMotors", null, "Arduino Motors");
-        setBadge("badgeArduinoTest", null, "Arduino Test");
-        setBadge("badgeCamera", null, "Camera");
-        document.getElementById("connSummary").textContent = "no connection";
+        showNoConnection();
+    }
+}
+
+
+// status push kanali (SSE) - EventSource X-API-Key gonderemedigi icin fetch ile okunuyor
+// once tam durum (full), sonra sadece degisen bolumler + yeni log satirlari (delta)
+let STATUS_STATE = null;
+let STATUS_POLL_TIMER = null;
+let STATUS_POLL_VERSION = 0;    // polling: son alinan state versiyonu
+
+function startStatusPolling(){
+    if (STATUS_POLL_TIMER) return;
+    STATUS_POLL_VERSION = 0;    // stream'den donuluyorsa tam durumla basla
+    fetchStatus();
+    STATUS_POLL_TIMER = setInterval(fetchStatus, 400); // 400ms polling - yenileme
+}
+
+function stopStatusPolling(){
+    if (!STATUS_POLL_TIMER) return;
+    clearInterval(STATUS_POLL_TIMER);
+    STATUS_POLL_TIMER = null;
+}
+
+function applyStatusEvent(event, data){
+    if (event === "full"){
+        STATUS_STATE = data.state;
+    } else if (event === "delta" && STATUS_STATE){
+        Object.assign(STATUS_STATE, data.changed || {});
+        if (data.logs_append){
+            STATUS_STATE.logs = (STATUS_STATE.logs || []).concat(data.logs_append).slice(-300);
+        }
+    } else {
+        return;
+    }
+    renderStatus(STATUS_STATE);
+}
+
+async function streamStatus(){
+    const res = await apiFetch("/api/status/stream", { headers: { "Accept": "text/event-stream" } });
+    if (!res.ok || !res.body) throw new Error(`status stream HTTP ${res.status}`);
+
+    stopStatusPolling();
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buf = "";
+
+    while (true){
+        const { value, done } = await reader.read();
+        if (done) break;
+        buf += decoder.decode(value, { stream: true });
+
+        let idx;
+        while ((idx = buf.indexOf("\n\n")) >= 0){
+            const block = buf.slice(0, idx);
+            buf = buf.slice(idx + 2);
+
+            let event = "message";
+            const dataLines = [];
+            block.split("\n").forEach((line) => {
+                if (line.startsWith("event:")) event = line.slice(6).trim();
+                else if (line.startsWith("data:")) dataLines.push(line.slice(5).trimStart());
+            });
+            if (dataLines.length) applyStatusEvent(event, JSON.parse(dataLines.join("\n")));
+        }
+    }
+}
+
+async function startStatusStream(){
+    // stream koparsa polling'e don, biraz sonra tekrar dene
+    while (true){
+        try{
+            await streamStatus();
+        }catch(e){
+            console.warn("Status stream error:", e);
+        }
+        startStatusPolling();
+        await new Promise((resolve) => setTimeout(resolve, 5000));
     }
 }
 
@@ -516,8 +610,9 @@ document.addEventListener("DOMContentLoaded",  async () =>{
 
 
 
-    fetchStatus();
-    setInterval(fetchStatus, 400); // 400ms polling - yenileme
+    // ilk durum polling ile, stream baglaninca polling durur
+    startStatusPolling();
+    startStatusStream();
     
     // status ve camera icin yenileme farkli : status 400, camera 1000
     setInterval(refreshCamera, 1000); // 1 FPS